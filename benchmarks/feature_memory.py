@@ -0,0 +1,101 @@
+"""
+So sánh bộ nhớ giữa chế độ mặc định (float64, mang toàn bộ cột) và chế độ gọn (COMPACT_FEATURES:
+float32, chỉ mang cột cần dùng, Signal / Position int8) khi dựng dữ liệu cho nhiều cặp.
+Dữ liệu giá sinh ngẫu nhiên (không cần mạng). Mỗi chế độ chạy trong 1 tiến trình riêng.
+
+Chạy: python benchmarks/feature_memory.py [--pairs 10] [--days 2500]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_leg(rng, dates, base):
+    """1 mã giả lập có đủ cột như sau DataProcessor (OHLCV + Adj Close + Log_Return)."""
+    import numpy as np
+    import pandas as pd
+    close = base * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    df = pd.DataFrame({
+        'Open': close * 0.99, 'High': close * 1.01, 'Low': close * 0.98,
+        'Close': close, 'Adj Close': close, 'Volume': rng.integers(1e5, 1e7, len(dates)).astype(np.float64),
+    }, index=dates)
+    df['Log_Return'] = np.log(df['Adj Close'] / df['Adj Close'].shift(1))
+    return df.dropna()
+
+def run_mode(compact, n_pairs, n_days):
+    """Dựng bảng cặp + tín hiệu cho n_pairs cặp, trả về (RAM đỉnh MB, RAM giữ lại MB, giây)."""
+    import numpy as np
+    import pandas as pd
+    sys.path.insert(0, ROOT)
+    from feature_layer.engine import FeatureEngine
+    from feature_layer.pairs_updated import PairsIndicatorsUpdated
+    from model_layer.data_handler_updated import DataHandlerUpdated
+    from strategy_layer.signals import SignalLogic
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2010-01-01', periods=n_days)
+    legs = [(make_leg(rng, dates, 50000), make_leg(rng, dates, 40000)) for _ in range(n_pairs)]
+
+    engine = FeatureEngine(compact=compact)
+    pairs_logic = PairsIndicatorsUpdated()
+    sig_gen = SignalLogic(compact=compact)
+    leg_columns = DataHandlerUpdated.leg_feature_columns()
+    pair_columns = ['Adj Close'] + leg_columns if compact else None
+
+    # Chỉ đo phần dựng dữ liệu (dữ liệu đầu vào đã tạo sẵn ở trên)
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = []
+    for df1, df2 in legs:
+        df1 = engine.compute(df1, columns=leg_columns)
+        df2 = engine.compute(df2, columns=leg_columns)
+        df_pair, _ = pairs_logic.calculate_rolling_spread(
+            df1, df2, window=60, keep_columns=pair_columns, compact=compact
+        )
+        kept.append(sig_gen.generate_signals(df_pair))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = sum(df.memory_usage(deep=True).sum() for df in kept)
+    return peak / 1024 ** 2, retained / 1024 ** 2, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh bộ nhớ chế độ float64 và chế độ gọn (float32)")
+    parser.add_argument('--pairs', type=int, default=10, help="Số cặp dựng dữ liệu")
+    parser.add_argument('--days', type=int, default=2500, help="Số phiên mỗi mã")
+    parser.add_argument('--mode', choices=['default', 'compact'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Tiến trình con: chạy 1 chế độ rồi in kết quả
+        peak, retained, elapsed = run_mode(args.mode == 'compact', args.pairs, args.days)
+        print(f"{peak} {retained} {elapsed}")
+        return
+
+    results = {}
+    for mode in ('default', 'compact'):
+        proc = subprocess.run(
+            [sys.executable, '-W', 'ignore', os.path.abspath(__file__),
+             '--mode', mode, '--pairs', str(args.pairs), '--days', str(args.days)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f" {mode}: LỖI {proc.stderr.strip().splitlines()[-1]}")
+            return
+        results[mode] = [float(v) for v in proc.stdout.strip().splitlines()[-1].split()]
+
+    print("=" * 60)
+    print(f" {args.pairs} cặp × {args.days} phiên")
+    print(f" {'Chế độ':<10}{'RAM đỉnh':>12}{'RAM giữ lại':>14}{'Thời gian':>12}")
+    for mode, (peak, retained, elapsed) in results.items():
+        print(f" {mode:<10}{peak:>10.1f}MB{retained:>12.1f}MB{elapsed:>11.2f}s")
+    base, comp = results['default'], results['compact']
+    print(f" Chế độ gọn: RAM đỉnh x{base[0] / comp[0]:.1f} nhỏ hơn, RAM giữ lại x{base[1] / comp[1]:.1f} nhỏ hơn")
+
+if __name__ == "__main__":
+    main()
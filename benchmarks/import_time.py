@@ -0,0 +1,79 @@
+"""
+Đo thời gian khởi động (import) của các entry point bằng `python -X importtime`.
+Mục tiêu: cron giao dịch hằng ngày khởi động dưới 1 giây trước khi làm việc thật.
+
+Chạy: python benchmarks/import_time.py [--top 10] [entry_point ...]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ['trade_execution', 'rebalance', 'main_updated', 'main1', 'main']
+
+# Các thư viện nặng không nên bị nạp lúc khởi động
+HEAVY_PACKAGES = ['yfinance', 'statsmodels', 'sklearn', 'scipy', 'matplotlib', 'pyarrow']
+
+def measure(module):
+    """
+    Import 1 entry point trong tiến trình mới (không chạy hàm main).
+    Trả về (thời gian thực tế giây, tổng thời gian import giây,
+            {module import trực tiếp: giây}, tập package đã nạp, lỗi).
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+
+    # Dòng dạng: "import time: self [us] | cumulative | <thụt lề>imported package"
+    # Thụt lề 1 dấu cách = cấp cao nhất, mỗi cấp con thêm 2 dấu cách
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2]
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((depth, name.strip(), int(parts[1]) / 1e6))
+
+    # Các module mà entry point import trực tiếp
+    children = {name: t for depth, name, t in entries if depth == 1}
+    loaded = {name.split('.')[0] for _, name, _ in entries}
+    totals = [t for depth, name, t in entries if depth == 0 and name == module]
+
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1]
+    total = totals[0] if totals else 0.0
+    return wall, total, children, loaded, error
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian import của các entry point")
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--top', type=int, default=8, help="Số module nặng nhất cần in")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        wall, total, children, loaded, error = measure(module)
+        print("=" * 60)
+        print(f" {module}: khởi động {wall:.3f}s (import {total:.3f}s)")
+        if error:
+            print(f"   LỖI: {error}")
+            continue
+
+        heavy = [p for p in HEAVY_PACKAGES if p in loaded]
+        print(f"   Thư viện nặng bị nạp: {heavy if heavy else 'không có'}")
+
+        ranked = sorted(children.items(), key=lambda x: x[1], reverse=True)
+        for name, t in ranked[:args.top]:
+            print(f"   {t:7.3f}s  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Đánh giá bộ lọc sơ bộ cặp (PairPrefilter) so với quét đồng tích hợp toàn bộ: với mỗi k, số cặp phải kiểm định
+và tỷ lệ cặp đạt chuẩn / Top N của quét toàn bộ còn giữ được (recall), để chọn PAIR_PREFILTER_K.
+Dữ liệu giá sinh ngẫu nhiên theo nhóm ngành (không cần mạng), hoặc đọc file CSV giá (phiên × mã).
+
+Chạy: python benchmarks/prefilter_recall.py [--tickers 150] [--days 750] [--ks 5,10,20] [--csv prices.csv]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_universe(n_tickers, n_days, n_groups=10, seed=0):
+    """Giá giả lập: mỗi nhóm có 1 xu hướng chung, 1 phần mã đồng tích hợp với xu hướng nhóm."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    trends = np.cumsum(rng.normal(0, 0.015, (n_days, n_groups)), axis=0)
+    group = rng.integers(0, n_groups, n_tickers)
+    loading = rng.uniform(0.5, 1.5, n_tickers)
+    # Phần riêng của mã: dừng (AR(1)) với 1/3 số mã, bước ngẫu nhiên với phần còn lại
+    noise = rng.normal(0, 0.01, (n_days, n_tickers))
+    own = np.empty_like(noise)
+    own[0] = noise[0]
+    phi = np.where(rng.random(n_tickers) < 1 / 3, 0.9, 1.0)
+    for t in range(1, n_days):
+        own[t] = phi * own[t - 1] + noise[t]
+    prices = 100 * np.exp(trends[:, group] * loading + own)
+    return pd.DataFrame(prices, index=pd.bdate_range('2015-01-01', periods=n_days),
+                        columns=[f"M{i:03d}" for i in range(n_tickers)])
+
+def main():
+    import pandas as pd
+    from feature_layer.cointegration import CointegrationScanner
+    from feature_layer.prefilter import PairPrefilter
+
+    parser = argparse.ArgumentParser(description="Recall của bộ lọc sơ bộ cặp so với quét toàn bộ")
+    parser.add_argument('--tickers', type=int, default=150, help="Số mã (dữ liệu giả lập)")
+    parser.add_argument('--days', type=int, default=750, help="Số phiên (dữ liệu giả lập)")
+    parser.add_argument('--csv', help="File CSV giá đóng cửa (cột = mã, dòng = phiên) thay cho dữ liệu giả lập")
+    parser.add_argument('--ks', default='5,10,20,50', help="Các giá trị k cần so sánh")
+    parser.add_argument('--top-n', type=int, default=5, help="Số cặp tốt nhất dùng để tính recall_top_n")
+    parser.add_argument('--methods', default=','.join(PairPrefilter.METHODS))
+    args = parser.parse_args()
+
+    if args.csv:
+        prices = pd.read_csv(args.csv, index_col=0, parse_dates=True)
+    else:
+        prices = make_universe(args.tickers, args.days)
+    ks = [int(k) for k in args.ks.split(',')]
+
+    scanner = CointegrationScanner(min_obs=100, n_jobs=1)
+    print("=" * 72)
+    print(f" {prices.shape[1]} mã × {prices.shape[0]} phiên")
+    for method in args.methods.split(','):
+        prefilter = PairPrefilter(method)
+        start = time.perf_counter()
+        prefilter.candidates(prices.to_numpy())
+        elapsed = time.perf_counter() - start
+        report = prefilter.recall_report(prices, ks=ks, top_n=args.top_n, scanner=scanner)
+        print("-" * 72)
+        print(f" {method} (lọc 1 lần: {elapsed * 1000:.0f} ms)")
+        print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Kiểm tra chế độ streaming của DataProcessor: khởi tạo process_all(..., stream=True) trên phần đầu dữ liệu,
+nhận từng phiên còn lại bằng append_bar(), rồi so stream_data() với chạy lại process_all trên toàn bộ dữ liệu.
+Dùng cấu hình hiện tại (GAP_POLICY, GAP_MAX_FILL, HOLIDAY_FILE...). Dữ liệu giá sinh ngẫu nhiên (không cần mạng):
+1 mã thiếu hẳn vài phiên (thanh khoản thấp), 1 mã có ô giá NaN.
+
+Chạy: python benchmarks/stream_consistency.py [--tickers 4] [--days 300] [--init 250]
+"""
+import os
+import sys
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_raw(n_tickers, n_days, seed=0):
+    """Dữ liệu gốc {Mã: DataFrame} như DataLoader trả về."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-02', periods=n_days)
+    raw = {}
+    for i in range(n_tickers):
+        close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+        raw[f"T{i}.VN"] = pd.DataFrame({'Close': close, 'Adj Close': close}, index=dates)
+    tickers = list(raw)
+    # Mã thanh khoản thấp: thiếu hẳn 1 phiên ở phần khởi tạo và 2 phiên liền nhau ở phần streaming
+    thin = raw[tickers[1]]
+    raw[tickers[1]] = thin.drop(thin.index[[100, n_days - 30, n_days - 29]])
+    # Ô giá NaN (được nội suy lại khi phiên sau đến)
+    raw[tickers[2]].iloc[n_days - 10, 1] = np.nan
+    return raw
+
+def main():
+    import numpy as np
+    import pandas as pd
+    import config
+    from data_layer.processor import DataProcessor
+
+    parser = argparse.ArgumentParser(description="So sánh streaming (append_bar) với chạy lại process_all")
+    parser.add_argument('--tickers', type=int, default=4, help="Số mã")
+    parser.add_argument('--days', type=int, default=300, help="Số phiên")
+    parser.add_argument('--init', type=int, default=250, help="Số phiên dùng để khởi tạo streaming")
+    args = parser.parse_args()
+
+    raw = make_raw(args.tickers, args.days)
+    cutoff = pd.bdate_range('2023-01-02', periods=args.days)[args.init - 1]
+
+    full = DataProcessor(adf_mode='off').process_all(raw)
+
+    stream = DataProcessor(adf_mode='off')
+    stream.process_all({t: df.loc[:cutoff] for t, df in raw.items()}, stream=True)
+    new_dates = sorted({d for df in raw.values() for d in df.index if d > cutoff})
+    for date in new_dates:
+        for t, df in raw.items():
+            if date in df.index:
+                stream.append_bar(t, df.loc[date], date=date)
+    streamed = stream.stream_data()
+
+    ok = list(full) == list(streamed)
+    err = 0.0
+    for t in full:
+        same_index = streamed.get(t) is not None and full[t].index.equals(streamed[t].index)
+        ok &= same_index
+        if same_index:
+            a, b = full[t].to_numpy(dtype=np.float64), streamed[t][full[t].columns].to_numpy(dtype=np.float64)
+            ok &= np.array_equal(np.isnan(a), np.isnan(b))
+            err = max(err, float(np.nanmax(np.abs(a - b) / np.maximum(np.abs(a), 1e-12))))
+    ok &= err < 1e-9
+
+    print("=" * 60)
+    print(f" GAP_POLICY = {getattr(config, 'GAP_POLICY', 'drop')!r}, GAP_MAX_FILL = {getattr(config, 'GAP_MAX_FILL', 0)}")
+    for t in full:
+        print(f" {t}: process_all {len(full[t])} phiên, stream_data {len(streamed.get(t, []))} phiên")
+    print(f" Sai số tương đối lớn nhất: {err:.2e}")
+    print(" KHỚP" if ok else " KHÔNG KHỚP")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
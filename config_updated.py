@@ -24,11 +24,64 @@ TICKERS = [
 START_DATE = '2020-01-01'
 END_DATE   = '2023-12-31' # Hoặc dùng datetime.date.today() trong code chạy thực
 
+# Kho giá cục bộ (Parquet, mỗi mã 1 file): đọc cache trước, chỉ tải thêm phiên mới
+# Đặt None để tắt cache và luôn tải lại toàn bộ từ Yahoo Finance
+CACHE_DIR = 'data_cache'
+# Mỗi lần bổ sung tải lại N phiên cuối đã lưu để so với cache: lệch tương đối > CACHE_REVISION_TOL
+# (Yahoo điều chỉnh lại Adj Close / Close sau chia cổ tức, tách cổ phiếu) -> tải lại toàn bộ lịch sử mã đó và ghi đè
+CACHE_OVERLAP_BARS = 5
+CACHE_REVISION_TOL = 1e-3
+
+# Tải song song theo lô (batch): gộp nhiều mã vào 1 request, chạy tối đa N luồng
+DOWNLOAD_BATCH_SIZE = 10  # Số mã trong 1 request (1 = tải từng mã)
+DOWNLOAD_WORKERS    = 4   # Số luồng tải song song tối đa
+DOWNLOAD_RETRIES    = 3   # Số lần thử lại khi lỗi mạng
+DOWNLOAD_BACKOFF    = 1.0 # Thời gian chờ ban đầu (giây), nhân đôi sau mỗi lần lỗi
+LOAD_WORKERS        = 8   # Số luồng đọc song song khi nạp cả thư mục file giá (load_directory)
+
 # 
 # 2. TIỀN XỬ LÝ (PRE-PROCESSING)
 # 
 OUTLIER_THRESH = 3.0  # Ngưỡng lọc nhiễu (Winsorize)
 
+# Bảng giá dạng ma trận (PricePanel): chỉ giữ các trường cần dùng về sau
+PANEL_FIELDS = ('Adj Close', 'Log_Return')
+PANEL_DTYPE  = 'float64'   # 'float32' để giảm một nửa bộ nhớ
+VECTORIZED_PROCESSING = True  # Xử lý panel bằng phép toán 2D trên toàn bộ mã (thay vì lặp từng mã)
+
+# Đồng bộ theo lịch giao dịch HOSE (thay cho lấy giao ngày của mọi mã)
+# File ngày nghỉ: mỗi dòng 1 ngày 'YYYY-MM-DD'; ngày làm việc mà không mã nào có phiên cũng được coi là ngày nghỉ
+HOLIDAY_FILE = 'data_layer/holidays_hose.txt'
+# Chính sách khi 1 mã thiếu phiên: 'drop' (bỏ ngày đó cho cả thị trường) | 'ffill' (lấy giá phiên trước,
+# tối đa GAP_MAX_FILL phiên liên tiếp) | 'nan' (giữ NaN, không ảnh hưởng các mã khác)
+GAP_POLICY   = 'ffill'
+GAP_MAX_FILL = 5
+GAP_POLICIES = {}   # Ghi đè theo mã, VD: {'PVD.VN': 'nan'}
+
+# Xử lý theo khối (out-of-core) cho lịch sử dài / nhiều mã: mỗi lần chỉ nạp 1 khối mã vào RAM,
+# kết quả ghi ra ổ đĩa và mở lại bằng memory-map
+CHUNKED_PROCESSING = False
+CHUNK_MEMORY_MB    = 512                 # Ngân sách RAM cho 1 khối (quyết định số mã mỗi khối)
+CHUNK_DIR          = 'data_cache/panel'  # Thư mục lưu panel đã xử lý
+
+# Kiểm tra tính dừng (ADF) - chỉ để cảnh báo, không chặn luồng chạy
+# 'eager': chạy ngay khi xử lý | 'lazy': chỉ chạy khi gọi stationarity_report() | 'off': bỏ qua
+ADF_MODE       = 'eager'
+ADF_CACHE_PATH = 'data_cache/adf_cache.json'  # Lưu kết quả theo mã + hash chuỗi Log Return
+ADF_WORKERS    = 4                            # Số tiến trình chạy ADF song song khi cache miss
+ADF_MODE_DAILY = 'lazy'  # Giao dịch hằng ngày không cần chẩn đoán ADF
+
+# Cache kết quả chỉ báo (khóa = mã + chỉ báo + tham số + hash chuỗi giá)
+# Chạy lại / quét tham số chỉ tính phần thay đổi. Đặt FEATURE_CACHE_DIR = None để chỉ cache trong RAM
+FEATURE_CACHE           = True
+FEATURE_CACHE_DIR       = 'data_cache/features'
+FEATURE_CACHE_MEMORY_MB = 256   # Giới hạn RAM (LRU), vượt thì đẩy mục cũ nhất xuống ổ đĩa
+FEATURE_CACHE_DISK_MB   = 2048  # Giới hạn thư mục cache, vượt thì xóa file ít dùng nhất
+
+# Chế độ gọn (tùy chọn): chỉ báo / spread lưu float32, cặp chỉ mang theo cột cần dùng,
+# Signal / Position dạng int8 -> giảm RAM đỉnh khi nghiên cứu nhiều cặp cùng lúc
+COMPACT_FEATURES = False
+
 # 
 # 3. CHỈ BÁO KỸ THUẬT (FEATURE ENGINEERING)
 # 
@@ -45,10 +98,51 @@ BB_STD_DEV  = 2.0
 # Ngưỡng P-value để chấp nhận cặp đồng tích hợp
 COINT_PVALUE_THRESH = 0.05 
 
+# Quét đồng tích hợp theo lô (ma trận): giới hạn RAM tạm cho 1 lô cặp
+COINT_BATCH_MB = 64
+# Số tiến trình quét cặp song song (1: tuần tự, -1: dùng mọi lõi CPU)
+COINT_WORKERS  = -1
+
+# Lọc sơ bộ cặp trước kiểm định đồng tích hợp: None (kiểm định mọi cặp), 'corr', 'ssd' hoặc 'knn'
+PAIR_PREFILTER = None
+PAIR_PREFILTER_K = 20          # Số mã gần nhất giữ lại cho mỗi mã
+PAIR_PREFILTER_COMPONENTS = 32 # Số chiều PCA cho 'knn'
+
+# Kho kết quả đồng tích hợp (SQLite) cho rebalance: chỉ kiểm định lại cặp mới, dữ liệu cũ bị sửa
+# hoặc kết quả quá hạn; các cặp còn lại lấy từ kho
+COINT_STORE          = True
+COINT_STORE_PATH     = 'data_cache/coint_store.sqlite'
+COINT_STORE_TTL_DAYS = 90  # Hạn kết quả (ngày), rải đều trong [TTL/2, TTL] để không hết hạn cùng lúc
+COINT_STORE_MAX_STALE_SESSIONS = 20  # Kiểm định lại cặp khi dữ liệu có thêm quá N phiên sau window_end (None = tắt)
+
+# Độ ổn định đồng tích hợp theo thời gian (CointegrationStability): Engle-Granger trên cửa sổ trượt,
+# đánh giá mỗi COINT_STABILITY_STEP phiên; rebalance cảnh báo cặp được chọn đã mất đồng tích hợp
+COINT_STABILITY_CHECK  = True
+COINT_STABILITY_WINDOW = 250   # Số phiên của cửa sổ
+COINT_STABILITY_STEP   = 5     # Khoảng cách giữa 2 lần đánh giá (phiên)
+COINT_STABILITY_LAG    = 1     # Số lag ADF cố định (để các ngày so sánh được với nhau)
+COINT_BREAK_PVALUE     = 0.10  # p-value từ ngưỡng này trở lên coi là không còn đồng tích hợp
+COINT_BREAK_PATIENCE   = 3     # Số lần đánh giá liên tiếp vượt ngưỡng mới gắn cờ
+
+# Chấm điểm hồi quy về trung bình của spread (MeanReversionScorer) khi chọn cặp:
+# PAIR_RANK_KEY = 'pvalue' (mặc định), 'half_life', 'hurst' hoặc 'crossing_rate';
+# lấy PAIR_RANK_POOL cặp p-value tốt nhất, bỏ cặp half-life > MR_MAX_HALF_LIFE hoặc Hurst >= MR_MAX_HURST
+PAIR_RANK_KEY    = 'pvalue'
+PAIR_RANK_POOL   = 50
+MR_MAX_HALF_LIFE = None   # Số phiên, VD: 60 (None = không lọc)
+MR_MAX_HURST     = None   # VD: 0.5 (None = không lọc)
+MR_HURST_MAX_LAG = 20     # Hurst tính trên các độ trễ τ = 2..MR_HURST_MAX_LAG
+
 # [QUAN TRỌNG] Cửa sổ trượt để tính Beta động (Rolling Beta)
 # Giúp hệ thống thích nghi khi mối quan hệ giữa 2 mã thay đổi
 ROLLING_WINDOW = 20   
 
+# Mô hình Beta động cho Spread: 'rolling' (Beta trượt theo ROLLING_WINDOW) hoặc 'kalman' (bộ lọc Kalman,
+# cập nhật O(1) mỗi phiên, trạng thái lưu trong file model lúc rebalance)
+SPREAD_MODEL   = 'rolling'
+KALMAN_DELTA   = 1e-4  # Tốc độ thay đổi của Beta (càng lớn Beta càng phản ứng nhanh)
+KALMAN_OBS_VAR = 1e-4  # Phương sai nhiễu quan sát (theo giá đã chia cho giá Y phiên đầu)
+
 # 
 # 5. MÔ HÌNH HỌC MÁY (MACHINE LEARNING - RANDOM FOREST)
 # 
@@ -66,6 +160,15 @@ LAG_DAYS        = 3
 # Số nhóm ngành muốn phân chia (Clustering)
 N_CLUSTERS      = 4   
 
+# Phân cụm thị trường (MarketCluster): 'kmeans' (KMeans trên returns.corr(), hợp với vài chục mã),
+# 'minibatch' (MiniBatchKMeans, tương quan tính theo khối float32) hoặc 'hierarchical'
+# (phân cụm thứ bậc trên khoảng cách tương quan, ma trận khoảng cách cache trong CLUSTER_CACHE_DIR,
+# chỉ giữ ma trận của lần chạy gần nhất; None = chỉ cache trong RAM)
+CLUSTER_METHOD     = 'kmeans'
+CLUSTER_COMPONENTS = None    # 'minibatch': số chiều embedding hạng thấp (VD: 20), None = dùng hàng ma trận tương quan
+CLUSTER_LINKAGE    = 'average'
+CLUSTER_CACHE_DIR  = 'data_cache/cluster'
+
 # Lãi suất phi rủi ro (để tính Sharpe Ratio, VD: Lãi suất trái phiếu CP)
 RISK_FREE_RATE  = 0.0
 # Đã hạ từ 2.0 xuống 0.5 để bắt được các biến động nhỏ (phù hợp với năm 2023)
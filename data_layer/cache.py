@@ -0,0 +1,85 @@
+import os
+import json
+import pandas as pd
+
+class PriceCache:
+    """
+    Kho lưu giá cục bộ dạng cột (Parquet), mỗi mã cổ phiếu là 1 file riêng.
+    DataLoader đọc kho này trước, chỉ tải thêm những phiên sau ngày cuối cùng đã lưu
+    (kèm vài phiên cuối để kiểm tra; giá quá khứ bị điều chỉnh lại thì tải lại và ghi đè toàn bộ bằng save).
+    """
+    def __init__(self, cache_dir='data_cache'):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # File phụ ghi lại mốc bắt đầu đã tải đủ của từng mã
+        # (tránh tải lại toàn bộ với mã niêm yết sau START_DATE)
+        self.meta_path = os.path.join(self.cache_dir, '_meta.json')
+        self.meta = self._read_meta()
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    def _path(self, ticker):
+        return os.path.join(self.cache_dir, f"{ticker}.parquet")
+
+    def load(self, ticker):
+        """Đọc dữ liệu đã lưu của 1 mã, trả về None nếu chưa có."""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            print(f"Lỗi đọc cache {ticker}: {e}")
+            return None
+        df.index = pd.to_datetime(df.index)
+        return df
+
+    def covers(self, ticker, start_date):
+        """Kiểm tra kho đã có dữ liệu từ start_date (hoặc sớm hơn) hay chưa."""
+        covered_from = self.meta.get(ticker)
+        if covered_from is None:
+            return False
+        if start_date is None:
+            return covered_from == 'min'
+        return covered_from == 'min' or pd.Timestamp(start_date) >= pd.Timestamp(covered_from)
+
+    def save(self, ticker, df):
+        """Ghi đè toàn bộ dữ liệu của 1 mã (ghi ra file tạm rồi đổi tên để tránh hỏng file)."""
+        path = self._path(ticker)
+        tmp_path = path + '.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def mark_covered(self, ticker, start_date):
+        """Ghi nhận kho đã có đủ dữ liệu của mã từ start_date (giữ mốc sớm nhất)."""
+        new_from = 'min' if start_date is None else str(pd.Timestamp(start_date).date())
+        old_from = self.meta.get(ticker)
+        if old_from == 'min':
+            return
+        if old_from is None or new_from == 'min' or new_from < old_from:
+            self.meta[ticker] = new_from
+            self._write_meta()
+
+    def append(self, ticker, new_df):
+        """Nối thêm các phiên mới vào dữ liệu đã lưu (trùng ngày thì lấy bản mới)."""
+        old_df = self.load(ticker)
+        if old_df is not None and not old_df.empty:
+            df = pd.concat([old_df, new_df])
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+        else:
+            df = new_df.sort_index()
+        self.save(ticker, df)
+        return df
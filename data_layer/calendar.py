@@ -0,0 +1,162 @@
+import os
+import numpy as np
+import pandas as pd
+
+GAP_POLICIES = ('drop', 'ffill', 'nan')
+_NS_PER_DAY = 86_400_000_000_000
+# Thư mục gốc của project: đường dẫn tương đối trong config (VD: HOLIDAY_FILE) tính từ đây, không theo cwd
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def resolve_path(path):
+    """Đường dẫn tuyệt đối của path (tương đối -> tính từ thư mục gốc project)."""
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+def local_days(index):
+    """Số thứ tự ngày (theo giờ địa phương của index) của từng dòng."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit('ns').asi8 // _NS_PER_DAY
+
+class TradingCalendar:
+    """
+    Lịch giao dịch của sàn (mặc định HOSE: Thứ 2 - Thứ 6, trừ các ngày nghỉ lễ).
+    - Ngày nghỉ đọc từ file cục bộ (mỗi dòng 1 ngày 'YYYY-MM-DD', dòng '#' là ghi chú).
+    - Có thể bổ sung ngày nghỉ suy ra từ dữ liệu: ngày làm việc mà KHÔNG mã nào có phiên.
+    Dùng để đồng bộ dữ liệu bằng 1 lần reindex thay vì lấy giao index của từng mã.
+    Tạo 1 lần (VD: mỗi DataProcessor) rồi dùng lại: các khoảng ngày giao dịch đã tính được cache trong _sessions.
+    """
+    def __init__(self, holidays=(), weekmask='1111100'):
+        days = pd.DatetimeIndex(list(holidays)).normalize().unique().sort_values()
+        self.holidays = days.values.astype('datetime64[D]')
+        self.weekmask = weekmask
+        self._sessions = {} # Cache {(ngày đầu, ngày cuối): mảng ngày giao dịch}
+
+    @classmethod
+    def from_file(cls, path, weekmask='1111100'):
+        """Đọc file ngày nghỉ (cột đầu tiên của mỗi dòng, bỏ dòng trống / ghi chú)."""
+        holidays = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    holidays.append(line.split(',')[0].strip())
+        return cls(pd.to_datetime(holidays), weekmask=weekmask)
+
+    @classmethod
+    def load(cls, path=None, observed_days=None, weekmask='1111100'):
+        """
+        Tạo lịch từ file ngày nghỉ (nếu có, đường dẫn tương đối tính từ thư mục gốc project)
+        + ngày nghỉ suy ra từ observed_days (mảng số thứ tự ngày có ít nhất 1 mã giao dịch, xem local_days()).
+        """
+        holidays = []
+        if path:
+            full_path = resolve_path(path)
+            if os.path.exists(full_path):
+                holidays = list(cls.from_file(full_path, weekmask).holidays)
+            else:
+                print(f"Cảnh báo: Không tìm thấy file ngày nghỉ '{full_path}', chỉ dùng ngày nghỉ suy ra từ dữ liệu.")
+        calendar = cls(holidays, weekmask=weekmask)
+        if observed_days is not None and len(observed_days):
+            calendar = calendar.with_inferred_holidays(observed_days)
+        return calendar
+
+    def with_inferred_holidays(self, observed_days):
+        """Thêm các ngày làm việc trong khoảng dữ liệu mà không có mã nào giao dịch."""
+        observed = np.unique(np.asarray(observed_days, dtype=np.int64)).astype('datetime64[D]')
+        weekdays = self._business_days(observed[0], observed[-1], holidays=np.array([], dtype='datetime64[D]'))
+        missing = np.setdiff1d(weekdays, observed, assume_unique=True)
+        return TradingCalendar(np.union1d(self.holidays, missing), weekmask=self.weekmask)
+
+    def save(self, path):
+        """Ghi danh sách ngày nghỉ ra file (có thể sửa tay rồi dùng lại)."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# Ngày nghỉ giao dịch (mỗi dòng 1 ngày YYYY-MM-DD)\n")
+            for day in self.holidays:
+                f.write(f"{day}\n")
+
+    def _business_days(self, first, last, holidays=None):
+        days = np.arange(first, last + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+        holidays = self.holidays if holidays is None else holidays
+        return days[np.is_busday(days, weekmask=self.weekmask, holidays=holidays)]
+
+    def session_days(self, first_day, last_day):
+        """Các ngày giao dịch trong [first_day, last_day] (số thứ tự ngày, int64)."""
+        key = (int(first_day), int(last_day))
+        if key not in self._sessions:
+            first, last = np.datetime64(key[0], 'D'), np.datetime64(key[1], 'D')
+            self._sessions[key] = self._business_days(first, last).astype(np.int64)
+        return self._sessions[key]
+
+    def observed_sessions(self, observed_days):
+        """
+        Các ngày giao dịch trong khoảng của observed_days (số thứ tự ngày, đã sắp xếp) có ít nhất 1 mã giao dịch,
+        tức lịch này + ngày nghỉ suy ra từ dữ liệu (như with_inferred_holidays) nhưng dùng lại cache của lịch.
+        """
+        observed = np.asarray(observed_days, dtype=np.int64)
+        days = self.session_days(observed[0], observed[-1])
+        return days[np.isin(days, observed)]
+
+    def sessions(self, start, end, tz=None):
+        """DatetimeIndex các ngày giao dịch trong [start, end]."""
+        days = self.session_days(local_days([pd.Timestamp(start)])[0], local_days([pd.Timestamp(end)])[0])
+        return self.days_to_index(days, tz)
+
+    @staticmethod
+    def days_to_index(days, tz=None):
+        index = pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[ns]'))
+        if tz is not None:
+            index = index.tz_localize(tz)
+        return index
+
+def align_panel_block(row_days, valid_rows, arrays, sessions, policies, max_gap):
+    """
+    Đồng bộ 1 khối ma trận (dòng theo ngày của dữ liệu) về lịch giao dịch bằng 1 lần reindex,
+    rồi áp dụng chính sách thiếu dữ liệu của từng mã (cột):
+    - 'drop' : ngày mã không có dữ liệu bị loại khỏi panel (như lấy giao index cũ)
+    - 'ffill': lấy giá trị phiên trước cho tối đa max_gap phiên thiếu liên tiếp
+               (Log_Return = 0), thiếu lâu hơn thì như 'drop'
+    - 'nan'  : giữ NaN, không làm mất ngày của các mã khác
+    :param row_days: số thứ tự ngày của từng dòng; valid_rows: ô có dữ liệu hợp lệ
+    :param sessions: số thứ tự các ngày giao dịch (đã sắp xếp)
+    Output: (present, aligned) - present[ngày, mã] = ô có giá trị sau khi áp dụng chính sách,
+            aligned = {trường: ma trận (phiên × mã)}, ô không có giá trị = NaN.
+    """
+    n_sessions, n_cols = len(sessions), valid_rows.shape[1]
+    pos = np.searchsorted(sessions, row_days)
+    in_calendar = pos < n_sessions
+    in_calendar[in_calendar] = sessions[pos[in_calendar]] == row_days[in_calendar]
+    src_rows, dst_rows = np.flatnonzero(in_calendar), pos[in_calendar]
+
+    present = np.zeros((n_sessions, n_cols), dtype=bool)
+    present[dst_rows] = valid_rows[src_rows]
+    aligned = {}
+    for f, values in arrays.items():
+        out = np.full((n_sessions, n_cols), np.nan)
+        out[dst_rows] = values[src_rows]
+        out[~present] = np.nan
+        aligned[f] = out
+
+    ffill_cols = np.array([p == 'ffill' for p in policies], dtype=bool)
+    if max_gap > 0 and ffill_cols.any():
+        row_ids = np.arange(n_sessions)[:, None]
+        last = np.maximum.accumulate(np.where(present, row_ids, -1), axis=0)
+        fill = ~present & (last >= 0) & (row_ids - last <= max_gap) & ffill_cols
+        if fill.any():
+            cols = np.broadcast_to(np.arange(n_cols), present.shape)
+            src = np.clip(last, 0, None)
+            for f, out in aligned.items():
+                # Không giao dịch -> giá giữ nguyên, lợi nhuận = 0
+                out[fill] = 0.0 if f == 'Log_Return' else out[src[fill], cols[fill]]
+            present = present | fill
+    return present, aligned
+
+def common_sessions(present, policies):
+    """Phiên được giữ: mọi mã không theo chính sách 'nan' đều có giá trị."""
+    constrained = np.array([p != 'nan' for p in policies], dtype=bool)
+    if not constrained.any():
+        return present.any(axis=1)
+    return present[:, constrained].all(axis=1)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Ước lượng RAM cần cho 1 ô (ngày × mã) khi xử lý 1 khối:
+# ~6 cột OHLCV gốc (pandas) + ~20 ma trận tạm float64 / bool của pipeline panel
+BYTES_PER_CELL = 8 * 32
+
+def estimate_block_size(start_date, end_date, memory_mb, n_rows=None):
+    """
+    Số mã tối đa trong 1 khối để bước xử lý không vượt quá memory_mb (MB).
+    Số phiên ước lượng bằng số ngày làm việc trong [start_date, end_date).
+    """
+    if n_rows is None:
+        end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp.today()
+        start = pd.Timestamp(start_date) if start_date is not None else end - pd.DateOffset(years=30)
+        n_rows = max(1, len(pd.bdate_range(start, end)))
+    return max(1, int(memory_mb * 1024 ** 2 // (n_rows * BYTES_PER_CELL)))
+
+class BlockSpill:
+    """
+    Kho tạm trên ổ đĩa cho lượt 1 của chế độ xử lý theo khối:
+    mỗi khối mã đã xử lý (chưa đồng bộ) được ghi ra file .npy rồi giải phóng khỏi RAM.
+    Đồng thời gom dần các ngày có giao dịch của mọi mã (để dựng lịch giao dịch ở lượt 2).
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.blocks = []   # [(danh sách mã, {trường: đường dẫn file})]
+        self.days = None   # Các ngày có ít nhất 1 mã giao dịch (số thứ tự ngày)
+        self.tz = None
+
+    def _path(self, i, name):
+        return os.path.join(self.directory, f"block_{i}_{name}.npy")
+
+    def add(self, block):
+        """Ghi 1 khối (kết quả DataProcessor._panel_steps) ra ổ đĩa."""
+        i = len(self.blocks)
+        row_days = block['row_days']
+        np.save(self._path(i, 'days'), row_days)
+        np.save(self._path(i, 'valid'), block['valid_rows'])
+        paths = {}
+        for j, (f, values) in enumerate(block['arrays'].items()):
+            paths[f] = self._path(i, f"f{j}")
+            np.save(paths[f], values)
+        self.blocks.append((block['tickers'], paths))
+
+        observed = row_days[block['valid_rows'].any(axis=1)]
+        if self.days is None:
+            self.days = observed
+            self.tz = block['tz']
+        else:
+            self.days = np.union1d(self.days, observed)
+
+    def tickers(self):
+        return [t for block_tickers, _ in self.blocks for t in block_tickers]
+
+    def fields(self):
+        """Các trường mà mọi khối đều có (giữ thứ tự của khối đầu tiên)."""
+        if not self.blocks:
+            return []
+        return [f for f in self.blocks[0][1] if all(f in paths for _, paths in self.blocks)]
+
+    def read(self, i, fields=()):
+        """
+        Đọc khối i: (danh sách mã, ngày của từng dòng, ô hợp lệ, {trường: ma trận memory-map}).
+        """
+        block_tickers, paths = self.blocks[i]
+        row_days = np.load(self._path(i, 'days'))
+        valid_rows = np.load(self._path(i, 'valid'))
+        arrays = {f: np.load(paths[f], mmap_mode='r') for f in fields}
+        return block_tickers, row_days, valid_rows, arrays
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,19 +1,151 @@
-import yfinance as yf
 import pandas as pd
 import os
+import csv
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .cache import PriceCache
+from .providers import YahooProvider
+import config
 
 class DataLoader:
     """lớp tải dữ liệu/ nhập dữ liệu"""
-    def __init__(self, start_date=None, end_date=None):
+    def __init__(self, start_date=None, end_date=None, cache_dir=None, offline=False,
+                 provider=None, batch_size=None, max_workers=None):
         """
         Khởi tạo DataLoader.
         :param start_date: 'YYYY-MM-DD'
         :param end_date: 'YYYY-MM-DD'
+        :param cache_dir: thư mục kho giá cục bộ (None = không dùng cache)
+        :param offline: True = chỉ đọc từ cache, không gọi Yahoo Finance
+        :param provider: nguồn dữ liệu (mặc định YahooProvider)
+        :param batch_size: số mã gộp trong 1 request (1 = tải từng mã như cũ)
+        :param max_workers: số luồng tải song song tối đa
         """
         self.start = start_date # ngày bắt đầu 
         self.end = end_date # ngày kết thúc
         self.tickers_data = {} # dict: key là tên cổ phiếu, value là dataFrame
-       
+        self.cache = PriceCache(cache_dir) if cache_dir else None
+        self.offline = offline
+        self.provider = provider if provider is not None else YahooProvider()
+        self.batch_size = batch_size or getattr(config, 'DOWNLOAD_BATCH_SIZE', 1)
+        self.max_workers = max_workers or getattr(config, 'DOWNLOAD_WORKERS', 1)
+        self.retries = getattr(config, 'DOWNLOAD_RETRIES', 3)
+        self.backoff = getattr(config, 'DOWNLOAD_BACKOFF', 1.0)
+        self.overlap = max(1, getattr(config, 'CACHE_OVERLAP_BARS', 5))
+        self.revision_tol = getattr(config, 'CACHE_REVISION_TOL', 1e-3)
+
+    def _fetch_batch(self, tickers, start, end):
+        """Tải 1 nhóm mã, thử lại với thời gian chờ tăng dần (exponential backoff) khi lỗi."""
+        for attempt in range(self.retries):
+            try:
+                return self.provider.fetch(tickers, start, end)
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    print(f"Lỗi tải {tickers}: {str(e)}")
+                    return {}
+                wait = self.backoff * (2 ** attempt)
+                print(f"Lỗi tải {tickers}, thử lại sau {wait:.1f}s: {str(e)}")
+                time.sleep(wait)
+        return {}
+
+    def _slice(self, df):
+        """Cắt dữ liệu theo [start, end) giống quy ước của yf.download."""
+        if self.start is not None:
+            df = df[df.index >= pd.Timestamp(self.start)]
+        if self.end is not None:
+            df = df[df.index < pd.Timestamp(self.end)]
+        return df
+
+    def _plan_fetch(self, ticker):
+        """
+        Xác định cần tải mã từ ngày nào.
+        Trả về (ngày bắt đầu tải hoặc None nếu không cần tải, dữ liệu cache).
+        """
+        if self.cache is None:
+            return self.start, None
+
+        cached = None
+        if self.cache.covers(ticker, self.start):
+            cached = self.cache.load(ticker)
+
+        if cached is not None and not cached.empty:
+            # Chỉ tải phần còn thiếu (từ ngày sau phiên cuối cùng), kèm lại overlap phiên cuối đã lưu
+            # để phát hiện nhà cung cấp điều chỉnh lại giá quá khứ (chia cổ tức, tách cổ phiếu)
+            next_day = cached.index[-1] + pd.Timedelta(days=1)
+            need_fetch = not self.offline and (
+                self.end is None or next_day < pd.Timestamp(self.end)
+            )
+            fetch_start = cached.index[-min(self.overlap, len(cached))]
+            return (fetch_start.strftime('%Y-%m-%d') if need_fetch else None), cached
+
+        if self.offline:
+            return None, None
+        # Chưa có cache (hoặc cache không đủ xa về quá khứ) -> tải toàn bộ
+        return self.start, None
+
+    def _revised(self, cached, new_df):
+        """
+        So các phiên trùng nhau giữa cache và bản vừa tải ('Adj Close', 'Close').
+        True nếu lệch tương đối quá revision_tol -> nhà cung cấp đã điều chỉnh lại lịch sử giá.
+        """
+        if cached is None or new_df is None or new_df.empty:
+            return False
+        common = cached.index.intersection(new_df.index)
+        cols = [c for c in ('Adj Close', 'Close') if c in cached.columns and c in new_df.columns]
+        if len(common) == 0 or not cols:
+            return False
+        old = cached.loc[common, cols].to_numpy(dtype='float64')
+        new = new_df.loc[common, cols].to_numpy(dtype='float64')
+        diff = abs(new - old) / abs(old).clip(min=1e-12)
+        return bool((diff[(old == old) & (new == new)] > self.revision_tol).any())
+
+    def _merge_fetched(self, ticker, fetch_start, cached, new_df):
+        """Nối dữ liệu mới tải vào cache (nếu có) và cắt theo khoảng thời gian yêu cầu."""
+        if self.cache is None:
+            return new_df if new_df is not None else pd.DataFrame()
+
+        if new_df is not None and not new_df.empty:
+            df = self.cache.append(ticker, new_df)
+            if cached is None:
+                self.cache.mark_covered(ticker, self.start)
+            else:
+                print(f"Đã bổ sung {ticker}: +{len(new_df.index.difference(cached.index))} dòng mới.")
+        elif cached is not None:
+            # Không có phiên mới / mạng lỗi -> dùng tạm dữ liệu cache
+            df = cached
+        else:
+            return pd.DataFrame()
+        return self._slice(df)
+
+    def _replace_revised(self, ticker, cached, full_df):
+        """Ghi đè cache bằng lịch sử vừa tải lại; tải lỗi thì dùng tạm cache cũ (vẫn cùng 1 mốc điều chỉnh)."""
+        if full_df is None or full_df.empty:
+            print(f"Cảnh báo: không tải lại được lịch sử {ticker}, dùng tạm dữ liệu cache cũ.")
+            return self._slice(cached)
+        full_df = full_df.sort_index()
+        self.cache.save(ticker, full_df)
+        print(f"Đã tải lại {ticker}: {len(full_df)} dòng (ghi đè cache).")
+        return self._slice(full_df)
+
+    def _fetch_groups(self, groups):
+        """Chia {ngày bắt đầu tải: [mã]} thành các batch và tải song song (giới hạn số luồng)."""
+        batches = []
+        for fetch_start, group in groups.items():
+            for i in range(0, len(group), self.batch_size):
+                batches.append((group[i:i + self.batch_size], fetch_start))
+
+        fetched = {}
+        if self.max_workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._fetch_batch, b, s, self.end) for b, s in batches]
+                for fut in futures:
+                    fetched.update(fut.result())
+        else:
+            for b, s in batches:
+                fetched.update(self._fetch_batch(b, s, self.end))
+        return fetched
+
     def download_data(self, tickers: list):
         print(f"Đang tải dữ liệu: {tickers}...")
 
@@ -21,22 +153,44 @@ class DataLoader:
         if isinstance(tickers, str):
             tickers = [tickers]
 
-        # duyệt tải từng cổ phiếu
+        # 1. Lập kế hoạch: gom các mã có cùng ngày bắt đầu tải vào chung 1 nhóm
+        plans = {}
+        groups = {}
+        for t in tickers:
+            fetch_start, cached = self._plan_fetch(t)
+            plans[t] = (fetch_start, cached)
+            if fetch_start is not None or cached is None:
+                if not self.offline:
+                    groups.setdefault(fetch_start, []).append(t)
+
+        # 2. Chia nhóm thành các batch và tải song song (giới hạn số luồng)
+        fetched = self._fetch_groups(groups)
+
+        # 3. Phiên trùng (overlap) lệch với cache -> lịch sử giá đã bị điều chỉnh lại:
+        #    tải lại toàn bộ lịch sử của mã đó (từ mốc cache đang phủ) và ghi đè thay vì nối thêm
+        revised = {}
+        for t in tickers:
+            fetch_start, cached = plans[t]
+            if self._revised(cached, fetched.get(t)):
+                covered_from = self.cache.meta.get(t)
+                full_start = None if covered_from == 'min' else covered_from
+                print(f"Giá quá khứ của {t} đã được điều chỉnh lại (chia cổ tức / tách cổ phiếu), tải lại toàn bộ lịch sử...")
+                revised.setdefault(full_start, []).append(t)
+        refetched = self._fetch_groups(revised) if revised else {}
+
+        # 4. Gộp với cache và cập nhật tickers_data (giữ thứ tự mã như đầu vào)
+        revised = {t for group in revised.values() for t in group}
         for t in tickers:
             try:
-                # auto_adjust=False: Giữ nguyên giá Close và Adj Close gốc
-                df = yf.download(t, start=self.start, end=self.end, auto_adjust=False, progress=False)
+                fetch_start, cached = plans[t]
+                if t in revised:
+                    df = self._replace_revised(t, cached, refetched.get(t))
+                else:
+                    df = self._merge_fetched(t, fetch_start, cached, fetched.get(t))
                 
                 if df.empty:
                     print(f"Không có dữ liệu: {t}")
                     continue
-                
-                # Đảm bảo index là Datetime chuẩn
-                df.index = pd.to_datetime(df.index)
-                
-                # Nếu yfinance trả về MultiIndex (VD: Price, Ticker) thì biến đổi thành index đơn
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.get_level_values(0)
 
                 # cập nhật cổ phiếu
                 self.tickers_data[t] = df
@@ -46,6 +200,21 @@ class DataLoader:
         
         return self.tickers_data
 
+    def iter_blocks(self, tickers: list, block_size):
+        """
+        Tải (hoặc đọc cache) lần lượt từng khối block_size mã, trả về từng dict {Mã: DataFrame}.
+        Dữ liệu khối trước không được giữ lại trong tickers_data (dùng cho xử lý theo khối).
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+
+        for i in range(0, len(tickers), block_size):
+            self.tickers_data = {}
+            block = self.download_data(tickers[i:i + block_size])
+            yield block
+            del block
+        self.tickers_data = {}
+
     def load_data(self, ticker, file_path):
         """đọc dữ liệu file từ máy, hỗ trợ đuôi csv, xlxs, xls"""
         # lấy phần mở rộng của đường dẫn 
@@ -53,7 +222,7 @@ class DataLoader:
         try:
             if ext == ".csv":
                 df = pd.read_csv(file_path, parse_dates=True, index_col=0)
-            elif ext in ['.xlsx', 'xls']:
+            elif ext in ['.xlsx', '.xls']:
                 df = pd.read_excel(file_path, parse_dates=True, index_col=0)
             else:
                 raise ValueError("Unsupported format")
@@ -61,9 +230,78 @@ class DataLoader:
         except Exception as e:
             print(f"Error: {e}")
 
+    def _read_price_file(self, file_path):
+        """
+        Đọc nhanh 1 file giá: chỉ lấy cột ngày + 'Adj Close'/'Close', kiểu float64 cố định.
+        CSV đọc bằng pyarrow (đa luồng, không phải đoán kiểu dữ liệu từng cột).
+        Trả về (Mã, DataFrame) - Mã lấy theo tên file, VD: 'VCB.VN.csv' -> 'VCB.VN'.
+        """
+        name, ext = os.path.splitext(os.path.basename(file_path))
+        ext = ext.lower()
+        try:
+            # Đọc dòng tiêu đề để biết tên cột (cột đầu tiên là ngày)
+            if ext == '.csv':
+                with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                    header = next(csv.reader(f))
+            elif ext in ['.xlsx', '.xls']:
+                header = list(pd.read_excel(file_path, nrows=0).columns)
+            else:
+                raise ValueError("Unsupported format")
+
+            date_col = header[0]
+            price_cols = [c for c in ('Adj Close', 'Close') if c in header]
+            if not price_cols:
+                raise ValueError("Không có cột 'Adj Close'/'Close'")
+
+            if ext == '.csv':
+                import pyarrow as pa
+                import pyarrow.csv as pacsv
+                # Gọi thẳng pyarrow.csv (nhanh hơn engine='pyarrow' của pandas vì bỏ bước ép kiểu lại)
+                table = pacsv.read_csv(file_path, convert_options=pacsv.ConvertOptions(
+                    include_columns=[date_col] + price_cols,
+                    column_types={c: pa.float64() for c in price_cols}
+                ))
+                df = table.to_pandas()
+            else:
+                df = pd.read_excel(
+                    file_path, usecols=[date_col] + price_cols,
+                    dtype={c: 'float64' for c in price_cols}
+                )
+
+            df = df.set_index(date_col)
+            df.index = pd.to_datetime(df.index)
+            df.index.name = None
+            return name, df.sort_index()
+        except Exception as e:
+            print(f"Lỗi đọc {file_path}: {e}")
+            return name, None
+
+    def load_directory(self, path, pattern='*.csv', max_workers=None):
+        """
+        Nạp song song cả thư mục file giá (VD: file dump hằng đêm của nhà cung cấp).
+        Mỗi file là 1 mã, kết quả được cập nhật 1 lần vào tickers_data.
+        :param pattern: mẫu tên file, VD '*.csv', '*.xlsx'
+        :param max_workers: số luồng đọc song song (mặc định theo config.LOAD_WORKERS)
+        """
+        files = sorted(glob.glob(os.path.join(path, pattern)))
+        if not files:
+            print(f"Không tìm thấy file nào khớp '{pattern}' trong {path}")
+            return self.tickers_data
+
+        max_workers = max_workers or getattr(config, 'LOAD_WORKERS', 8)
+        print(f"Đang nạp {len(files)} file từ {path}...")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(self._read_price_file, files))
+
+        loaded = {t: df for t, df in results if df is not None and not df.empty}
+        self.tickers_data.update(loaded)
+        print(f"Đã nạp {len(loaded)}/{len(files)} mã.")
+        return self.tickers_data
+
     def get_fundamental_info(self, ticker):
         """lấy thông tin của cổ phiếu"""
         try:
+            import yfinance as yf
             t = yf.Ticker(ticker)
             return t.info
         except:
@@ -0,0 +1,169 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+class PricePanel:
+    """
+    Bảng giá đã đồng bộ dạng ma trận (ngày × mã).
+    - Mỗi trường (Adj Close, Log_Return...) là 1 mảng 2D float liên tục.
+    - Dùng chung 1 index ngày và 1 index mã cho mọi trường.
+    - Lưu theo thứ tự cột (Fortran) nên chuỗi giá của 1 mã nằm liền nhau,
+      các bước sau (phân cụm, quét cặp, tính chỉ báo) lấy view theo cột mà không phải copy.
+    """
+    def __init__(self, dates, tickers, fields: dict, dtype=np.float64):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(list(tickers))
+        self.dtype = np.dtype(dtype)
+        self._pos = {t: i for i, t in enumerate(self.tickers)}
+
+        self.fields = {}
+        for name, values in fields.items():
+            arr = np.asfortranarray(values, dtype=self.dtype)
+            if arr.shape != (len(self.dates), len(self.tickers)):
+                raise ValueError(f"Trường '{name}' có kích thước {arr.shape}, cần {(len(self.dates), len(self.tickers))}")
+            self.fields[name] = arr
+
+    @classmethod
+    def from_dict(cls, data_dict: dict, fields=('Adj Close', 'Log_Return'), dtype=np.float64):
+        """
+        Tạo panel từ dict {Mã: DataFrame} (kết quả của DataProcessor._align_data).
+        Chỉ giữ các trường cần dùng để tiết kiệm bộ nhớ.
+        Nếu index các mã chưa khớp nhau thì lấy giao các ngày chung.
+        """
+        tickers = [t for t, df in data_dict.items() if not df.empty]
+        if not tickers:
+            return cls(pd.DatetimeIndex([]), [], {}, dtype=dtype)
+
+        common_index = data_dict[tickers[0]].index
+        for t in tickers[1:]:
+            if not data_dict[t].index.equals(common_index):
+                common_index = common_index.intersection(data_dict[t].index)
+
+        # Chỉ lấy những trường mà mọi mã đều có
+        if fields is None:
+            fields = list(data_dict[tickers[0]].columns)
+        fields = [f for f in fields if all(f in data_dict[t].columns for t in tickers)]
+
+        arrays = {}
+        for f in fields:
+            arr = np.empty((len(common_index), len(tickers)), dtype=dtype, order='F')
+            for j, t in enumerate(tickers):
+                col = data_dict[t][f]
+                if not col.index.equals(common_index):
+                    col = col.loc[common_index]
+                arr[:, j] = col.to_numpy(dtype=dtype)
+            arrays[f] = arr
+
+        return cls(common_index, tickers, arrays, dtype=dtype)
+
+    # --- Truy cập dạng dict để tương thích với code cũ ({Mã: DataFrame}) ---
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._pos
+
+    def __iter__(self):
+        return iter(self.tickers)
+
+    def keys(self):
+        return list(self.tickers)
+
+    def items(self):
+        return ((t, self[t]) for t in self.tickers)
+
+    def __getitem__(self, ticker):
+        return self.ticker_frame(ticker)
+
+    # --- Lấy dữ liệu không copy ---
+    def column(self, ticker, field='Adj Close'):
+        """View 1D (không copy) chuỗi giá trị của 1 mã."""
+        return self.fields[field][:, self._pos[ticker]]
+
+    def series(self, ticker, field='Adj Close'):
+        """pd.Series bọc quanh view của 1 mã."""
+        return pd.Series(self.column(ticker, field), index=self.dates, name=ticker, copy=False)
+
+    def frame(self, field='Adj Close'):
+        """DataFrame (ngày × mã) của 1 trường, dùng chung bộ nhớ với panel."""
+        return pd.DataFrame(self.fields[field], index=self.dates, columns=self.tickers, copy=False)
+
+    def ticker_frame(self, ticker, fields=None):
+        """DataFrame các trường của 1 mã (giống 1 phần tử trong dict cũ)."""
+        fields = fields or list(self.fields)
+        return pd.DataFrame({f: self.column(ticker, f) for f in fields}, index=self.dates)
+
+    def pair_arrays(self, t1, t2, field='Adj Close'):
+        """
+        Lấy 2 chuỗi của 1 cặp mã, bỏ các ngày bị NaN ở 1 trong 2 mã.
+        Nếu không có NaN thì trả về view, không ghép/copy như pd.concat(...).dropna().
+        """
+        s1 = self.column(t1, field)
+        s2 = self.column(t2, field)
+        mask = np.isfinite(s1) & np.isfinite(s2)
+        if mask.all():
+            return s1, s2
+        return s1[mask], s2[mask]
+
+    def subset(self, tickers):
+        """Panel con chỉ gồm các mã được chọn (VD: các mã trong 1 cụm)."""
+        idx = [self._pos[t] for t in tickers]
+        fields = {f: arr[:, idx] for f, arr in self.fields.items()}
+        return PricePanel(self.dates, [self.tickers[i] for i in idx], fields, dtype=self.dtype)
+
+    def to_dict(self, fields=None):
+        """Chuyển ngược về dict {Mã: DataFrame}."""
+        return {t: self.ticker_frame(t, fields) for t in self.tickers}
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in self.fields.values())
+
+    # --- Lưu trên ổ đĩa (mỗi trường 1 file .npy, mở lại bằng memory-map) ---
+    @staticmethod
+    def field_path(directory, i):
+        return os.path.join(directory, f"field_{i}.npy")
+
+    def save(self, directory):
+        """Ghi panel ra thư mục: meta.json (mã, trường, dtype, múi giờ) + dates.npy + field_<i>.npy."""
+        os.makedirs(directory, exist_ok=True)
+        for i, arr in enumerate(self.fields.values()):
+            out = np.lib.format.open_memmap(
+                self.field_path(directory, i), mode='w+', dtype=self.dtype, shape=arr.shape, fortran_order=True
+            )
+            out[:] = arr
+            out.flush()
+            del out
+        self.write_meta(directory, self.dates.tz, self.dates.as_unit('ns').asi8, list(self.tickers),
+                        list(self.fields), self.dtype)
+
+    @staticmethod
+    def write_meta(directory, tz, dates_ns, tickers, fields, dtype):
+        """Ghi phần mô tả của panel (dùng chung cho save() và chế độ xử lý theo khối)."""
+        np.save(os.path.join(directory, 'dates.npy'), np.asarray(dates_ns, dtype=np.int64))
+        meta = {
+            'tickers': list(tickers),
+            'fields': list(fields),
+            'dtype': np.dtype(dtype).name,
+            'tz': str(tz) if tz is not None else None,
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Mở panel đã lưu. mmap_mode='r': dữ liệu nằm trên ổ đĩa, chỉ các cột được truy cập
+        mới được nạp vào RAM (None = đọc toàn bộ vào RAM).
+        """
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        dates = pd.DatetimeIndex(np.load(os.path.join(directory, 'dates.npy')).astype('datetime64[ns]'))
+        if meta['tz'] is not None:
+            dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+        fields = {
+            name: np.load(cls.field_path(directory, i), mmap_mode=mmap_mode)
+            for i, name in enumerate(meta['fields'])
+        }
+        return cls(dates, meta['tickers'], fields, dtype=meta['dtype'])
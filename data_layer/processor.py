@@ -1,8 +1,12 @@
+import os
 import numpy as np
 import pandas as pd
-import scipy.stats as stats
-from statsmodels.tsa.stattools import adfuller
 import config  # Lấy tham số cấu hình (OUTLIER_THRESH)
+from .panel import PricePanel
+from .chunked import BlockSpill
+from .calendar import TradingCalendar, GAP_POLICIES, align_panel_block, common_sessions, local_days
+from .stationarity import StationarityChecker
+from .streaming import StreamState
 
 class DataProcessor:
     """
@@ -12,8 +16,27 @@ class DataProcessor:
     3. Lọc nhiễu (Denoising): Kẹp giá trị (Winsorization).
     4. Đồng bộ (Alignment): Cắt dữ liệu theo khung thời gian chung.
     """
-    def __init__(self):
-        pass
+    def __init__(self, adf_mode=None):
+        """
+        :param adf_mode: chế độ kiểm tra tính dừng (mặc định theo config.ADF_MODE)
+            - 'eager': chạy ADF ngay trong process_all (có cache + chạy song song)
+            - 'lazy' : chỉ chạy khi gọi stationarity_report()
+            - 'off'  : bỏ qua hoàn toàn
+        """
+        self.adf_mode = adf_mode or getattr(config, 'ADF_MODE', 'eager')
+        self.stationarity = StationarityChecker()
+        self._pending_adf = {} # {Mã: chuỗi Log Return} chờ kiểm tra
+        self.adf_results = {}  # {Mã: p-value} đã kiểm tra
+
+        # Trạng thái cho chế độ streaming (append_bar)
+        self._streams = {}        # {Mã: StreamState}
+
+        # Lịch giao dịch (đọc HOLIDAY_FILE 1 lần, dùng lại cho mọi lần đồng bộ) + chính sách xử lý ngày thiếu dữ liệu
+        self.holiday_file = getattr(config, 'HOLIDAY_FILE', None)
+        self.calendar = TradingCalendar.load(self.holiday_file)
+        self.gap_policy = getattr(config, 'GAP_POLICY', 'drop')
+        self.gap_overrides = getattr(config, 'GAP_POLICIES', {})
+        self.max_gap = getattr(config, 'GAP_MAX_FILL', 0)
 
     def _fill_missing_values(self, df):
         """
@@ -64,59 +87,366 @@ class DataProcessor:
         df[col_name] = series.clip(lower=lower_bound, upper=upper_bound)
         return df
 
-    def _check_stationarity(self, df, col_name='Log_Return'):
+    def _queue_stationarity(self, ticker, values):
+        """Đưa chuỗi vào hàng chờ ADF (theo adf_mode)."""
+        if self.adf_mode == 'off':
+            return
+        self._pending_adf[ticker] = values
+
+    def stationarity_report(self, col_name='Log_Return'):
         """
-        Kiểm tra tính dừng (ADF Test).
-        Chỉ in ra cảnh báo để User biết, không chặn luồng chạy.
-        Kết quả mong đợi: chuỗi dừng vì log_return đã được diff
+        Chạy ADF cho các mã đang chờ (đọc cache trước, phần còn thiếu chạy song song)
+        và in cảnh báo như cũ. Trả về dict {Mã: p-value}.
         """
-        if col_name not in df.columns: return
+        if self._pending_adf:
+            results = self.stationarity.check_many(self._pending_adf)
+            self._pending_adf = {}
+            for ticker, p_value in results.items():
+                if p_value is not None and p_value > 0.05:
+                    print(f"Cảnh báo: {col_name} của {ticker} có thể KHÔNG DỪNG (p-value={p_value:.4f})")
+            self.adf_results.update(results)
+        return self.adf_results
 
-        try:
-            result = adfuller(df[col_name].dropna())
-            p_value = result[1]
-            if p_value > 0.05:
-                print(f"Cảnh báo: {col_name} có thể KHÔNG DỪNG (p-value={p_value:.4f})")
-        except Exception:
-            pass # Bỏ qua nếu lỗi tính toán (dữ liệu quá ngắn)
+    def _gap_policies(self, tickers, policy=None):
+        """Chính sách thiếu dữ liệu của từng mã (GAP_POLICIES ghi đè GAP_POLICY chung)."""
+        policies = [policy or self.gap_overrides.get(t, self.gap_policy) for t in tickers]
+        for t, p in zip(tickers, policies):
+            if p not in GAP_POLICIES:
+                raise ValueError(f"Chính sách thiếu dữ liệu '{p}' của {t} không hợp lệ, chọn 1 trong {GAP_POLICIES}")
+        return policies
 
-    def _align_data(self, data_dict):
+    def _sessions(self, observed_days):
+        """Phiên giao dịch trong khoảng dữ liệu: trừ ngày nghỉ trong HOLIDAY_FILE và ngày không mã nào có phiên."""
+        return self.calendar.observed_sessions(observed_days)
+
+    def _align_data(self, data_dict, policy=None):
         """
-        Đồng bộ thời gian giữa các mã.
-        Chỉ giữ lại những ngày mà TẤT CẢ các mã đều có dữ liệu.
+        Đồng bộ thời gian giữa các mã: reindex từng mã theo lịch giao dịch chung (1 lần, O(số dòng)),
+        ngày thiếu dữ liệu xử lý theo chính sách của từng mã (xem calendar.align_panel_block).
+        Chỉ giữ lại những ngày mà các mã (trừ mã theo chính sách 'nan') đều có dữ liệu.
+        :param policy: ép 1 chính sách cho mọi mã (VD: 'drop' = giao index như cũ)
         """
         if not data_dict: return {}
 
-        # Tìm giao (Intersection) của index
-        common_index = None
-        valid_tickers = []
-
-        for ticker, df in data_dict.items():
-            if df.empty: continue
-            if common_index is None:
-                common_index = df.index
-            else:
-                common_index = common_index.intersection(df.index)
-            valid_tickers.append(ticker)
-        
-        if common_index is None or len(common_index) == 0:
+        valid_tickers = [t for t, df in data_dict.items() if not df.empty]
+        if not valid_tickers:
             print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
             return {}
 
-        # Cắt dữ liệu theo index chung
+        row_days = {t: local_days(data_dict[t].index) for t in valid_tickers}
+        observed = np.unique(np.concatenate(list(row_days.values())))
+        sessions = self._sessions(observed)
+        policies = self._gap_policies(valid_tickers, policy)
+
+        present = np.zeros((len(sessions), len(valid_tickers)), dtype=bool)
+        aligned = {}
+        for j, t in enumerate(valid_tickers):
+            df = data_dict[t]
+            arrays = {c: df[c].to_numpy(dtype=np.float64)[:, None] for c in df.columns}
+            valid_rows = df.notna().all(axis=1).to_numpy()[:, None]
+            col_present, aligned[t] = align_panel_block(
+                row_days[t], valid_rows, arrays, sessions, policies[j:j + 1], self.max_gap
+            )
+            present[:, j] = col_present[:, 0]
+
+        common_rows = common_sessions(present, policies)
+        if not common_rows.any():
+            print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
+            return {}
+
+        # Cắt dữ liệu theo lịch chung
+        common_index = TradingCalendar.days_to_index(sessions[common_rows], data_dict[valid_tickers[0]].index.tz)
         aligned_dict = {}
         for t in valid_tickers:
-            aligned_dict[t] = data_dict[t].loc[common_index].copy()
+            aligned_dict[t] = pd.DataFrame(
+                {c: values[common_rows, 0] for c, values in aligned[t].items()}, index=common_index
+            )
             
         print(f"Đã đồng bộ dữ liệu: {len(common_index)} phiên giao dịch chung.")
         return aligned_dict
 
-    def process_all(self, raw_data_dict: dict) -> dict:
+    # ------------------------------------------------------------------
+    # CHẾ ĐỘ PANEL: xử lý toàn bộ thị trường bằng phép toán ma trận 2D
+    # (cùng kết quả với pipeline từng mã, nhưng không lặp + copy DataFrame)
+    # ------------------------------------------------------------------
+    def _stack_field(self, series_dict, tickers, row_positions, n_rows):
+        """Ghép chuỗi của mọi mã thành ma trận (ngày hợp × mã), ô không có dòng = NaN."""
+        values = np.full((n_rows, len(tickers)), np.nan)
+        for j, t in enumerate(tickers):
+            values[row_positions[t], j] = series_dict[t].to_numpy(dtype=np.float64)
+        return values
+
+    def _fill_missing_panel(self, values, own_rows, time_values):
+        """
+        Nội suy tuyến tính theo thời gian trên cả ma trận (tương đương interpolate('time',
+        limit_direction='both') + ffill/bfill của từng mã).
+        Chỉ dùng các dòng thực có của từng mã làm điểm nội suy.
+        """
+        n_rows = values.shape[0]
+        valid = ~np.isnan(values) & own_rows
+        row_ids = np.arange(n_rows)[:, None]
+
+        # Vị trí dòng hợp lệ gần nhất phía trước / phía sau của từng ô
+        prev_idx = np.maximum.accumulate(np.where(valid, row_ids, -1), axis=0)
+        next_idx = np.minimum.accumulate(np.where(valid, row_ids, n_rows)[::-1], axis=0)[::-1]
+
+        has_prev = prev_idx >= 0
+        has_next = next_idx < n_rows
+        cols = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+        y_prev = np.where(has_prev, values[np.clip(prev_idx, 0, n_rows - 1), cols], np.nan)
+        y_next = np.where(has_next, values[np.clip(next_idx, 0, n_rows - 1), cols], np.nan)
+        t = time_values[:, None]
+        t_prev = time_values[np.clip(prev_idx, 0, n_rows - 1)]
+        t_next = time_values[np.clip(next_idx, 0, n_rows - 1)]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slope = (y_next - y_prev) / (t_next - t_prev)
+            interp = slope * (t - t_prev) + y_prev
+
+        filled = np.where(valid, values, interp)
+        # Đầu chuỗi (không có điểm trước) / cuối chuỗi (không có điểm sau) -> lấy điểm gần nhất
+        filled = np.where(~valid & ~has_prev, y_next, filled)
+        filled = np.where(~valid & ~has_next & has_prev, y_prev, filled)
+        return filled
+
+    def _log_returns_panel(self, prices, own_rows):
+        """Log Return theo dòng thực có liền trước của từng mã: R_t = ln(P_t / P_{t-1})."""
+        n_rows = prices.shape[0]
+        row_ids = np.arange(n_rows)[:, None]
+        last_own = np.maximum.accumulate(np.where(own_rows, row_ids, -1), axis=0)
+        prev_own = np.vstack([np.full((1, prices.shape[1]), -1), last_own[:-1]])
+
+        cols = np.broadcast_to(np.arange(prices.shape[1]), prices.shape)
+        prev_price = np.where(prev_own >= 0, prices[np.clip(prev_own, 0, None), cols], np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            log_ret = np.log(prices / prev_price)
+        log_ret[~own_rows] = np.nan
+        return log_ret
+
+    def _winsorize_panel(self, log_ret, valid_rows, threshold=3.0):
+        """Z-score Clipping cho mọi mã cùng lúc (mean/std riêng từng mã)."""
+        masked = np.where(valid_rows, log_ret, 0.0)
+        count = valid_rows.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = masked.sum(axis=0) / count
+            dev = np.where(valid_rows, log_ret - mean, 0.0)
+            std = np.sqrt((dev ** 2).sum(axis=0) / (count - 1))
+        std = np.where(count > 1, std, np.nan)
+
+        upper_bound = mean + threshold * std
+        lower_bound = mean - threshold * std
+        # fmax/fmin bỏ qua biên NaN (giống Series.clip khi std không xác định)
+        return np.fmin(np.fmax(log_ret, lower_bound), upper_bound)
+
+    def _panel_steps(self, raw_data_dict: dict, fields):
+        """
+        Các bước độc lập theo từng mã của pipeline panel: Fill NA -> Log Return -> Lọc Nhiễu
+        -> Check Dừng, trên lịch hợp của các mã đầu vào (chưa đồng bộ).
+        Trả về dict: tickers, union_ns (ngày hợp dạng int ns), row_days (số thứ tự ngày), tz,
+        valid_rows (ô có Log Return hợp lệ), arrays {trường: ma trận đã xử lý}.
+        Trả về None nếu không còn mã hợp lệ.
+        """
+        # Mã hợp lệ: có dữ liệu, có cột giá, không có cột nào rỗng hoàn toàn
+        # (pipeline từng mã sẽ dropna hết các dòng của mã đó)
+        tickers, price_cols = [], {}
+        for ticker, df in raw_data_dict.items():
+            if df.empty:
+                continue
+            price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+            if price_col not in df.columns or df.isna().all().any():
+                continue
+            tickers.append(ticker)
+            price_cols[ticker] = price_col
+
+        if not tickers:
+            return None
+
+        # Lịch hợp của mọi mã + vị trí dòng của từng mã trong lịch hợp
+        dates_ns = {t: pd.DatetimeIndex(raw_data_dict[t].index).as_unit('ns').asi8 for t in tickers}
+        union_ns = np.unique(np.concatenate(list(dates_ns.values())))
+        tz = pd.DatetimeIndex(raw_data_dict[tickers[0]].index).tz
+        time_values = union_ns.astype(np.float64)
+        row_positions = {t: np.searchsorted(union_ns, dates_ns[t]) for t in tickers}
+
+        own_rows = np.zeros((len(union_ns), len(tickers)), dtype=bool)
+        for j, t in enumerate(tickers):
+            own_rows[row_positions[t], j] = True
+
+        # Giá dùng tính Log Return (Adj Close, nếu không có thì Close)
+        price_series = {t: raw_data_dict[t][price_cols[t]] for t in tickers}
+        prices = self._stack_field(price_series, tickers, row_positions, len(union_ns))
+        prices = self._fill_missing_panel(prices, own_rows, time_values)
+
+        log_ret = self._log_returns_panel(prices, own_rows)
+        valid_rows = own_rows & ~np.isnan(log_ret)
+        log_ret = self._winsorize_panel(log_ret, valid_rows, threshold=config.OUTLIER_THRESH)
+
+        # Kiểm tra tính dừng (Optional check)
+        for j, t in enumerate(tickers):
+            if valid_rows[:, j].any():
+                self._queue_stationarity(t, log_ret[valid_rows[:, j], j])
+
+        # Bỏ các mã không còn dòng hợp lệ nào
+        keep_cols = valid_rows.any(axis=0)
+        kept_tickers = [t for t, k in zip(tickers, keep_cols) if k]
+        if not kept_tickers:
+            return None
+
+        arrays = {}
+        for f in fields:
+            if f == 'Log_Return':
+                arrays[f] = log_ret[:, keep_cols]
+            elif all(f in raw_data_dict[t].columns for t in kept_tickers):
+                values = self._stack_field(
+                    {t: raw_data_dict[t][f] for t in kept_tickers}, kept_tickers, row_positions, len(union_ns)
+                )
+                arrays[f] = self._fill_missing_panel(values, own_rows[:, keep_cols], time_values)
+
+        return {
+            'tickers': kept_tickers,
+            'union_ns': union_ns,
+            'row_days': local_days(self._to_index(union_ns, tz)),
+            'tz': tz,
+            'valid_rows': valid_rows[:, keep_cols],
+            'arrays': arrays,
+        }
+
+    @staticmethod
+    def _to_index(dates_ns, tz):
+        """Chuyển mảng ngày int ns về DatetimeIndex (giữ múi giờ nếu có)."""
+        index = pd.DatetimeIndex(np.asarray(dates_ns, dtype=np.int64).astype('datetime64[ns]'))
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return index
+
+    def process_panel(self, raw_data_dict: dict, fields=None, dtype=None):
+        """
+        Pipeline dạng panel: Fill NA -> Log Return -> Lọc Nhiễu -> Check Dừng -> Đồng bộ,
+        mỗi bước là 1 phép toán 2D trên toàn bộ mã. Trả về PricePanel.
+        """
+        fields = fields or getattr(config, 'PANEL_FIELDS', ('Adj Close', 'Log_Return'))
+        dtype = dtype or getattr(config, 'PANEL_DTYPE', 'float64')
+        print("Đang xử lý dữ liệu dạng panel (Cleaning & Transforming)...")
+
+        block = self._panel_steps(raw_data_dict, fields)
+        if self.adf_mode == 'eager':
+            self.stationarity_report()
+
+        if block is None:
+            print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
+            return PricePanel(pd.DatetimeIndex([]), [], {}, dtype=dtype)
+
+        # Đồng bộ: reindex theo lịch giao dịch, áp dụng chính sách thiếu dữ liệu của từng mã
+        sessions = self._sessions(block['row_days'])
+        policies = self._gap_policies(block['tickers'])
+        present, aligned = align_panel_block(
+            block['row_days'], block['valid_rows'], block['arrays'], sessions, policies, self.max_gap
+        )
+        common_rows = common_sessions(present, policies)
+        if not common_rows.any():
+            print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
+            return PricePanel(pd.DatetimeIndex([]), [], {}, dtype=dtype)
+
+        arrays = {f: values[common_rows] for f, values in aligned.items()}
+        dates = TradingCalendar.days_to_index(sessions[common_rows], block['tz'])
+        print(f"Đã đồng bộ dữ liệu: {int(common_rows.sum())} phiên giao dịch chung.")
+        return PricePanel(dates, block['tickers'], arrays, dtype=dtype)
+
+    def process_chunked(self, raw_blocks, out_dir=None, fields=None, dtype=None, feature_fn=None):
+        """
+        Chế độ xử lý theo khối (out-of-core) cho lịch sử dài / nhiều mã, RAM chỉ cần chứa 1 khối:
+        - Lượt 1: nhận lần lượt từng khối {Mã: DataFrame gốc} (VD: DataLoader.iter_blocks()),
+          xử lý từng mã như process_panel, ghi kết quả ra ổ đĩa rồi giải phóng khối.
+        - Lượt 2: đồng bộ theo các ngày chung của mọi mã, ghi vào panel trên ổ đĩa.
+        :param feature_fn: hàm tùy chọn nhận dict {trường: ma trận ngày × mã của 1 khối đã đồng bộ}
+            và trả về dict các trường mới (chỉ báo...) để ghi thêm vào panel.
+        Output: PricePanel mở bằng memory-map từ out_dir (cùng kết quả với process_panel).
+        """
+        fields = fields or getattr(config, 'PANEL_FIELDS', ('Adj Close', 'Log_Return'))
+        dtype = np.dtype(dtype or getattr(config, 'PANEL_DTYPE', 'float64'))
+        out_dir = out_dir or getattr(config, 'CHUNK_DIR', 'data_cache/panel')
+        print("Đang xử lý dữ liệu theo khối (out-of-core)...")
+
+        # Lượt 1: xử lý từng khối -> ghi tạm ra ổ đĩa
+        spill = BlockSpill(os.path.join(out_dir, '_blocks'))
+        for raw_block in raw_blocks:
+            block = self._panel_steps(raw_block, fields)
+            del raw_block # Giải phóng dữ liệu gốc trước khi nhận khối tiếp theo
+            if self.adf_mode == 'eager':
+                self.stationarity_report()
+            if block is not None:
+                spill.add(block)
+                print(f"   Khối {len(spill.blocks)}: {len(block['tickers'])} mã.")
+            del block
+
+        if spill.days is None:
+            spill.cleanup()
+            print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
+            return PricePanel(pd.DatetimeIndex([]), [], {}, dtype=dtype)
+
+        # Lượt 2a: lịch giao dịch của toàn bộ thị trường -> các phiên được giữ (chỉ cần mặt nạ bool)
+        sessions = self._sessions(spill.days)
+        common_rows, any_rows = None, np.zeros(len(sessions), dtype=bool)
+        for i in range(len(spill.blocks)):
+            block_tickers, row_days, valid_rows, _ = spill.read(i)
+            policies = self._gap_policies(block_tickers)
+            present, _ = align_panel_block(row_days, valid_rows, {}, sessions, policies, self.max_gap)
+            any_rows |= present.any(axis=1)
+            if any(p != 'nan' for p in policies):
+                block_rows = common_sessions(present, policies)
+                common_rows = block_rows if common_rows is None else common_rows & block_rows
+        common_rows = any_rows if common_rows is None else common_rows
+
+        if not common_rows.any():
+            spill.cleanup()
+            print("Lỗi: Không tìm thấy ngày giao dịch chung giữa các mã!")
+            return PricePanel(pd.DatetimeIndex([]), [], {}, dtype=dtype)
+
+        # Lượt 2b: đồng bộ từng khối và ghi vào panel trên ổ đĩa (mỗi trường 1 file memory-map)
+        n_rows = int(common_rows.sum())
+        tickers = spill.tickers()
+        outputs = {}
+        col = 0
+        for i in range(len(spill.blocks)):
+            block_tickers, row_days, valid_rows, arrays = spill.read(i, spill.fields())
+            policies = self._gap_policies(block_tickers)
+            _, aligned = align_panel_block(row_days, valid_rows, arrays, sessions, policies, self.max_gap)
+            arrays = {f: values[common_rows] for f, values in aligned.items()}
+            del aligned
+            if feature_fn is not None:
+                arrays.update(feature_fn(arrays))
+            for f, values in arrays.items():
+                if f not in outputs:
+                    outputs[f] = np.lib.format.open_memmap(
+                        PricePanel.field_path(out_dir, len(outputs)), mode='w+', dtype=dtype,
+                        shape=(n_rows, len(tickers)), fortran_order=True
+                    )
+                outputs[f][:, col:col + len(block_tickers)] = values
+            col += len(block_tickers)
+
+        for arr in outputs.values():
+            arr.flush()
+        dates = TradingCalendar.days_to_index(sessions[common_rows], spill.tz)
+        PricePanel.write_meta(out_dir, spill.tz, dates.as_unit('ns').asi8, tickers, list(outputs), dtype)
+        outputs = None
+        spill.cleanup()
+
+        print(f"Đã đồng bộ dữ liệu: {n_rows} phiên giao dịch chung ({len(tickers)} mã, lưu tại {out_dir}).")
+        return PricePanel.load(out_dir)
+
+    def process_all(self, raw_data_dict: dict, as_panel=False, stream=False):
         """
         Hàm Main gọi bởi main.py.
         Pipeline: Fill NA -> Log Return -> Lọc Nhiễu -> Check Dừng -> Đồng bộ.
+        as_panel=True: trả về PricePanel (ma trận ngày × mã) thay vì dict {Mã: DataFrame}.
+        stream=True: lưu lại trạng thái chạy để nhận tiếp từng phiên mới bằng append_bar().
         """
+        if as_panel and not stream and getattr(config, 'VECTORIZED_PROCESSING', True):
+            return self.process_panel(raw_data_dict)
+
         processed_temp = {}
+        if stream:
+            self._streams = {}
         
         print("Đang xử lý dữ liệu (Cleaning & Transforming)...")
 
@@ -128,15 +458,75 @@ class DataProcessor:
             df = self._compute_log_returns(df)
             
             if not df.empty:
+                if stream:
+                    # Lưu trạng thái trước khi kẹp (cần Log Return gốc để kẹp lại về sau)
+                    price_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+                    self._streams[ticker] = StreamState.from_frame(
+                        df, price_col, raw_df=raw_data_dict[ticker]
+                    )
+
                 # Lọc nhiễu (Outliers)
                 df = self._winsorize_outliers(df, threshold=config.OUTLIER_THRESH)
                 
                 # Kiểm tra tính dừng (Optional check)
-                self._check_stationarity(df)
+                self._queue_stationarity(ticker, df['Log_Return'].to_numpy())
                 
                 processed_temp[ticker] = df
+
+        if self.adf_mode == 'eager':
+            self.stationarity_report()
         
         # Đồng bộ thời gian (Bước quan trọng nhất cho Pair Trading)
         final_data = self._align_data(processed_temp)
+
+        if stream:
+            # Chỉ theo dõi các mã còn lại sau khi đồng bộ
+            self._streams = {t: self._streams[t] for t in final_data}
+
+        if as_panel:
+            return PricePanel.from_dict(
+                final_data,
+                fields=getattr(config, 'PANEL_FIELDS', ('Adj Close', 'Log_Return')),
+                dtype=getattr(config, 'PANEL_DTYPE', 'float64')
+            )
         
-        return final_data
\ No newline at end of file
+        return final_data
+
+    def append_bar(self, ticker, bar, date=None):
+        """
+        Nhận 1 phiên mới của 1 mã và cập nhật trong O(1):
+        Fill NA (lấy giá trị gần nhất) -> Log Return -> Kẹp theo biên chạy.
+        Việc đồng bộ lịch (theo GAP_POLICY của từng mã) làm khi đọc kết quả bằng stream_data(),
+        vì phiên thiếu của 1 mã chỉ biết được khi các mã khác / phiên sau đã đến.
+        :param bar: dict/Series các cột giá (VD: {'Adj Close': ..., 'Close': ...})
+        :param date: ngày của phiên (mặc định lấy bar.name nếu bar là Series)
+        Output: Series dòng đã xử lý của mã (None nếu không nhận được).
+        Lưu ý: cần gọi process_all(..., stream=True) trước để khởi tạo trạng thái.
+        Phiên thiếu dữ liệu tạm lấy giá trị gần nhất, và được nội suy lại khi phiên sau đến
+        (xem kết quả cuối cùng qua stream_data()).
+        """
+        if ticker not in self._streams:
+            print(f"Lỗi: {ticker} chưa được khởi tạo streaming (gọi process_all(..., stream=True)).")
+            return None
+
+        date = pd.Timestamp(date if date is not None else bar.name)
+        state = self._streams[ticker]
+        if state.dates and date <= state.dates[-1]:
+            print(f"Bỏ qua phiên {date.date()} của {ticker}: không mới hơn phiên cuối cùng.")
+            return None
+
+        values, log_ret = state.append(date, bar)
+        lower, upper = state.bounds(config.OUTLIER_THRESH)
+
+        row = pd.Series(values, index=state.columns, name=date)
+        row['Log_Return'] = min(max(log_ret, lower), upper)
+        return row
+
+    def stream_data(self) -> dict:
+        """
+        Dữ liệu đã xử lý hiện tại của chế độ streaming: dict {Mã: DataFrame} trên lịch chung,
+        Log Return kẹp theo biên mới nhất, đồng bộ bằng cùng lịch giao dịch + chính sách thiếu dữ liệu
+        (GAP_POLICY / GAP_POLICIES) như process_all -> khớp với chạy lại process_all trên toàn bộ dữ liệu.
+        """
+        frames = {t: state.to_frame(config.OUTLIER_THRESH) for t, state in self._streams.items()}
+        return self._align_data(frames)
@@ -0,0 +1,79 @@
+import os
+import pandas as pd
+
+class PriceProvider:
+    """
+    Giao diện nguồn dữ liệu giá (cắm-rút được).
+    Mỗi provider nhận 1 nhóm mã và trả về dict {Mã: DataFrame OHLCV}.
+    """
+    def fetch(self, tickers: list, start=None, end=None) -> dict:
+        raise NotImplementedError
+
+def split_multi_ticker(df, tickers):
+    """
+    Tách DataFrame MultiIndex (Ticker, Price) của yfinance về dict {Mã: DataFrame}.
+    Mã nào không có dữ liệu thì bỏ qua.
+    """
+    result = {}
+    if df is None or df.empty:
+        return result
+
+    df.index = pd.to_datetime(df.index)
+
+    # Trường hợp cột đơn (1 mã, yfinance bản cũ)
+    if not isinstance(df.columns, pd.MultiIndex):
+        if len(tickers) == 1:
+            result[tickers[0]] = df.dropna(how='all')
+        return result
+
+    # Xác định level nào chứa tên mã (group_by='ticker' -> level 0, mặc định -> level 1)
+    level = 0 if set(tickers) & set(df.columns.get_level_values(0)) else 1
+    available = set(df.columns.get_level_values(level))
+
+    for t in tickers:
+        if t not in available:
+            continue
+        sub = df.xs(t, axis=1, level=level).dropna(how='all')
+        if sub.empty:
+            continue
+        sub.columns.name = None
+        result[t] = sub
+    return result
+
+class YahooProvider(PriceProvider):
+    """Tải nhiều mã trong 1 request yf.download rồi tách lại theo mã."""
+    def fetch(self, tickers: list, start=None, end=None) -> dict:
+        import yfinance as yf
+        # auto_adjust=False: Giữ nguyên giá Close và Adj Close gốc
+        # threads=False: việc chạy song song do DataLoader điều phối (có giới hạn số luồng)
+        df = yf.download(
+            tickers, start=start, end=end, auto_adjust=False,
+            progress=False, group_by='ticker', threads=False
+        )
+        return split_multi_ticker(df, tickers)
+
+class LocalFileProvider(PriceProvider):
+    """
+    Nguồn dữ liệu từ thư mục file CSV (mỗi mã 1 file '<Mã>.csv').
+    Dùng thay Yahoo khi test / benchmark để không phụ thuộc mạng.
+    """
+    def __init__(self, directory, ext='.csv'):
+        self.directory = directory
+        self.ext = ext
+
+    def fetch(self, tickers: list, start=None, end=None) -> dict:
+        result = {}
+        for t in tickers:
+            path = os.path.join(self.directory, f"{t}{self.ext}")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+            df.index = pd.to_datetime(df.index)
+            # Cắt theo [start, end) giống quy ước của yf.download
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df.index < pd.Timestamp(end)]
+            if not df.empty:
+                result[t] = df
+        return result
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import config
+
+def adf_pvalue(values):
+    """Chạy ADF Test cho 1 chuỗi, trả về p-value (None nếu lỗi, VD: dữ liệu quá ngắn)."""
+    from statsmodels.tsa.stattools import adfuller
+    try:
+        return float(adfuller(values)[1])
+    except Exception:
+        return None
+
+class StationarityChecker:
+    """
+    Kiểm tra tính dừng (ADF) cho nhiều mã, có cache trên ổ đĩa.
+    - Khóa cache: mã + dấu vân tay (hash) của chuỗi Log Return -> dữ liệu không đổi thì không chạy lại.
+    - Các mã chưa có trong cache được chạy song song bằng process pool.
+    """
+    def __init__(self, cache_path=None, n_jobs=None):
+        self.cache_path = cache_path or getattr(config, 'ADF_CACHE_PATH', None)
+        self.n_jobs = n_jobs or getattr(config, 'ADF_WORKERS', 1)
+        self._cache = self._read_cache()
+
+    def _read_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self):
+        if not self.cache_path:
+            return
+        folder = os.path.dirname(self.cache_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def fingerprint(values):
+        """Hash nội dung chuỗi (đổi 1 giá trị hoặc thêm 1 phiên là đổi hash)."""
+        arr = np.ascontiguousarray(values, dtype=np.float64)
+        return hashlib.sha1(arr.tobytes()).hexdigest()
+
+    def check_many(self, series_dict: dict) -> dict:
+        """
+        Input: dict {Mã: mảng Log Return}.
+        Output: dict {Mã: p-value} (None nếu không tính được).
+        """
+        results = {}
+        misses = []
+        for ticker, values in series_dict.items():
+            fp = self.fingerprint(values)
+            entry = self._cache.get(ticker)
+            if entry is not None and entry.get('fp') == fp:
+                results[ticker] = entry.get('pvalue')
+            else:
+                misses.append((ticker, fp, values))
+
+        if misses:
+            arrays = [np.asarray(v, dtype=np.float64) for _, _, v in misses]
+            if self.n_jobs > 1 and len(misses) > 1:
+                with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                    pvalues = list(pool.map(adf_pvalue, arrays, chunksize=max(1, len(arrays) // (4 * self.n_jobs))))
+            else:
+                pvalues = [adf_pvalue(a) for a in arrays]
+
+            for (ticker, fp, _), p in zip(misses, pvalues):
+                # Mỗi mã chỉ giữ kết quả mới nhất -> file cache không phình to
+                self._cache[ticker] = {'fp': fp, 'pvalue': p}
+                results[ticker] = p
+            self._write_cache()
+
+        return results
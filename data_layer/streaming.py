@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+class StreamState:
+    """
+    Trạng thái chạy (running state) của 1 mã cho chế độ nhận từng phiên mới (streaming).
+    - Giá cuối cùng: để tính Log Return của phiên mới.
+    - Dòng cuối đã điền: để điền giá trị thiếu (NaN) của phiên mới.
+    - Mean/Variance chạy (thuật toán Welford): để tính biên Winsorize trong O(1).
+    """
+    def __init__(self, columns, price_col):
+        self.columns = list(columns)
+        self.price_col = price_col
+        self.last_values = None # Dòng cuối cùng (đã điền NaN)
+        self.last_price = None
+        self.dates = []         # Ngày của các dòng đã có Log Return
+        self.rows = []          # Giá trị các cột gốc tương ứng
+        self.raw_returns = []   # Log Return CHƯA kẹp (để kẹp lại theo biên hiện tại)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        # Các dòng cuối bị thiếu dữ liệu (đang tạm lấy giá trị gần nhất) theo từng cột,
+        # sẽ được nội suy lại khi phiên có dữ liệu thật tiếp theo đến
+        self.gaps = {}
+
+    @classmethod
+    def from_frame(cls, df, price_col, raw_df=None):
+        """
+        Khởi tạo từ DataFrame đã Fill NA + Log Return (trước bước Winsorize).
+        raw_df: dữ liệu gốc (chưa điền) để biết các dòng cuối nào đang bị thiếu.
+        """
+        columns = [c for c in df.columns if c != 'Log_Return']
+        state = cls(columns, price_col)
+        values = df[columns].to_numpy(dtype=np.float64, copy=True)
+        state.dates = list(df.index)
+        state.rows = list(values)
+        state.raw_returns = df['Log_Return'].to_numpy(dtype=np.float64).tolist()
+        state.last_values = values[-1].copy()
+        state.last_price = float(df[price_col].iloc[-1])
+
+        returns = np.asarray(state.raw_returns)
+        state.n = len(returns)
+        state.mean = float(returns.mean()) if state.n else 0.0
+        state.m2 = float(((returns - state.mean) ** 2).sum()) if state.n else 0.0
+
+        if raw_df is not None:
+            raw_tail = raw_df[columns].loc[df.index]
+            for j, c in enumerate(columns):
+                missing = raw_tail[c].isna().to_numpy()
+                observed = np.flatnonzero(~missing)
+                if len(observed) == 0:
+                    continue
+                n_tail = len(missing) - (observed[-1] + 1) # Số dòng thiếu liên tiếp ở cuối
+                if n_tail > 0:
+                    state.gaps[j] = list(range(len(missing) - n_tail, len(missing)))
+        return state
+
+    def _update_moments(self, x):
+        """Cập nhật mean/variance chạy với 1 quan sát mới (Welford)."""
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def _remove_moment(self, x):
+        """Gỡ 1 quan sát khỏi mean/variance chạy (Welford ngược)."""
+        self.n -= 1
+        if self.n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= delta * (x - self.mean)
+
+    def _fill_gap(self, j, date, value):
+        """
+        Nội suy tuyến tính theo thời gian các dòng thiếu của cột j (giống interpolate('time')),
+        khi đã có giá trị thật ở phiên mới. Nếu là cột giá thì tính lại Log Return các dòng đó.
+        """
+        gap = self.gaps.pop(j)
+        anchor = gap[0] - 1
+        t0 = self.dates[anchor].value
+        y0 = self.rows[anchor][j]
+        slope = (value - y0) / (date.value - t0)
+        for i in gap:
+            self.rows[i][j] = slope * (self.dates[i].value - t0) + y0
+
+        if self.columns[j] == self.price_col:
+            p = self.columns.index(self.price_col)
+            for i in gap:
+                new_ret = float(np.log(self.rows[i][p] / self.rows[i - 1][p]))
+                self._remove_moment(self.raw_returns[i])
+                self.raw_returns[i] = new_ret
+                self._update_moments(new_ret)
+            self.last_price = self.rows[gap[-1]][p]
+
+    def bounds(self, threshold):
+        """Biên kẹp hiện tại: mean ± threshold * std (std mẫu, ddof=1)."""
+        if self.n < 2:
+            return -np.inf, np.inf
+        std = np.sqrt(self.m2 / (self.n - 1))
+        return self.mean - threshold * std, self.mean + threshold * std
+
+    def append(self, date, bar):
+        """Thêm 1 phiên mới, trả về (giá trị các cột đã điền, Log Return chưa kẹp)."""
+        values = np.array([bar.get(c, np.nan) for c in self.columns], dtype=np.float64)
+        missing = np.isnan(values)
+
+        # Cột có dữ liệu thật trở lại -> nội suy lại các dòng thiếu trước đó
+        for j in list(self.gaps):
+            if not missing[j]:
+                self._fill_gap(j, date, values[j])
+
+        # Thiếu dữ liệu ở phiên cuối -> tạm lấy giá trị gần nhất (giống interpolate + ffill)
+        values[missing] = self.last_values[missing]
+        for j in np.flatnonzero(missing):
+            self.gaps.setdefault(j, []).append(len(self.rows))
+
+        price = values[self.columns.index(self.price_col)]
+        log_ret = float(np.log(price / self.last_price))
+
+        self.last_values = values
+        self.last_price = price
+        self.dates.append(date)
+        self.rows.append(values)
+        self.raw_returns.append(log_ret)
+        self._update_moments(log_ret)
+        return values, log_ret
+
+    def to_frame(self, threshold):
+        """DataFrame đã xử lý (các phiên của riêng mã này, chưa đồng bộ), Log Return kẹp theo biên hiện tại."""
+        df = pd.DataFrame(np.vstack(self.rows), index=pd.DatetimeIndex(self.dates), columns=self.columns)
+        lower, upper = self.bounds(threshold)
+        df['Log_Return'] = np.clip(self.raw_returns, lower, upper)
+        return df
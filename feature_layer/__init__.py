@@ -1,4 +1,24 @@
-from .trend import TrendIndicators
-from .momentum import MomentumIndicators
-from .volatility import VolatilityIndicators
-from .pairs import PairsIndicators
\ No newline at end of file
+"""Lớp đặc trưng: chỉ báo kỹ thuật, kiểm định đồng tích hợp, chấm điểm cặp (import trễ, xem lazy_module)."""
+from lazy_module import lazy_module
+
+_LAZY_IMPORTS = {
+    'TrendIndicators':      '.trend',
+    'MomentumIndicators':   '.momentum',
+    'VolatilityIndicators': '.volatility',
+    'PairsIndicators':      '.pairs',
+    'FeatureEngine':        '.engine',
+    'FeatureCache':         '.cache',
+    'FeatureGraph':         '.graph',
+    'CointegrationScanner': '.cointegration',
+    'PairPrefilter':        '.prefilter',
+    'CointegrationStore':   '.coint_store',
+    'CointegrationStability': '.stability',
+    'MeanReversionScorer':  '.mean_reversion',
+    'IndicatorState':       '.online',
+    'PairOnlineState':      '.online',
+    'KalmanSpread':         '.kalman',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
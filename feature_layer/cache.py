@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import config
+
+class FeatureCache:
+    """
+    Cache kết quả chỉ báo theo nội dung (content-addressed):
+    khóa = (mã, tên chỉ báo, tham số, hash chuỗi giá đầu vào).
+    - Bộ nhớ: LRU giới hạn theo dung lượng (MB), mục cũ nhất bị đẩy ra khi vượt ngưỡng.
+    - Ổ đĩa: mục bị đẩy ra (và mọi mục khi flush) được ghi xuống file .npy, lần chạy sau đọc lại;
+      thư mục cũng giới hạn dung lượng, xóa file ít dùng nhất trước.
+    Giá hoặc tham số đổi -> khóa đổi -> tự tính lại, không cần xóa cache bằng tay.
+    """
+    VERSION = 1 # Tăng khi đổi công thức chỉ báo để bỏ qua kết quả cũ trên ổ đĩa
+
+    def __init__(self, cache_dir=None, max_memory_mb=None, max_disk_mb=None):
+        self.cache_dir = cache_dir if cache_dir is not None else getattr(config, 'FEATURE_CACHE_DIR', None)
+        self.max_memory = int((max_memory_mb or getattr(config, 'FEATURE_CACHE_MEMORY_MB', 256)) * 1024 ** 2)
+        self.max_disk = int((max_disk_mb or getattr(config, 'FEATURE_CACHE_DISK_MB', 2048)) * 1024 ** 2)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._entries = OrderedDict() # {khóa: {tên cột: mảng}}, cuối = dùng gần nhất
+        self._dirty = set()           # Khóa chưa ghi xuống ổ đĩa
+        self.memory_bytes = 0
+        self.hits = self.disk_hits = self.misses = 0
+
+    @staticmethod
+    def fingerprint(values):
+        """Hash nội dung chuỗi giá (đổi 1 giá trị hoặc thêm 1 phiên là đổi hash)."""
+        arr = np.ascontiguousarray(values, dtype=np.float64)
+        return hashlib.sha1(arr.tobytes()).hexdigest()
+
+    def make_key(self, ticker, indicator, params, fingerprint):
+        raw = json.dumps([self.VERSION, str(ticker), indicator, list(params), fingerprint])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    @staticmethod
+    def _nbytes(columns):
+        return sum(v.nbytes for v in columns.values())
+
+    def get(self, key):
+        """Trả về dict {tên cột: mảng} nếu có trong bộ nhớ hoặc trên ổ đĩa, ngược lại None."""
+        columns = self._entries.get(key)
+        if columns is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return columns
+
+        if self.cache_dir:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    # Mảng có cấu trúc: mỗi trường là 1 cột chỉ báo (đọc nhanh hơn .npz nhiều)
+                    data = np.load(path)
+                    columns = {name: np.ascontiguousarray(data[name]) for name in data.dtype.names}
+                except (OSError, ValueError, TypeError) as e:
+                    print(f"Lỗi đọc cache chỉ báo {key}: {e}")
+                    columns = None
+                if columns is not None:
+                    os.utime(path) # Đánh dấu vừa dùng (cho việc dọn theo LRU trên ổ đĩa)
+                    self._store(key, columns, dirty=False)
+                    self.disk_hits += 1
+                    return columns
+
+        self.misses += 1
+        return None
+
+    def put(self, key, columns):
+        """Lưu kết quả vào bộ nhớ (ghi xuống ổ đĩa khi bị đẩy ra hoặc khi flush)."""
+        self._store(key, {name: np.asarray(v) for name, v in columns.items()}, dirty=True)
+
+    def _store(self, key, columns, dirty):
+        if key in self._entries:
+            self.memory_bytes -= self._nbytes(self._entries.pop(key))
+        self._entries[key] = columns
+        self.memory_bytes += self._nbytes(columns)
+        if dirty:
+            self._dirty.add(key)
+        self._evict()
+
+    def _evict(self):
+        # Giữ lại ít nhất mục vừa thêm, kể cả khi 1 mục đã lớn hơn ngưỡng
+        while self.memory_bytes > self.max_memory and len(self._entries) > 1:
+            key, columns = self._entries.popitem(last=False)
+            self.memory_bytes -= self._nbytes(columns)
+            if key in self._dirty:
+                self._spill(key, columns)
+
+    def _spill(self, key, columns):
+        self._dirty.discard(key)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        data = np.empty(n_rows, dtype=[(name, v.dtype) for name, v in columns.items()])
+        for name, v in columns.items():
+            data[name] = v
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)
+
+    def flush(self):
+        """Ghi mọi mục chưa lưu xuống ổ đĩa rồi dọn thư mục về dưới ngưỡng dung lượng."""
+        for key in list(self._dirty):
+            self._spill(key, self._entries[key])
+        self.prune()
+
+    def prune(self):
+        """Xóa các file ít được dùng nhất (mtime cũ nhất) cho đến khi thư mục dưới max_disk."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        """Xóa toàn bộ cache trong bộ nhớ (file trên ổ đĩa giữ nguyên)."""
+        self._entries.clear()
+        self._dirty.clear()
+        self.memory_bytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+            'entries': len(self._entries), 'memory_mb': self.memory_bytes / 1024 ** 2,
+        }
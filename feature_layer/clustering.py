@@ -1,46 +1,174 @@
 #dùng thuật toán K-Means để gom nhóm cổ phiếu.
+import os
+import hashlib
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-import matplotlib.pyplot as plt
+import config
+from data_layer.panel import PricePanel
+
+# Giới hạn RAM cho 1 khối hàng của ma trận tương quan (mã × mã) khi tính theo khối
+BLOCK_BYTES = 64 * 1024 ** 2
 
 class MarketCluster:
     """
     Phân cụm cổ phiếu dựa trên hành vi biến động giá (Correlation).
+    method (CLUSTER_METHOD):
+    - 'kmeans': KMeans(n_init=10) trên các hàng của returns.corr() (cách cũ, hợp với vài chục mã)
+    - 'minibatch': MiniBatchKMeans trên hàng ma trận tương quan tính theo khối float32, hoặc trên
+      embedding hạng thấp (PCA / SVD ngẫu nhiên của lợi suất chuẩn hóa) khi có n_components -> không dựng ma trận N × N
+    - 'hierarchical': phân cụm thứ bậc (linkage CLUSTER_LINKAGE) trên khoảng cách tương quan sqrt(2(1 - ρ)),
+      ma trận khoảng cách được cache theo hash lợi suất (RAM + CLUSTER_CACHE_DIR) để chạy lại với số nhóm khác không phải tính lại;
+      chỉ giữ ma trận của lần chạy gần nhất (dữ liệu mới -> hash mới, file cũ bị xóa) nên thư mục cache không phình ra
+    Tương quan của 2 chế độ mới: phiên thiếu dữ liệu tính là lợi suất trung bình (không tính theo từng cặp như pandas),
+    không thiếu dữ liệu thì giống returns.corr().
     """
-    def __init__(self, n_clusters=4):
+    METHODS = ('kmeans', 'minibatch', 'hierarchical')
+
+    def __init__(self, n_clusters=4, method=None, n_components=None, cache_dir=None):
         self.n_clusters = n_clusters # Chia làm 4 nhóm ngành chính
+        self.method = method or getattr(config, 'CLUSTER_METHOD', 'kmeans')
+        if self.method not in self.METHODS:
+            raise ValueError(f"Phương pháp phân cụm không hỗ trợ: {self.method}. Chọn trong {self.METHODS}")
+        self.n_components = n_components or getattr(config, 'CLUSTER_COMPONENTS', None)
+        self.cache_dir = cache_dir or getattr(config, 'CLUSTER_CACHE_DIR', None)
+        self._distances = {} # hash lợi suất -> khoảng cách dạng nén (condensed), chỉ giữ lần gần nhất
 
     def cluster_stocks(self, data_dict):
         """
-        Input: Dictionary chứa Dataframe của từng mã.
+        Input: Dictionary chứa Dataframe của từng mã (hoặc PricePanel).
         Output: Dictionary {Mã: Label nhóm}, VD: {'VCB': 0, 'BID': 0, 'HPG': 1...}
         """
         # 1. Tạo DataFrame lợi nhuận gộp chung
         # Chỉ lấy cột 'Adj Close' của tất cả các mã
-        prices = pd.DataFrame({k: v['Adj Close'] for k, v in data_dict.items()})
-        
+        if isinstance(data_dict, PricePanel):
+            prices = data_dict.frame('Adj Close') # Dùng chung bộ nhớ, không ghép lại
+        else:
+            prices = pd.DataFrame({k: v['Adj Close'] for k, v in data_dict.items()})
+
         # Tính lợi nhuận hàng ngày (Returns)
-        returns = prices.pct_change().dropna()
-        
-        # 2. Xử lý dữ liệu cho K-Means
-        # K-Means gom nhóm dựa trên "Tính tương quan". 
-        # Chúng ta dùng Transpose (.T) để gom theo Cột (Mã CK) thay vì Dòng (Ngày)
-        X = returns.corr().values 
-        
-        # 3. Chạy K-Means
-        kmeans = KMeans(n_clusters=self.n_clusters, random_state=42, n_init=10)
-        kmeans.fit(X)
-        
-        labels = kmeans.labels_
+        # Bỏ dòng đầu thay vì dropna() toàn bảng: mã giữ NaN (GAP_POLICY 'nan') không làm mất ngày của mã khác
+        returns = prices.pct_change(fill_method=None).iloc[1:]
         tickers = returns.columns
-        
+
+        if self.method == 'kmeans':
+            labels = self._kmeans(returns)
+        else:
+            z = self.standardized_returns(returns.to_numpy(dtype=np.float64))
+            if self.method == 'minibatch':
+                labels = self._minibatch(z)
+            else:
+                labels = self._hierarchical(z)
+
         # 4. Gán nhãn
         cluster_map = {}
         print(f"\n--- KẾT QUẢ PHÂN CỤM (CLUSTERING) ---")
         for i in range(self.n_clusters):
             group = tickers[labels == i].tolist()
-            print(f"Nhóm {i}: {group}")
+            if len(group) > 20:
+                print(f"Nhóm {i}: {len(group)} mã, VD: {group[:10]}")
+            else:
+                print(f"Nhóm {i}: {group}")
             for t in group:
                 cluster_map[t] = i
-                
-        return cluster_map
\ No newline at end of file
+
+        return cluster_map
+
+    def _kmeans(self, returns):
+        # 2. Xử lý dữ liệu cho K-Means
+        # K-Means gom nhóm dựa trên "Tính tương quan" (tính theo từng cặp trên các ngày cả 2 mã đều có dữ liệu).
+        # Chúng ta dùng Transpose (.T) để gom theo Cột (Mã CK) thay vì Dòng (Ngày)
+        X = returns.corr().fillna(0).values
+
+        # 3. Chạy K-Means
+        from sklearn.cluster import KMeans
+        kmeans = KMeans(n_clusters=self.n_clusters, random_state=42, n_init=10)
+        kmeans.fit(X)
+        return kmeans.labels_
+
+    @staticmethod
+    def standardized_returns(returns):
+        """
+        Lợi suất chuẩn hóa float32 (phiên × mã): trừ trung bình, chia chuẩn L2 của từng cột
+        -> tương quan = z.T @ z. Phiên thiếu dữ liệu = 0, mã không biến động = cột 0 (tương quan 0 như fillna(0)).
+        """
+        valid = np.isfinite(returns)
+        count = np.maximum(valid.sum(axis=0), 1)
+        z = np.where(valid, returns, 0.0)
+        z = np.where(valid, z - z.sum(axis=0) / count, 0.0)
+        norm = np.sqrt((z * z).sum(axis=0))
+        z /= np.where(norm > 0, norm, 1.0)
+        return z.astype(np.float32)
+
+    @staticmethod
+    def correlation_blocks(z):
+        """Sinh (hàng đầu, hàng cuối, khối tương quan float32) theo khối hàng, không giữ cả ma trận N × N."""
+        n = z.shape[1]
+        step = max(1, BLOCK_BYTES // (4 * max(n, 1)))
+        for r0 in range(0, n, step):
+            r1 = min(r0 + step, n)
+            yield r0, r1, z[:, r0:r1].T @ z
+
+    def _minibatch(self, z):
+        from sklearn.cluster import MiniBatchKMeans
+        n = z.shape[1]
+        if self.n_components:
+            # Hàng i của ma trận tương quan C = V S² V' chiếu lên k hướng chính = V_k S_k²
+            from sklearn.utils.extmath import randomized_svd
+            k = min(self.n_components, n, z.shape[0])
+            _, s, vt = randomized_svd(z, k, random_state=42)
+            features = vt.T * (s * s)
+        else:
+            features = np.empty((n, n), dtype=np.float32)
+            for r0, r1, block in self.correlation_blocks(z):
+                features[r0:r1] = block
+        kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=42, n_init=3,
+                                 batch_size=min(1024, n))
+        return kmeans.fit_predict(features)
+
+    def distance_matrix(self, z):
+        """
+        Khoảng cách tương quan sqrt(2(1 - ρ)) dạng nén (như scipy pdist), tính theo khối.
+        Cache theo hash lợi suất chuẩn hóa: trong RAM và file .npy trong cache_dir (nếu có),
+        chỉ giữ khóa mới nhất (xem prune).
+        """
+        key = hashlib.sha1(np.ascontiguousarray(z).tobytes()).hexdigest()
+        if key in self._distances:
+            return self._distances[key]
+        path = os.path.join(self.cache_dir, f"corr_dist_{key}.npy") if self.cache_dir else None
+        if path and os.path.exists(path):
+            dist = np.load(path)
+        else:
+            n = z.shape[1]
+            dist = np.empty(n * (n - 1) // 2, dtype=np.float32)
+            cols = np.arange(n)
+            pos = 0
+            for r0, r1, block in self.correlation_blocks(z):
+                # Phần trên đường chéo theo thứ tự hàng = đúng thứ tự dạng nén
+                upper = block[cols[r0:r1, None] < cols[None, :]]
+                dist[pos:pos + len(upper)] = np.sqrt(np.clip(2.0 * (1.0 - upper), 0.0, None))
+                pos += len(upper)
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(path, dist)
+        self._distances = {key: dist}
+        if path:
+            self.prune(keep=os.path.basename(path))
+        return dist
+
+    def prune(self, keep=None):
+        """Xóa các file khoảng cách cũ trong cache_dir (mtime cũ nhất trước), chỉ giữ file keep."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('corr_dist_') and name.endswith('.npy') and name != keep:
+                files.append((os.stat(os.path.join(self.cache_dir, name)).st_mtime, name))
+        for _, name in sorted(files):
+            os.remove(os.path.join(self.cache_dir, name))
+
+    def _hierarchical(self, z):
+        from scipy.cluster.hierarchy import linkage, fcluster
+        if z.shape[1] < 2:
+            return np.zeros(z.shape[1], dtype=np.int64)
+        tree = linkage(self.distance_matrix(z).astype(np.float64), method=getattr(config, 'CLUSTER_LINKAGE', 'average'))
+        return fcluster(tree, t=self.n_clusters, criterion='maxclust') - 1
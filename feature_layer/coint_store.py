@@ -0,0 +1,197 @@
+import os
+import hashlib
+import sqlite3
+import datetime
+import numpy as np
+import pandas as pd
+import config
+
+class CointegrationStore:
+    """
+    Kho kết quả kiểm định đồng tích hợp theo cặp (SQLite): thống kê t, p-value, lag, hệ số phòng hộ,
+    khoảng dữ liệu đã dùng [window_start, window_end] và hash giá của 2 mã trên đúng khoảng đó.
+    Mỗi lần chạy chỉ kiểm định lại cặp:
+    - chưa có trong kho,
+    - dữ liệu cũ bị sửa (VD: điều chỉnh giá do chia cổ tức) -> hash trên khoảng đã dùng không còn khớp,
+    - dữ liệu đã có thêm hơn max_stale phiên sau window_end (COINT_STORE_MAX_STALE_SESSIONS),
+    - kết quả quá hạn TTL (COINT_STORE_TTL_DAYS).
+    Các cặp còn lại lấy thẳng từ kho, bảng xếp hạng tính từ kho sau khi cập nhật.
+    Lưu ý: p-value dùng lại được tính trên khoảng của lần kiểm định trước, nên bảng xếp hạng có thể trộn
+    các cặp với độ dài cửa sổ / ngày kết thúc khác nhau (lệch tối đa max_stale phiên).
+    """
+    VERSION = 1 # Tăng khi đổi cách kiểm định để bỏ qua kết quả cũ
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pair_results (
+            ticker_1     TEXT NOT NULL,
+            ticker_2     TEXT NOT NULL,
+            window_start TEXT,
+            window_end   TEXT,
+            nobs         INTEGER,
+            t_stat       REAL,
+            pvalue       REAL,
+            lag          INTEGER,
+            hedge_ratio  REAL,
+            fingerprint  TEXT NOT NULL,
+            tested_at    TEXT NOT NULL,
+            PRIMARY KEY (ticker_1, ticker_2)
+        )
+    """
+    COLUMNS = ('ticker_1', 'ticker_2', 'window_start', 'window_end', 'nobs',
+               't_stat', 'pvalue', 'lag', 'hedge_ratio', 'fingerprint', 'tested_at')
+
+    def __init__(self, path=None, ttl_days=None, max_stale=None):
+        self.path = path or getattr(config, 'COINT_STORE_PATH', 'data_cache/coint_store.sqlite')
+        self.ttl_days = ttl_days or getattr(config, 'COINT_STORE_TTL_DAYS', 90)
+        # None = không kiểm định lại theo số phiên mới (chỉ theo hash / TTL)
+        self.max_stale = max_stale if max_stale is not None else getattr(config, 'COINT_STORE_MAX_STALE_SESSIONS', 20)
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+        self.tested = self.reused = 0
+
+    def close(self):
+        self.conn.close()
+
+    def _load(self, keys):
+        """Các dòng đã lưu của danh sách cặp, dạng dict {(mã 1, mã 2): dòng}."""
+        rows = {}
+        tickers = sorted({t for key in keys for t in key})
+        # SQLite giới hạn số tham số 1 câu lệnh -> đọc theo mã thứ nhất, lọc cặp trong Python
+        wanted = set(keys)
+        for i in range(0, len(tickers), 500):
+            part = tickers[i:i + 500]
+            cursor = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM pair_results "
+                f"WHERE ticker_1 IN ({', '.join('?' * len(part))})", part
+            )
+            for row in cursor:
+                if (row[0], row[1]) in wanted:
+                    rows[(row[0], row[1])] = dict(zip(self.COLUMNS, row))
+        return rows
+
+    def _expired(self, key, tested_at, today):
+        # Hạn của từng cặp rải đều trong [TTL/2, TTL] (theo hash tên cặp) để các lần chạy sau
+        # chỉ kiểm định lại 1 phần thay vì toàn bộ cặp hết hạn cùng lúc sau lần quét đầu tiên
+        spread = int(hashlib.sha1(f"{key[0]}|{key[1]}".encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+        age = (today - datetime.date.fromisoformat(tested_at)).days
+        return age > self.ttl_days * (0.5 + 0.5 * spread)
+
+    def _fingerprint(self, fp_1, fp_2, min_obs):
+        raw = f"{self.VERSION}|{min_obs}|{fp_1}|{fp_2}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def refresh(self, data, scanner=None, pairs=None, field='Adj Close', today=None):
+        """
+        Cập nhật kho cho các cặp của data (mặc định: mọi tổ hợp, hoặc danh sách pairs [(mã 1, mã 2)]),
+        chỉ kiểm định lại cặp mới / dữ liệu thay đổi / quá hạn.
+        Output: DataFrame kết quả của đúng các cặp đó
+                ['Ticker_1', 'Ticker_2', 't_stat', 'pvalue', 'lag', 'nobs', 'hedge_ratio', 'window_start', 'window_end'].
+        """
+        from .cointegration import CointegrationScanner
+        scanner = scanner or CointegrationScanner(min_obs=100)
+        today = today or datetime.date.today()
+        prices, tickers, dates = scanner.price_data(data, field)
+        pos = {t: i for i, t in enumerate(tickers)}
+        if pairs is None:
+            first, second = np.triu_indices(len(tickers), k=1)
+            keys = [(tickers[i], tickers[j]) for i, j in zip(first, second)]
+        else:
+            keys = [tuple(p) for p in pairs]
+        stored = self._load(keys)
+
+        # Hash giá của 1 mã trên 1 khoảng ngày (nhiều cặp dùng chung khoảng -> tính 1 lần)
+        hashes = {}
+        def window_hash(ticker, start, stop):
+            key = (ticker, start, stop)
+            if key not in hashes:
+                values = np.ascontiguousarray(prices[start:stop, pos[ticker]])
+                hashes[key] = hashlib.sha1(values.tobytes()).hexdigest()
+            return hashes[key]
+
+        date_pos = {str(d.date()): i for i, d in enumerate(pd.DatetimeIndex(dates))}
+        # Phiên cuối có dữ liệu của từng mã (mã ngừng giao dịch không bị coi là cũ mãi)
+        valid = np.isfinite(prices)
+        last_valid = np.where(valid.any(axis=0), len(dates) - 1 - np.argmax(valid[::-1], axis=0), -1)
+        retest = []
+        for key in keys:
+            row = stored.get(key)
+            if row is None or self._expired(key, row['tested_at'], today):
+                retest.append(key)
+                continue
+            if row['window_start'] is None:
+                # Cặp bị bỏ qua lần trước (thiếu dữ liệu): thử lại khi có thêm phiên
+                if row['fingerprint'] != self._fingerprint(len(dates), None, scanner.min_obs):
+                    retest.append(key)
+                continue
+            start, end = date_pos.get(row['window_start']), date_pos.get(row['window_end'])
+            if start is None or end is None:
+                retest.append(key)
+                continue
+            if self.max_stale is not None and min(last_valid[pos[key[0]]], last_valid[pos[key[1]]]) - end > self.max_stale:
+                retest.append(key)
+                continue
+            fp = self._fingerprint(window_hash(key[0], start, end + 1), window_hash(key[1], start, end + 1), scanner.min_obs)
+            if fp != row['fingerprint']:
+                retest.append(key)
+
+        if retest:
+            first = np.array([pos[a] for a, _ in retest], dtype=np.intp)
+            second = np.array([pos[b] for _, b in retest], dtype=np.intp)
+            result = scanner.test_indices(prices, first, second)
+            records = []
+            for k, (a, b) in enumerate(retest):
+                if np.isnan(result['pvalue'][k]):
+                    # Không kiểm định được: ghi nhận theo số phiên hiện có để không thử lại mỗi lần
+                    window = (None, None)
+                    fp = self._fingerprint(len(dates), None, scanner.min_obs)
+                else:
+                    start, stop = int(result['start'][k]), int(result['stop'][k])
+                    window = (str(dates[start].date()), str(dates[stop - 1].date()))
+                    fp = self._fingerprint(window_hash(a, start, stop), window_hash(b, start, stop), scanner.min_obs)
+                records.append((
+                    a, b, window[0], window[1], int(result['nobs'][k]),
+                    _float(result['t_stat'][k]), _float(result['pvalue'][k]), int(result['lag'][k]),
+                    _float(result['hedge_ratio'][k]), fp, today.isoformat(),
+                ))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO pair_results ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMNS))})", records
+            )
+            self.conn.commit()
+            stored.update(self._load(retest))
+
+        self.tested += len(retest)
+        self.reused += len(keys) - len(retest)
+        print(f"   [Kho đồng tích hợp] Kiểm định lại {len(retest)}/{len(keys)} cặp, dùng lại {len(keys) - len(retest)}")
+
+        frame = pd.DataFrame([stored[key] for key in keys], columns=self.COLUMNS)
+        frame = frame.rename(columns={'ticker_1': 'Ticker_1', 'ticker_2': 'Ticker_2'})
+        return frame.drop(columns=['fingerprint', 'tested_at']).astype({'pvalue': np.float64, 't_stat': np.float64})
+
+    def top_pairs(self, data, top_n=5, max_pvalue=None, scanner=None, prefilter=None, field='Adj Close'):
+        """
+        Top N cặp theo p-value (giống CointegrationScanner.top_pairs) nhưng lấy kết quả từ kho,
+        chỉ kiểm định lại những cặp cần thiết. prefilter: chỉ xét các cặp ứng viên của PairPrefilter.
+        """
+        from .cointegration import CointegrationScanner, combination_indices
+        if max_pvalue is None:
+            max_pvalue = config.COINT_PVALUE_THRESH
+        scanner = scanner or CointegrationScanner(min_obs=100)
+        pairs = None
+        if prefilter is not None:
+            prices, tickers = scanner.price_matrix(data, field)
+            first, second = combination_indices(len(tickers), prefilter.candidates(prices))
+            pairs = [(tickers[i], tickers[j]) for i, j in zip(first, second)]
+
+        results = self.refresh(data, scanner=scanner, pairs=pairs, field=field)
+        # Thứ tự dòng = thứ tự combinations -> sort ổn định giữ cặp đứng trước khi p-value bằng nhau
+        scored = results[results['pvalue'] < max_pvalue].sort_values('pvalue', kind='stable').head(top_n)
+        return list(zip(scored['Ticker_1'], scored['Ticker_2'])), scored['pvalue'].tolist()
+
+def _float(value):
+    """Giá trị REAL cho SQLite (NaN -> NULL, ±inf giữ nguyên)."""
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,374 @@
+import os
+import heapq
+import itertools
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+from data_layer.panel import PricePanel
+
+# Giới hạn bộ nhớ tạm cho 1 lô cặp (ma trận hồi quy ADF: cặp × phiên × số lag)
+MAX_BATCH_BYTES = 64 * 1024 ** 2
+
+# Quét song song: số cặp tối thiểu mỗi đoạn (đoạn nhỏ hơn thì chi phí tiến trình lớn hơn lợi ích)
+MIN_PAIRS_PER_CHUNK = 2000
+
+# Ngưỡng R² của coint() (statsmodels): 2 chuỗi gần như trùng nhau thì t = -inf
+_RSQUARED_MAX = 1 - 100 * np.sqrt(np.finfo(np.float64).eps)
+
+def mackinnonp_batch(teststat, regression='c', N=2):
+    """
+    p-value MacKinnon (1994) cho cả mảng thống kê t, cùng công thức với statsmodels mackinnonp.
+    Dùng bảng hệ số nội bộ của statsmodels (phiên bản ghim trong requirements.txt); phiên bản khác
+    không còn các bảng này thì quay về gọi mackinnonp từng phần tử (chậm hơn, cùng kết quả).
+    """
+    from scipy.stats import norm
+    t = np.asarray(teststat, dtype=np.float64)
+    try:
+        from statsmodels.tsa.adfvalues import _tau_maxs, _tau_mins, _tau_stars, _tau_smallps, _tau_largeps
+    except ImportError:
+        from statsmodels.tsa.adfvalues import mackinnonp
+        p = np.vectorize(mackinnonp, otypes=[np.float64])(np.nan_to_num(t), regression=regression, N=N)
+        return np.where(np.isnan(t), np.nan, p)
+    small = np.polyval(np.asarray(_tau_smallps[regression][N - 1])[::-1], t)
+    large = np.polyval(np.asarray(_tau_largeps[regression][N - 1])[::-1], t)
+    with np.errstate(invalid='ignore'):
+        p = norm.cdf(np.where(t <= _tau_stars[regression][N - 1], small, large))
+        p = np.where(t > _tau_maxs[regression][N - 1], 1.0, p)
+        p = np.where(t < _tau_mins[regression][N - 1], 0.0, p)
+    return np.where(np.isnan(t), np.nan, p)
+
+def _adf_design(e, d, lag, nobs):
+    """
+    Ma trận hồi quy ADF (không hằng số) của nhiều chuỗi, dạng chuyển vị Z' (chuỗi × (lag + 1) × nobs).
+    e, d: mức và sai phân của các chuỗi (chuỗi × phiên, liên tục theo hàng -> mỗi cột của Z là 1 lần copy liền).
+    Cột 0 = mức e[t-1], cột i = sai phân trễ d[t-i]; biến phụ thuộc = d[t] (nobs phiên cuối).
+    """
+    m = d.shape[1]
+    zt = np.empty((e.shape[0], lag + 1, nobs))
+    zt[:, 0] = e[:, m - nobs:m]
+    for i in range(1, lag + 1):
+        zt[:, i] = d[:, m - nobs - i:m - i]
+    return zt, d[:, m - nobs:]
+
+def _gram(zt, y):
+    """Z'Z, Z'y, y'y đã chuẩn hóa theo độ lớn từng cột (không đổi SSR / thống kê t, ổn định số hơn)."""
+    gram = zt @ zt.transpose(0, 2, 1)
+    zy = (zt @ y[:, :, None])[:, :, 0]
+    scale = np.sqrt(np.einsum('pkk->pk', gram))
+    scale[scale == 0] = 1.0
+    gram /= scale[:, :, None] * scale[:, None, :]
+    zy /= scale
+    return gram, zy, np.einsum('pn,pn->p', y, y)
+
+def adf_tstat_batch(e):
+    """
+    ADF (regression='n', autolag='aic', maxlag mặc định) cho từng cột của ma trận e (phiên × chuỗi),
+    giống adfuller() của statsmodels nhưng chạy dạng ma trận:
+    - Chọn lag: 1 phân rã Cholesky của Z'Z với đủ maxlag cho ra SSR của MỌI mô hình lồng nhau
+      (SSR_k = y'y - tổng bình phương k phần tử đầu của L⁻¹Z'y), AIC tính trên cùng mẫu như _autolag.
+    - Hồi quy lại với lag tốt nhất trên mẫu dài nhất có thể (gom các chuỗi cùng lag), lấy t của hệ số mức.
+    Output: (thống kê t, lag đã dùng).
+    """
+    n_obs, n_series = e.shape
+    maxlag = int(np.ceil(12.0 * np.power(n_obs / 100.0, 1 / 4.0)))
+    maxlag = min(n_obs // 2 - 1, maxlag)
+    e = np.ascontiguousarray(e.T)
+    d = np.diff(e, axis=1)
+    m = d.shape[1]
+
+    # 1. Chọn lag theo AIC (cùng số quan sát m - maxlag cho mọi lag)
+    nobs = m - maxlag
+    z, y = _adf_design(e, d, maxlag, nobs)
+    gram, zy, yy = _gram(z, y)
+    del z
+    chol = np.linalg.cholesky(gram)
+    w = np.linalg.solve(chol, zy[:, :, None])[:, :, 0]
+    ssr = yy[:, None] - np.cumsum(w * w, axis=1)
+    k = np.arange(1, maxlag + 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aic = nobs * np.log(ssr / nobs) + 2 * k # Phần hằng số của log-likelihood không ảnh hưởng việc chọn
+    usedlag = np.argmin(aic, axis=1) # Bằng nhau thì lấy lag nhỏ hơn như min((aic, lag))
+
+    # 2. Hồi quy lại với lag đã chọn
+    tstat = np.full(n_series, np.nan)
+    for lag in np.unique(usedlag):
+        cols = np.flatnonzero(usedlag == lag)
+        nobs = m - lag
+        z, y = _adf_design(e[cols], d[cols], lag, nobs)
+        gram, zy, yy = _gram(z, y)
+        del z
+        rhs = np.concatenate([zy[:, :, None], np.zeros_like(zy)[:, :, None]], axis=2)
+        rhs[:, 0, 1] = 1.0 # Cột thứ 2: lấy phần tử (0, 0) của (Z'Z)⁻¹
+        sol = np.linalg.solve(gram, rhs)
+        params, inv00 = sol[:, :, 0], sol[:, 0, 1]
+        resid_ss = yy - np.einsum('pk,pk->p', params, zy)
+        sigma2 = resid_ss / (nobs - (lag + 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tstat[cols] = params[:, 0] / np.sqrt(sigma2 * inv00)
+    return tstat, usedlag
+
+def engle_granger_batch(y, x):
+    """
+    Kiểm định Engle-Granger (giống coint(y, x) của statsmodels: trend='c', autolag='aic') cho nhiều cặp:
+    y, x: ma trận (phiên × cặp), không có NaN.
+    - Bước 1: hồi quy y theo [x, hằng số] của mọi cặp bằng đại số ma trận (beta = cov / var).
+    - Bước 2: ADF trên phần dư của mọi cặp dạng xếp chồng (adf_tstat_batch).
+    Output: (thống kê t, p-value MacKinnon, lag đã dùng, hệ số phòng hộ beta của bước 1).
+    """
+    yc = y - y.mean(axis=0)
+    xc = x - x.mean(axis=0)
+    var_x = np.einsum('tp,tp->p', xc, xc)
+    tss = np.einsum('tp,tp->p', yc, yc)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.einsum('tp,tp->p', xc, yc) / var_x
+        resid = yc - beta * xc
+        rsquared = 1 - np.einsum('tp,tp->p', resid, resid) / tss
+    # Chuỗi hằng: coint() báo lỗi, vòng lặp cũ bỏ qua cặp này
+    degenerate = (var_x == 0) | (tss == 0)
+    colinear = ~degenerate & ~(rsquared < _RSQUARED_MAX)
+
+    tstat = np.full(y.shape[1], np.nan)
+    usedlag = np.full(y.shape[1], -1)
+    ok = np.flatnonzero(~degenerate & ~colinear)
+    if len(ok):
+        try:
+            tstat[ok], usedlag[ok] = adf_tstat_batch(resid[:, ok])
+        except np.linalg.LinAlgError:
+            # Có chuỗi suy biến (Z'Z không khả nghịch): tính riêng từng chuỗi, chuỗi lỗi để NaN như cũ
+            for j in ok:
+                try:
+                    t_j, lag_j = adf_tstat_batch(resid[:, [j]])
+                except np.linalg.LinAlgError:
+                    continue
+                tstat[j], usedlag[j] = t_j[0], lag_j[0]
+    tstat[colinear] = -np.inf
+    return tstat, mackinnonp_batch(tstat, regression='c', N=2), usedlag, np.where(degenerate, np.nan, beta)
+
+def column_ranges(prices):
+    """
+    Khoảng dữ liệu hợp lệ liên tục [start, stop) của từng mã trong ma trận giá (phiên × mã).
+    Output: (valid, start, stop, contiguous) — contiguous = False nếu mã có NaN xen giữa.
+    """
+    valid = np.isfinite(prices)
+    count = valid.sum(axis=0)
+    start = np.where(count > 0, valid.argmax(axis=0), 0)
+    stop = start + count
+    contiguous = np.array([valid[start[j]:stop[j], j].all() for j in range(prices.shape[1])], dtype=bool)
+    return valid, start, stop, contiguous
+
+def combination_indices(n, k):
+    """Cặp (i, j) ở vị trí k (mảng) trong thứ tự combinations(range(n), 2), không cần dựng toàn bộ danh sách."""
+    rows = np.arange(n, dtype=np.int64)
+    offsets = rows * n - rows * (rows + 1) // 2 # Số cặp đứng trước hàng i
+    k = np.asarray(k, dtype=np.int64)
+    first = np.searchsorted(offsets, k, side='right') - 1
+    second = k - offsets[first] + first + 1
+    return first.astype(np.intp), second.astype(np.intp)
+
+def _top_chunk(scanner, prices, ranges, positions, top_n, max_pvalue):
+    """
+    Kiểm định các cặp ở vị trí positions (tăng dần) trong thứ tự combinations,
+    trả về tối đa top_n cặp (p-value, vị trí) có p-value < max_pvalue.
+    positions: range (quét toàn bộ, gửi sang tiến trình con gọn) hoặc mảng vị trí ứng viên.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    first, second = combination_indices(prices.shape[1], positions)
+    pvalue = scanner.test_indices(prices, first, second, ranges)['pvalue']
+    ok = np.flatnonzero(pvalue < max_pvalue)
+    # Vị trí tăng dần -> p-value bằng nhau thì cặp đứng trước trong combinations được ưu tiên
+    return heapq.nsmallest(top_n, zip(pvalue[ok].tolist(), positions[ok].tolist()))
+
+# Trạng thái của tiến trình con (gắn vào bộ nhớ chia sẻ 1 lần khi khởi tạo)
+_WORKER = {}
+
+def _init_worker(shm_name, shape, min_obs, batch_mb):
+    # Vùng nhớ do tiến trình chính tạo và xóa (unlink), tiến trình con chỉ gắn vào để đọc
+    shm = shared_memory.SharedMemory(name=shm_name)
+    prices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    try:
+        # Mỗi tiến trình 1 luồng BLAS, tránh n_jobs × số lõi luồng tranh nhau
+        from threadpoolctl import threadpool_limits
+        _WORKER['limits'] = threadpool_limits(1)
+    except ImportError:
+        pass
+    _WORKER.update(
+        shm=shm, prices=prices, ranges=column_ranges(prices),
+        scanner=CointegrationScanner(min_obs=min_obs, batch_mb=batch_mb, n_jobs=1),
+    )
+
+def _scan_worker(positions, top_n, max_pvalue):
+    return _top_chunk(_WORKER['scanner'], _WORKER['prices'], _WORKER['ranges'], positions, top_n, max_pvalue)
+
+class CointegrationScanner:
+    """
+    Quét đồng tích hợp (Engle-Granger) cho nhiều cặp mã theo lô thay vì gọi coint() từng cặp.
+    - Các cặp có cùng khoảng dữ liệu chung (mã niêm yết muộn chỉ thiếu phần đầu) được gom thành lô,
+      mỗi lô giới hạn bộ nhớ theo COINT_BATCH_MB.
+    - Mã có NaN xen giữa chuỗi: dùng coint() của statsmodels cho từng cặp như cũ.
+    - top_pairs() với n_jobs > 1: chia các tổ hợp cặp thành nhiều đoạn cho process pool,
+      ma trận giá gửi sang tiến trình con 1 lần qua bộ nhớ chia sẻ, mỗi đoạn trả về Top N riêng rồi gộp lại.
+    Kết quả (t, p-value) khớp coint(chuỗi 1, chuỗi 2) của statsmodels theo thứ tự mã trong cặp.
+    """
+    def __init__(self, min_obs=100, batch_mb=None, n_jobs=None):
+        self.min_obs = min_obs
+        self.batch_mb = batch_mb or getattr(config, 'COINT_BATCH_MB', None)
+        self.max_batch_bytes = int(self.batch_mb * 1024 ** 2) if self.batch_mb else MAX_BATCH_BYTES
+        n_jobs = n_jobs or getattr(config, 'COINT_WORKERS', 1)
+        if n_jobs < 0:
+            n_jobs = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        self.n_jobs = max(1, n_jobs)
+
+    @staticmethod
+    def price_data(data, field='Adj Close'):
+        """(ma trận giá (phiên × mã) float64, danh sách mã, ngày) từ PricePanel / dict {Mã: DataFrame} / DataFrame."""
+        if isinstance(data, PricePanel):
+            return np.asarray(data.fields[field], dtype=np.float64), list(data.tickers), data.dates
+        if isinstance(data, pd.DataFrame):
+            return data.to_numpy(dtype=np.float64), list(data.columns), data.index
+        frame = pd.concat({t: df[field] for t, df in data.items()}, axis=1)
+        return frame.to_numpy(dtype=np.float64), list(frame.columns), frame.index
+
+    @classmethod
+    def price_matrix(cls, data, field='Adj Close'):
+        """Ma trận giá (phiên × mã) float64 và danh sách mã."""
+        prices, tickers, _ = cls.price_data(data, field)
+        return prices, tickers
+
+    def _pairs_per_batch(self, n_obs):
+        maxlag = int(np.ceil(12.0 * np.power(n_obs / 100.0, 1 / 4.0)))
+        return max(1, self.max_batch_bytes // (8 * n_obs * (maxlag + 4)))
+
+    def test_indices(self, prices, first, second, ranges=None):
+        """
+        Kiểm định các cặp cột (first[k], second[k]) của ma trận giá.
+        ranges: kết quả column_ranges(prices) nếu đã tính sẵn.
+        Output: dict mảng theo cặp {'t_stat', 'pvalue', 'lag', 'nobs', 'hedge_ratio', 'start', 'stop'},
+                [start, stop) = các phiên đã dùng; cặp bị bỏ qua có pvalue = NaN.
+        """
+        n_obs = prices.shape[0]
+        valid, start, stop, contiguous = ranges if ranges is not None else column_ranges(prices)
+
+        n_pairs = len(first)
+        tstat = np.full(n_pairs, np.nan)
+        pvalue = np.full(n_pairs, np.nan)
+        lag = np.full(n_pairs, -1)
+        nobs = np.zeros(n_pairs, dtype=np.int64)
+        hedge = np.full(n_pairs, np.nan)
+
+        s = np.maximum(start[first], start[second])
+        e = np.minimum(stop[first], stop[second])
+        batched = contiguous[first] & contiguous[second]
+        nobs[batched] = np.clip(e - s, 0, None)[batched]
+        batched &= nobs >= self.min_obs
+
+        # Gom các cặp cùng khoảng dữ liệu chung -> 1 lô ma trận
+        keys = s.astype(np.int64) * (n_obs + 1) + e
+        for key in np.unique(keys[batched]):
+            idx = np.flatnonzero(batched & (keys == key))
+            s0, e0 = divmod(int(key), n_obs + 1)
+            block = prices[s0:e0]
+            step = self._pairs_per_batch(e0 - s0)
+            for c0 in range(0, len(idx), step):
+                part = idx[c0:c0 + step]
+                tstat[part], pvalue[part], lag[part], hedge[part] = engle_granger_batch(
+                    block[:, first[part]], block[:, second[part]]
+                )
+
+        # Mã có NaN xen giữa: kiểm định từng cặp trên các phiên cả 2 mã cùng có dữ liệu
+        fallback = np.flatnonzero(~(contiguous[first] & contiguous[second]))
+        if len(fallback):
+            from statsmodels.tsa.stattools import coint
+            for p in fallback:
+                mask = valid[:, first[p]] & valid[:, second[p]]
+                nobs[p] = mask.sum()
+                if nobs[p] < self.min_obs:
+                    continue
+                rows = np.flatnonzero(mask)
+                s[p], e[p] = rows[0], rows[-1] + 1
+                y, x = prices[mask, first[p]], prices[mask, second[p]]
+                try:
+                    tstat[p], pvalue[p], _ = coint(y, x)
+                except Exception:
+                    continue
+                xc = x - x.mean()
+                hedge[p] = xc @ (y - y.mean()) / (xc @ xc)
+
+        return {
+            't_stat': tstat, 'pvalue': pvalue, 'lag': lag, 'nobs': nobs,
+            'hedge_ratio': hedge, 'start': s, 'stop': e,
+        }
+
+    def scan(self, data, pairs=None, field='Adj Close'):
+        """
+        data: PricePanel / dict {Mã: DataFrame} / DataFrame giá (phiên × mã).
+        pairs: danh sách cặp (mã 1, mã 2) cần kiểm định (mặc định: mọi tổ hợp theo thứ tự combinations).
+        Output: DataFrame ['Ticker_1', 'Ticker_2', 't_stat', 'pvalue', 'lag', 'nobs', 'hedge_ratio'];
+                cặp bị bỏ qua (ít hơn min_obs phiên chung, chuỗi hằng) có pvalue = NaN.
+        """
+        prices, tickers = self.price_matrix(data, field)
+        if pairs is None:
+            first, second = np.triu_indices(prices.shape[1], k=1)
+        else:
+            pos = {t: i for i, t in enumerate(tickers)}
+            first = np.array([pos[a] for a, _ in pairs], dtype=np.intp)
+            second = np.array([pos[b] for _, b in pairs], dtype=np.intp)
+
+        result = self.test_indices(prices, first, second)
+        return pd.DataFrame({
+            'Ticker_1': [tickers[i] for i in first],
+            'Ticker_2': [tickers[j] for j in second],
+            't_stat': result['t_stat'],
+            'pvalue': result['pvalue'],
+            'lag': result['lag'],
+            'nobs': result['nobs'],
+            'hedge_ratio': result['hedge_ratio'],
+        })
+
+    def top_pairs(self, data, top_n=5, max_pvalue=None, field='Adj Close', prefilter=None):
+        """
+        Top N cặp có p-value nhỏ nhất và < max_pvalue (mặc định COINT_PVALUE_THRESH),
+        p-value bằng nhau thì cặp đứng trước trong combinations được ưu tiên (như sort ổn định).
+        prefilter: PairPrefilter -> chỉ kiểm định các cặp ứng viên của nó (mặc định: mọi tổ hợp).
+        Output: (danh sách cặp (mã 1, mã 2), danh sách p-value).
+        """
+        if max_pvalue is None:
+            max_pvalue = config.COINT_PVALUE_THRESH
+        prices, tickers = self.price_matrix(data, field)
+        n_tickers = prices.shape[1]
+        if prefilter is not None:
+            positions = prefilter.candidates(prices)
+        else:
+            positions = range(n_tickers * (n_tickers - 1) // 2)
+
+        # Nhiều đoạn hơn số tiến trình để chia tải đều (các đoạn chạy nhanh chậm khác nhau)
+        n_chunks = min(self.n_jobs * 4, len(positions) // MIN_PAIRS_PER_CHUNK)
+        if self.n_jobs > 1 and n_chunks > 1:
+            bounds = np.linspace(0, len(positions), n_chunks + 1).astype(np.int64)
+            chunks = [positions[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            best = self._top_parallel(prices, chunks, top_n, max_pvalue)
+        else:
+            best = _top_chunk(self, prices, None, positions, top_n, max_pvalue)
+
+        first, second = combination_indices(n_tickers, [k for _, k in best])
+        pairs = [(tickers[i], tickers[j]) for i, j in zip(first, second)]
+        return pairs, [p for p, _ in best]
+
+    def _top_parallel(self, prices, chunks, top_n, max_pvalue):
+        # Chép ma trận giá vào bộ nhớ chia sẻ 1 lần, mọi tiến trình con đọc chung (không pickle theo từng đoạn)
+        shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+        shared = np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)
+        try:
+            shared[:] = prices
+            with ProcessPoolExecutor(
+                max_workers=self.n_jobs, initializer=_init_worker,
+                initargs=(shm.name, prices.shape, self.min_obs, self.batch_mb),
+            ) as pool:
+                results = pool.map(_scan_worker, chunks, [top_n] * len(chunks), [max_pvalue] * len(chunks))
+                # Gộp Top N của từng đoạn (mỗi đoạn đã sắp xếp theo (p-value, vị trí))
+                return list(itertools.islice(heapq.merge(*results), top_n))
+        finally:
+            del shared
+            shm.close()
+            shm.unlink()
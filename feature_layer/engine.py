@@ -0,0 +1,115 @@
+import numpy as np
+import config
+from .kernels import as_matrix
+from .graph import FeatureGraph
+
+class FeatureEngine:
+    """
+    Tính nhiều chỉ báo kỹ thuật trong 1 lượt trên mảng NumPy của cột giá.
+    - Chỉ copy DataFrame 1 lần (thay vì mỗi hàm add_* copy 1 lần).
+    - Tính theo nhu cầu qua FeatureGraph: chỉ các cột được yêu cầu (columns) và phần phụ thuộc
+      của chúng; kết quả trung gian (SMA, độ lệch chuẩn) dùng chung giữa các chỉ báo,
+      công thức lấy từ các hàm *_panel của lớp chỉ báo.
+    - compute_panel(): tính cho cả thị trường (ma trận ngày × mã) bằng 1 lần gọi.
+    - cache (FeatureCache, tùy chọn): chỉ tính các (mã, cột) chưa có kết quả cho đúng chuỗi giá
+      và tham số hiện tại, phần còn lại lấy lại từ cache.
+    - compact (mặc định theo COMPACT_FEATURES): vẫn tính bằng float64 nhưng trả kết quả float32.
+    Kết quả giống các hàm add_* của TrendIndicators / MomentumIndicators / VolatilityIndicators
+    (sai số dấu phẩy động), riêng ROC chỉ điền 0 cho cột ROC thay vì cả bảng.
+    """
+    # Nhóm chỉ báo -> các cột được tạo (theo tên hàm add_* tương ứng)
+    FEATURE_COLUMNS = {
+        'sma_distance':    ['Dist_SMA'],
+        'macd':            ['MACD', 'MACD_Signal', 'MACD_Hist'],
+        'rsi':             ['RSI'],
+        'roc':             ['ROC'],
+        'bollinger_bands': ['Boll_Percent', 'Boll_Width'],
+    }
+
+    def __init__(self, roc_periods=5, cache=None, compact=None):
+        self.graph = FeatureGraph(roc_periods=roc_periods)
+        self.cache = cache
+        compact = getattr(config, 'COMPACT_FEATURES', False) if compact is None else compact
+        self.dtype = np.float32 if compact else np.float64
+
+    def _columns(self, features, columns):
+        """Danh sách cột cần tính: columns nếu có, ngược lại là các cột của nhóm features."""
+        if columns is not None:
+            columns = list(columns)
+            self.graph.check_columns(columns)
+            return columns
+        features = list(self.FEATURE_COLUMNS) if features is None else list(features)
+        unknown = [f for f in features if f not in self.FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Chỉ báo không hỗ trợ: {unknown}. Chọn trong {list(self.FEATURE_COLUMNS)}")
+        return [c for f in features for c in self.FEATURE_COLUMNS[f]]
+
+    def compute_panel(self, prices, features=None, tickers=None, columns=None):
+        """
+        Input: ma trận giá (ngày × mã) dạng DataFrame hoặc mảng NumPy (1D = 1 mã).
+        features: danh sách nhóm chỉ báo trong FEATURE_COLUMNS (mặc định: tất cả).
+        columns: danh sách cột cụ thể (nút của FeatureGraph, VD ['RSI']), nếu có thì thay cho features.
+        tickers: tên mã của từng cột (mặc định lấy tên cột DataFrame), cần để dùng cache.
+        Output: dict {tên cột: ma trận chỉ báo cùng dạng với đầu vào}, theo thứ tự yêu cầu.
+        """
+        columns = self._columns(features, columns)
+        x, wrap = as_matrix(prices)
+        if tickers is None and hasattr(prices, 'columns'):
+            tickers = list(prices.columns)
+
+        if not columns:
+            return {}
+        if self.cache is not None and tickers is not None:
+            cols = self._compute_cached(x, columns, tickers)
+        else:
+            cols = self.graph.compute(x, columns)
+        return {c: wrap(v.astype(self.dtype, copy=False)) for c, v in cols.items()}
+
+    def _compute_cached(self, x, columns, tickers):
+        """
+        Tra cache theo từng (mã, cột); các mã thiếu cùng 1 tập cột được gom lại
+        và tính 1 lần trên ma trận con, rồi ghi kết quả vào cache.
+        """
+        params = {c: self.graph.params(c) for c in columns}
+        cols = {c: np.empty(x.shape) for c in columns}
+        missing = {} # {tập cột thiếu: [(vị trí mã, {cột: khóa})]}
+        for j, ticker in enumerate(tickers):
+            fp = self.cache.fingerprint(x[:, j])
+            keys = {}
+            for c in columns:
+                key = self.cache.make_key(ticker, c, params[c], fp)
+                hit = self.cache.get(key)
+                if hit is None:
+                    keys[c] = key
+                else:
+                    cols[c][:, j] = hit[c]
+            if keys:
+                missing.setdefault(tuple(keys), []).append((j, keys))
+
+        for group, items in missing.items():
+            pos = [j for j, _ in items]
+            computed = self.graph.compute(x[:, pos], list(group))
+            for k, (j, keys) in enumerate(items):
+                for c, key in keys.items():
+                    values = computed[c][:, k].copy()
+                    self.cache.put(key, {c: values})
+                    cols[c][:, j] = values
+        return cols
+
+    def compute(self, df, features=None, price_col='Adj Close', ticker=None, columns=None):
+        """
+        Input: DataFrame của 1 mã có cột giá (mặc định 'Adj Close'); ticker: tên mã (để dùng cache).
+        features: danh sách nhóm chỉ báo trong FEATURE_COLUMNS (mặc định: tất cả),
+                  thứ tự cột kết quả theo thứ tự trong danh sách.
+        columns: chỉ tính các cột này (VD: cột mô hình thật sự dùng), thay cho features.
+        Output: DataFrame mới = df + các cột chỉ báo.
+        """
+        tickers = None if ticker is None else [ticker]
+        cols = self.compute_panel(df[price_col].to_numpy(dtype=np.float64), features,
+                                  tickers=tickers, columns=columns)
+
+        # Ghi toàn bộ cột 1 lần (copy nông: không sửa df gốc, không nhân bản dữ liệu cũ)
+        out = df.copy(deep=False)
+        for c, values in cols.items():
+            out[c] = values
+        return out
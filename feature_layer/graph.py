@@ -0,0 +1,136 @@
+import numpy as np
+from .kernels import rolling_mean_std, rolling_std
+from .trend import TrendIndicators
+from .momentum import MomentumIndicators
+from .volatility import VolatilityIndicators
+
+class FeatureGraph:
+    """
+    Đồ thị phụ thuộc (DAG) của các chỉ báo, tính theo nhu cầu:
+    chỉ các cột được yêu cầu và các nút chúng phụ thuộc mới được tính
+    (VD: Dist_SMA -> SMA -> giá), mỗi nút tính đúng 1 lần,
+    kết quả trung gian được giải phóng ngay khi không còn nút nào cần.
+    Công thức chỉ báo nằm ở các hàm *_panel của TrendIndicators / MomentumIndicators / VolatilityIndicators,
+    đồ thị chỉ gọi chúng và truyền phần dùng chung (SMA, độ lệch chuẩn trượt) qua tham số sma= / std=.
+    Hàm *_panel trả nhiều cột (MACD, Bollinger) là 1 nút, các cột lấy ra từ nút đó.
+    """
+    SOURCE = 'Adj Close'
+
+    # Nút -> (các nút phụ thuộc, tham số cấu hình ảnh hưởng kết quả, hàm tính)
+    NODES = {
+        'RSI':          (('Adj Close',), ('rsi_window',), '_rsi'),
+        'ROC':          (('Adj Close',), ('roc_periods',), '_roc'),
+        'SMA':          (('Adj Close',), ('window',), '_sma'),
+        'Rolling_Std':  (('Adj Close', 'SMA'), ('window',), '_rolling_std'),
+        'Dist_SMA':     (('Adj Close', 'SMA'), (), '_dist_sma'),
+        'MACD_Lines':   (('Adj Close',), ('fast', 'slow', 'signal'), '_macd_lines'),
+        'MACD':         (('MACD_Lines',), (), '_macd'),
+        'MACD_Signal':  (('MACD_Lines',), (), '_macd_signal'),
+        'MACD_Hist':    (('MACD_Lines',), (), '_macd_hist'),
+        'Boll_Bands':   (('Adj Close', 'SMA', 'Rolling_Std'), ('num_std',), '_boll_bands'),
+        'Boll_Percent': (('Boll_Bands',), (), '_boll_percent'),
+        'Boll_Width':   (('Boll_Bands',), (), '_boll_width'),
+    }
+
+    def __init__(self, roc_periods=5):
+        self.trend = TrendIndicators()
+        self.momentum = MomentumIndicators()
+        self.volatility = VolatilityIndicators()
+        # Tham số của từng nút (dùng làm khóa cache), lấy từ đúng lớp chỉ báo sẽ tính
+        self.window = self.volatility.window
+        self.rsi_window = self.momentum.rsi_window
+        self.fast = self.trend.fast
+        self.slow = self.trend.slow
+        self.signal = self.trend.signal
+        self.num_std = self.volatility.num_std
+        self.roc_periods = roc_periods
+
+    def check_columns(self, columns):
+        unknown = [c for c in columns if c not in self.NODES]
+        if unknown:
+            raise ValueError(f"Cột chỉ báo không hỗ trợ: {unknown}. Chọn trong {list(self.NODES)}")
+
+    def plan(self, columns):
+        """Thứ tự tính (topo) của các nút cần cho columns, không gồm nút giá gốc."""
+        self.check_columns(columns)
+        order, seen = [], set()
+
+        def visit(node):
+            if node == self.SOURCE or node in seen:
+                return
+            seen.add(node)
+            for dep in self.NODES[node][0]:
+                visit(dep)
+            order.append(node)
+
+        for c in columns:
+            visit(c)
+        return order
+
+    def params(self, column):
+        """Giá trị mọi tham số ảnh hưởng tới 1 cột (gồm cả các nút phụ thuộc), dùng làm khóa cache."""
+        return tuple(
+            (node, tuple(getattr(self, p) for p in self.NODES[node][1]))
+            for node in self.plan([column]) if self.NODES[node][1]
+        )
+
+    def compute(self, x, columns):
+        """
+        x: ma trận giá (ngày × mã) float64; columns: các cột cần tính.
+        Output: dict {tên cột: ma trận} theo thứ tự columns.
+        """
+        order = self.plan(columns)
+        # Số nút còn cần tới mỗi kết quả (để giải phóng kết quả trung gian sớm)
+        remaining = {}
+        for node in order:
+            for dep in self.NODES[node][0]:
+                remaining[dep] = remaining.get(dep, 0) + 1
+        keep = set(columns)
+
+        values = {self.SOURCE: x}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for node in order:
+                deps, _, fn = self.NODES[node]
+                values[node] = getattr(self, fn)(*(values[d] for d in deps))
+                for dep in deps:
+                    remaining[dep] -= 1
+                    if remaining[dep] == 0 and dep not in keep and dep != self.SOURCE:
+                        del values[dep]
+        return {c: values[c] for c in columns}
+
+    # --- Hàm tính của từng nút ---
+    def _rsi(self, x):
+        return self.momentum.rsi_panel(x)
+
+    def _roc(self, x):
+        return self.momentum.roc_panel(x, periods=self.roc_periods)
+
+    def _sma(self, x):
+        return rolling_mean_std(x, self.window, with_std=False)[0]
+
+    def _rolling_std(self, x, sma):
+        return rolling_std(x, self.window, sma)
+
+    def _dist_sma(self, x, sma):
+        return self.trend.sma_distance_panel(x, sma=sma)
+
+    def _macd_lines(self, x):
+        return self.trend.macd_panel(x)
+
+    def _macd(self, lines):
+        return lines['MACD']
+
+    def _macd_signal(self, lines):
+        return lines['MACD_Signal']
+
+    def _macd_hist(self, lines):
+        return lines['MACD_Hist']
+
+    def _boll_bands(self, x, sma, std):
+        return self.volatility.bollinger_bands_panel(x, sma=sma, std=std)
+
+    def _boll_percent(self, bands):
+        return bands['Boll_Percent']
+
+    def _boll_width(self, bands):
+        return bands['Boll_Width']
@@ -0,0 +1,78 @@
+import math
+import numpy as np
+import config
+
+class KalmanSpread:
+    """
+    Hệ số phòng hộ động bằng bộ lọc Kalman cho 1 cặp: y_t = beta_t * x_t + alpha_t + nhiễu,
+    (beta, alpha) đi theo bước ngẫu nhiên. Trạng thái gồm (beta, alpha) và ma trận hiệp phương sai 2×2,
+    mỗi phiên mới cập nhật trong O(1) (không cần cửa sổ lịch sử), lưu được bằng pickle cùng trạng thái rebalance.
+    - Spread: sai số dự báo y_t - (beta*x_t + alpha) theo trạng thái TRƯỚC phiên t (không nhìn trước).
+    - Spread_Z: Spread / độ lệch chuẩn dự báo của bộ lọc.
+    - Beta: beta sau khi cập nhật phiên t.
+    Giá được chia cho giá Y phiên đầu tiên (scale) nên tham số không phụ thuộc mặt bằng giá.
+    """
+    def __init__(self, delta=None, obs_var=None):
+        if delta is None:
+            delta = getattr(config, 'KALMAN_DELTA', 1e-4)
+        if obs_var is None:
+            obs_var = getattr(config, 'KALMAN_OBS_VAR', 1e-4)
+        if not 0 < delta < 1:
+            raise ValueError(f"KALMAN_DELTA phải nằm trong (0, 1), nhận được {delta}")
+        if not obs_var > 0:
+            raise ValueError(f"KALMAN_OBS_VAR phải lớn hơn 0, nhận được {obs_var}")
+        self.state_var = delta / (1.0 - delta)   # Phương sai bước ngẫu nhiên của (beta, alpha)
+        self.obs_var = obs_var
+        self.scale = None
+        self.beta = self.alpha = 0.0
+        self.p00 = self.p01 = self.p11 = 0.0    # Hiệp phương sai của (beta, alpha)
+        self.last_beta = np.nan
+        self.n_updates = 0
+
+    @classmethod
+    def from_history(cls, y, x, delta=None, obs_var=None):
+        """Khởi tạo bằng cách chạy qua toàn bộ lịch sử giá 2 mã (dùng lúc rebalance)."""
+        state = cls(delta=delta, obs_var=obs_var)
+        state.transform(y, x)
+        return state
+
+    def _start(self, y, x):
+        # Phiên đầu: beta = y/x, alpha = 0, độ bất định lớn để bộ lọc nhanh chóng học từ dữ liệu
+        self.scale = y
+        self.beta, self.alpha = y / x, 0.0
+        self.p00, self.p01, self.p11 = 1.0, 0.0, 1.0
+
+    def update(self, y, x):
+        """Nhận giá phiên mới của 2 mã, trả về dict {'Spread', 'Spread_Z', 'Beta'} của phiên đó."""
+        y, x = float(y), float(x)
+        if not (math.isfinite(y) and math.isfinite(x)) or x == 0:
+            return {'Spread': np.nan, 'Spread_Z': np.nan, 'Beta': self.last_beta}
+        if self.scale is None:
+            self._start(y, x)
+        ys, xs = y / self.scale, x / self.scale
+
+        # Dự báo: hiệp phương sai tăng thêm nhiễu trạng thái
+        r00, r01, r11 = self.p00 + self.state_var, self.p01, self.p11 + self.state_var
+        error = ys - (self.beta * xs + self.alpha)
+        # F = [x, 1]: RF' và phương sai dự báo Q = F R F' + obs_var
+        rf0, rf1 = r00 * xs + r01, r01 * xs + r11
+        q = xs * rf0 + rf1 + self.obs_var
+        k0, k1 = rf0 / q, rf1 / q
+
+        # Cập nhật theo giá thực tế
+        self.beta += k0 * error
+        self.alpha += k1 * error
+        self.p00, self.p01, self.p11 = r00 - k0 * rf0, r01 - k0 * rf1, r11 - k1 * rf1
+        self.last_beta = self.beta
+        self.n_updates += 1
+        return {'Spread': error * self.scale, 'Spread_Z': error / math.sqrt(q), 'Beta': self.beta}
+
+    def transform(self, y, x):
+        """Cập nhật lần lượt cả chuỗi giá, trả về (beta, spread, z_score) dạng mảng."""
+        y = np.asarray(y, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        out = np.empty((len(y), 3))
+        for t, (yt, xt) in enumerate(zip(y.tolist(), x.tolist())):
+            row = self.update(yt, xt)
+            out[t] = row['Beta'], row['Spread'], row['Spread_Z']
+        return out[:, 0], out[:, 1], out[:, 2]
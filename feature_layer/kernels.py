@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Giới hạn bộ nhớ tạm cho 1 lần tính cửa sổ trượt (ngày × mã × cửa sổ)
+MAX_WINDOW_BYTES = 64 * 1024 ** 2
+
+def as_matrix(prices):
+    """
+    Chuẩn hóa đầu vào về ma trận 2D float64 (ngày × mã).
+    Trả về (ma trận, hàm bọc kết quả về đúng dạng đầu vào):
+    DataFrame -> DataFrame cùng index/cột, mảng 1D -> mảng 1D, mảng 2D -> mảng 2D.
+    """
+    if isinstance(prices, pd.DataFrame):
+        index, columns = prices.index, prices.columns
+        return prices.to_numpy(dtype=np.float64), lambda v: pd.DataFrame(v, index=index, columns=columns)
+    if isinstance(prices, pd.Series):
+        index, name = prices.index, prices.name
+        return prices.to_numpy(dtype=np.float64)[:, None], lambda v: pd.Series(v[:, 0], index=index, name=name)
+    arr = np.asarray(prices, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[:, None], lambda v: v[:, 0]
+    return arr, lambda v: v
+
+def rolling_mean_std(x, window, with_std=True):
+    """
+    Trung bình và độ lệch chuẩn mẫu (ddof=1) trượt theo cột, giống rolling(window).mean()/.std():
+    NaN ở window-1 dòng đầu và ở mọi cửa sổ có NaN.
+    Tính trực tiếp trên từng cửa sổ (không dùng cumsum) để không mất chính xác với giá lớn,
+    chia cột thành từng nhóm để bộ nhớ tạm không vượt MAX_WINDOW_BYTES.
+    """
+    n, k = x.shape
+    mean = np.full((n, k), np.nan)
+    std = np.full((n, k), np.nan) if with_std else None
+    if n < window or k == 0:
+        return mean, std
+
+    step = max(1, MAX_WINDOW_BYTES // (8 * window * (n - window + 1)))
+    for c0 in range(0, k, step):
+        windows = sliding_window_view(x[:, c0:c0 + step], window, axis=0) # (n-w+1, cột, w)
+        m = windows.mean(axis=-1)
+        mean[window - 1:, c0:c0 + step] = m
+        if with_std:
+            dev = windows - m[..., None]
+            std[window - 1:, c0:c0 + step] = np.sqrt((dev * dev).sum(axis=-1) / (window - 1))
+    return mean, std
+
+def rolling_std(x, window, mean):
+    """
+    Độ lệch chuẩn mẫu (ddof=1) trượt theo cột khi đã có trung bình trượt (kết quả của rolling_mean_std),
+    không phải tính lại trung bình; cùng kết quả với rolling_mean_std(x, window)[1].
+    """
+    n, k = x.shape
+    std = np.full((n, k), np.nan)
+    if n < window or k == 0:
+        return std
+
+    step = max(1, MAX_WINDOW_BYTES // (8 * window * (n - window + 1)))
+    for c0 in range(0, k, step):
+        windows = sliding_window_view(x[:, c0:c0 + step], window, axis=0)
+        dev = windows - mean[window - 1:, c0:c0 + step, None]
+        std[window - 1:, c0:c0 + step] = np.sqrt((dev * dev).sum(axis=-1) / (window - 1))
+    return std
+
+def ema(x, span):
+    """EMA theo cột (adjust=False): y_t = a*x_t + (1-a)*y_{t-1}, y_0 = x_0."""
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    has_nan = np.isnan(x).any(axis=0)
+    clean = ~has_nan
+    if clean.any():
+        from scipy.signal import lfilter
+        alpha = 2.0 / (span + 1.0)
+        # Lọc theo hàng trên ma trận chuyển vị liên tục (nhanh hơn nhiều so với lọc theo axis=0)
+        xt = np.ascontiguousarray(x[:, clean].T)
+        yt, _ = lfilter([alpha], [1.0, alpha - 1.0], xt, axis=-1, zi=(1.0 - alpha) * xt[:, :1])
+        out[:, clean] = yt.T
+    if has_nan.any():
+        # Cột có NaN: để pandas xử lý trọng số qua các ô trống
+        out[:, has_nan] = pd.DataFrame(x[:, has_nan]).ewm(span=span, adjust=False).mean().to_numpy()
+    return out
+
+def shift(x, periods):
+    """Dịch xuống periods dòng theo cột (giống DataFrame.shift), phần đầu là NaN."""
+    out = np.full(x.shape, np.nan)
+    if len(x) > periods:
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+def _window_sum(v, window):
+    """Tổng trượt theo cột từ hiệu 2 giá trị cumsum (dòng window-1 trở đi)."""
+    c = np.cumsum(v, axis=0)
+    out = c[window - 1:].copy()
+    out[1:] -= c[:-window]
+    return out
+
+def rolling_beta(y, x, window):
+    """
+    Hệ số góc trượt của hồi quy y = a + beta*x theo cột (giống RollingOLS(y, add_constant(x)).params của x):
+    beta = (S_xy - S_x*S_y/w) / (S_xx - S_x^2/w), các tổng trượt S lấy từ cumsum -> O(n) mỗi cột, không phụ thuộc window.
+    y, x: ma trận (ngày × cặp). Dữ liệu được trừ trung bình cột trước khi cộng dồn để giữ chính xác với giá lớn.
+    NaN ở window-1 dòng đầu, ở mọi cửa sổ có NaN và khi x không đổi trong cửa sổ.
+    """
+    n, k = y.shape
+    beta = np.full((n, k), np.nan)
+    if n < window or k == 0:
+        return beta
+
+    valid = np.isfinite(y) & np.isfinite(x)
+    count = np.maximum(valid.sum(axis=0), 1)
+    xc = np.where(valid, x, 0.0)
+    yc = np.where(valid, y, 0.0)
+    xc = np.where(valid, xc - xc.sum(axis=0) / count, 0.0)
+    yc = np.where(valid, yc - yc.sum(axis=0) / count, 0.0)
+
+    sx, sy = _window_sum(xc, window), _window_sum(yc, window)
+    sxx = _window_sum(xc * xc, window)
+    var = sxx - sx * sx / window
+    cov = _window_sum(xc * yc, window) - sx * sy / window
+    missing = _window_sum((~valid).astype(np.float64), window) > 0.5
+    # Sai số cộng dồn có thể để lại phương sai rất nhỏ thay vì 0 khi x không đổi
+    flat = var <= 1e-12 * np.maximum(sxx, np.finfo(np.float64).tiny)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta[window - 1:] = np.where(missing | flat, np.nan, cov / var)
+    return beta
+
+def backfill(x):
+    """Điền NaN bằng giá trị hợp lệ kế tiếp theo cột (giống DataFrame.bfill)."""
+    n = len(x)
+    pos = np.where(np.isnan(x), n, np.arange(n)[:, None])
+    pos = np.minimum.accumulate(pos[::-1], axis=0)[::-1]
+    return np.take_along_axis(np.vstack([x, np.full((1, x.shape[1]), np.nan)]), pos, axis=0)
+
+def rolling_spread(y, x, window):
+    """
+    Spread với Beta trượt cho nhiều cặp (ma trận ngày × cặp), cùng công thức với calculate_rolling_spread:
+    Beta trượt (điền ngược các ngày đầu) -> Spread = Y - Beta*X -> Z-score theo mean/std trượt của Spread.
+    Output: (beta, spread, z_score).
+    """
+    beta = backfill(rolling_beta(y, x, window))
+    spread = y - beta * x
+    mean, std = rolling_mean_std(spread, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_score = (spread - mean) / std
+    return beta, spread, z_score
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import config
+
+# Giới hạn bộ nhớ tạm cho 1 lô cột của ma trận spread (phiên × cặp)
+MAX_SCORE_BYTES = 64 * 1024 ** 2
+
+class MeanReversionScorer:
+    """
+    Chấm điểm tốc độ hồi quy về trung bình của nhiều spread cùng lúc (ma trận phiên × cặp, cho phép NaN),
+    mọi hồi quy chạy dạng ma trận theo cột thay vì từng cặp:
+    - half_life: chu kỳ bán rã Ornstein-Uhlenbeck, từ Δs_t = c + λ·s_{t-1} -> -ln2 / λ (inf nếu λ >= 0)
+    - hurst: hệ số Hurst, độ dốc của log std(s_{t+τ} - s_t) theo log τ (τ = 2..max_lag); < 0.5 là hồi quy về trung bình
+    - crossing_rate: tỷ lệ phiên spread cắt qua trung bình của nó
+    Spread của 1 cặp (Y, X) là phần dư Engle-Granger y - a - b*x trên các phiên chung (cùng bước 1 của coint()).
+    Cặp đạt chuẩn: half_life <= max_half_life và hurst < max_hurst (None = không lọc theo tiêu chí đó).
+    """
+    KEYS = {'pvalue': True, 'half_life': True, 'hurst': True, 'crossing_rate': False} # tên -> tăng dần
+
+    def __init__(self, max_half_life=None, max_hurst=None, max_lag=None):
+        self.max_half_life = max_half_life or getattr(config, 'MR_MAX_HALF_LIFE', None)
+        self.max_hurst = max_hurst or getattr(config, 'MR_MAX_HURST', None)
+        self.max_lag = max_lag or getattr(config, 'MR_HURST_MAX_LAG', 20)
+
+    @staticmethod
+    def residual_spreads(y, x):
+        """Phần dư y - a - b*x (hồi quy OLS từng cột trên các phiên cả 2 mã có dữ liệu), NaN ở phiên thiếu."""
+        valid = np.isfinite(y) & np.isfinite(x)
+        n = valid.sum(axis=0)
+        y0, x0 = np.where(valid, y, 0.0), np.where(valid, x, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            my, mx = y0.sum(axis=0) / n, x0.sum(axis=0) / n
+            dx, dy = np.where(valid, x0 - mx, 0.0), np.where(valid, y0 - my, 0.0)
+            b = (dx * dy).sum(axis=0) / (dx * dx).sum(axis=0)
+            return np.where(valid, dy - b * dx, np.nan)
+
+    def _half_life(self, s):
+        prev, diff = s[:-1], s[1:] - s[:-1]
+        valid = np.isfinite(prev) & np.isfinite(diff)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mp = np.where(valid, prev, 0.0).sum(axis=0) / n
+            md = np.where(valid, diff, 0.0).sum(axis=0) / n
+            dp = np.where(valid, prev - mp, 0.0)
+            lam = (dp * np.where(valid, diff - md, 0.0)).sum(axis=0) / (dp * dp).sum(axis=0)
+            return np.where(lam < 0, -np.log(2.0) / lam, np.where(np.isnan(lam), np.nan, np.inf))
+
+    def _hurst(self, s):
+        lags = np.arange(2, self.max_lag + 1)
+        lags = lags[lags < len(s)]
+        if len(lags) < 2:
+            return np.full(s.shape[1], np.nan)
+        log_std = np.full((len(lags), s.shape[1]), np.nan)
+        for i, lag in enumerate(lags):
+            d = s[lag:] - s[:-lag]
+            valid = np.isfinite(d)
+            n = valid.sum(axis=0)
+            d = np.where(valid, d, 0.0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                var = (d * d).sum(axis=0) / n - (d.sum(axis=0) / n) ** 2
+                log_std[i] = 0.5 * np.log(np.where(var > 0, var, np.nan))
+        # Độ dốc hồi quy log std theo log τ (mọi cột cùng 1 trục log τ)
+        log_lag = np.log(lags) - np.log(lags).mean()
+        with np.errstate(invalid='ignore'):
+            return (log_lag[:, None] * (log_std - log_std.mean(axis=0))).sum(axis=0) / (log_lag * log_lag).sum()
+
+    @staticmethod
+    def _crossing_rate(s):
+        valid = np.isfinite(s)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centered = s - np.where(valid, s, 0.0).sum(axis=0) / n
+        sign = np.sign(centered)
+        # Chỉ đếm 2 phiên có dữ liệu liền nhau
+        pair_valid = valid[1:] & valid[:-1]
+        crossings = (pair_valid & (sign[1:] * sign[:-1] < 0)).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return crossings / pair_valid.sum(axis=0)
+
+    def score_spreads(self, spreads):
+        """
+        spreads: ma trận / DataFrame spread (phiên × cặp).
+        Output: DataFrame ['half_life', 'hurst', 'crossing_rate'] (dòng = cột của spreads).
+        """
+        columns = spreads.columns if isinstance(spreads, pd.DataFrame) else None
+        s = np.asarray(spreads, dtype=np.float64)
+        if s.ndim == 1:
+            s = s[:, None]
+        out = np.full((s.shape[1], 3), np.nan)
+        step = max(1, MAX_SCORE_BYTES // (8 * max(len(s), 1) * 4))
+        for c0 in range(0, s.shape[1], step):
+            part = s[:, c0:c0 + step]
+            out[c0:c0 + step] = np.column_stack([self._half_life(part), self._hurst(part), self._crossing_rate(part)])
+        return pd.DataFrame(out, index=columns, columns=['half_life', 'hurst', 'crossing_rate'])
+
+    def score_pairs(self, data, pairs, field='Adj Close'):
+        """
+        Chấm điểm spread Engle-Granger của danh sách cặp [(mã Y, mã X)].
+        data: PricePanel / dict {Mã: DataFrame} / DataFrame giá.
+        Output: DataFrame ['Ticker_1', 'Ticker_2', 'half_life', 'hurst', 'crossing_rate', 'passed'].
+        """
+        from .cointegration import CointegrationScanner
+        prices, tickers, _ = CointegrationScanner.price_data(data, field)
+        pos = {t: i for i, t in enumerate(tickers)}
+        frames = []
+        step = max(1, MAX_SCORE_BYTES // (8 * max(len(prices), 1) * 6))
+        for c0 in range(0, len(pairs), step):
+            part = pairs[c0:c0 + step]
+            y = prices[:, [pos[a] for a, _ in part]]
+            x = prices[:, [pos[b] for _, b in part]]
+            frames.append(self.score_spreads(self.residual_spreads(y, x)))
+        scores = pd.concat(frames, ignore_index=True) if frames else self.score_spreads(np.empty((0, 0)))
+        scores.insert(0, 'Ticker_1', [a for a, _ in pairs])
+        scores.insert(1, 'Ticker_2', [b for _, b in pairs])
+        passed = scores['half_life'].notna() & scores['hurst'].notna()
+        if self.max_half_life is not None:
+            passed &= scores['half_life'] <= self.max_half_life
+        if self.max_hurst is not None:
+            passed &= scores['hurst'] < self.max_hurst
+        scores['passed'] = passed
+        return scores
+
+    def rank(self, data, pairs, pvalues, key=None, top_n=None, field='Adj Close'):
+        """
+        Bỏ cặp không đạt chuẩn hồi quy về trung bình, xếp hạng phần còn lại theo key
+        (PAIR_RANK_KEY: 'pvalue', 'half_life', 'hurst' hoặc 'crossing_rate'), bằng nhau giữ thứ tự đầu vào.
+        Output: (danh sách cặp, danh sách p-value) như CointegrationScanner.top_pairs.
+        """
+        key = key or getattr(config, 'PAIR_RANK_KEY', 'pvalue')
+        if key not in self.KEYS:
+            raise ValueError(f"Tiêu chí xếp hạng không hỗ trợ: {key}. Chọn trong {tuple(self.KEYS)}")
+        scores = self.score_pairs(data, list(pairs), field)
+        scores['pvalue'] = list(pvalues)
+        scored = scores[scores['passed']].sort_values(key, ascending=self.KEYS[key], kind='stable')
+        if top_n is not None:
+            scored = scored.head(top_n)
+        return list(zip(scored['Ticker_1'], scored['Ticker_2'])), scored['pvalue'].tolist()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import config
+from .kernels import as_matrix, rolling_mean_std, shift
 
 class MomentumIndicators:
     """
@@ -39,4 +40,25 @@ class MomentumIndicators:
         prev_price = df['Adj Close'].shift(periods)
         # Giá thay đổi bao nhiêu % so với 5 ngày trước
         df['ROC'] = ((df['Adj Close'] - prev_price) / prev_price) * 100
-        return df.fillna(0)
\ No newline at end of file
+        return df.fillna(0)
+
+    # --- Tính cho cả thị trường: ma trận giá (ngày × mã) -> ma trận chỉ báo ---
+    def rsi_panel(self, prices):
+        """RSI cho mọi mã cùng lúc. prices: DataFrame / mảng (ngày × mã)."""
+        x, wrap = as_matrix(prices)
+        delta = x - shift(x, 1)
+        # NaN (phiên đầu) tính là 0 như delta.where(delta > 0, 0)
+        gain, _ = rolling_mean_std(np.where(delta > 0, delta, 0.0), self.rsi_window, with_std=False)
+        loss, _ = rolling_mean_std(np.where(delta < 0, -delta, 0.0), self.rsi_window, with_std=False)
+        loss[loss == 0] = np.nan # Tránh lỗi chia cho 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        return wrap(np.where(np.isnan(rsi), 50.0, rsi))
+
+    def roc_panel(self, prices, periods=5):
+        """ROC cho mọi mã cùng lúc (chỉ điền 0 cho ô ROC bị NaN)."""
+        x, wrap = as_matrix(prices)
+        prev_price = shift(x, periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            roc = ((x - prev_price) / prev_price) * 100
+        return wrap(np.where(np.isnan(roc), 0.0, roc))
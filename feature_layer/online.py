@@ -0,0 +1,256 @@
+import math
+from collections import deque
+import numpy as np
+import config
+
+class OnlineEMA:
+    """EMA cập nhật từng phiên (adjust=False): y_t = a*x_t + (1-a)*y_{t-1}, y_0 = x_0."""
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+class RollingWindow:
+    """
+    Cửa sổ trượt cố định: giữ window giá trị gần nhất cùng tổng và tổng bình phương,
+    trung bình / độ lệch chuẩn (ddof=1) cập nhật trong O(1).
+    Tổng được tính quanh 1 giá trị tham chiếu (shift) và tính lại từ đầu sau mỗi window lần
+    cập nhật để sai số cộng dồn không tăng theo thời gian.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.shift = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self._since_resync = 0
+
+    def _resync(self):
+        values = np.fromiter(self.values, dtype=np.float64)
+        self.shift = float(values.mean())
+        dev = values - self.shift
+        self.sum = float(dev.sum())
+        self.sumsq = float((dev * dev).sum())
+        self._since_resync = 0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            old = self.values[0] - self.shift
+            self.sum -= old
+            self.sumsq -= old * old
+        self.values.append(x)
+        d = x - self.shift
+        self.sum += d
+        self.sumsq += d * d
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def mean(self):
+        """Trung bình cửa sổ (NaN khi chưa đủ window giá trị, giống rolling().mean())."""
+        if not self.full:
+            return np.nan
+        return self.shift + self.sum / self.window
+
+    def std(self):
+        if not self.full or self.window < 2:
+            return np.nan
+        var = (self.sumsq - self.sum * self.sum / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+class RollingRegression:
+    """
+    Hồi quy y = a + beta*x trên window cặp (x, y) gần nhất (giống RollingOLS có hằng số),
+    beta = cov(x, y) / var(x) cập nhật trong O(1) từ các tổng trượt.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.pairs = deque(maxlen=window)
+        self.shift_x = self.shift_y = 0.0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self._since_resync = 0
+
+    def _resync(self):
+        xy = np.array(self.pairs, dtype=np.float64)
+        self.shift_x, self.shift_y = float(xy[:, 0].mean()), float(xy[:, 1].mean())
+        dx, dy = xy[:, 0] - self.shift_x, xy[:, 1] - self.shift_y
+        self.sx, self.sy = float(dx.sum()), float(dy.sum())
+        self.sxx, self.sxy = float((dx * dx).sum()), float((dx * dy).sum())
+        self._since_resync = 0
+
+    def update(self, x, y):
+        if len(self.pairs) == self.window:
+            ox, oy = self.pairs[0][0] - self.shift_x, self.pairs[0][1] - self.shift_y
+            self.sx -= ox
+            self.sy -= oy
+            self.sxx -= ox * ox
+            self.sxy -= ox * oy
+        self.pairs.append((x, y))
+        dx, dy = x - self.shift_x, y - self.shift_y
+        self.sx += dx
+        self.sy += dy
+        self.sxx += dx * dx
+        self.sxy += dx * dy
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def beta(self):
+        if len(self.pairs) < self.window:
+            return np.nan
+        var_x = self.sxx - self.sx * self.sx / self.window
+        if var_x == 0:
+            return np.nan
+        return (self.sxy - self.sx * self.sy / self.window) / var_x
+
+class IndicatorState:
+    """
+    Trạng thái chạy của các chỉ báo kỹ thuật cho 1 mã (cùng công thức với FeatureEngine):
+    - 3 EMA cho MACD (nhanh, chậm, tín hiệu)
+    - Tổng trượt lãi/lỗ cho RSI, tổng trượt giá cho SMA / độ lệch chuẩn (Dist_SMA, Bollinger)
+    - Bộ đệm vòng (ring buffer) giá cho ROC
+    Mỗi phiên mới chỉ cập nhật O(1), không cần tải lại lịch sử.
+    """
+    def __init__(self, roc_periods=5):
+        self.ema_fast = OnlineEMA(config.MACD_FAST)
+        self.ema_slow = OnlineEMA(config.MACD_SLOW)
+        self.ema_signal = OnlineEMA(config.MACD_SIGNAL)
+        self.prices = RollingWindow(config.WINDOW_SIZE)
+        self.gains = RollingWindow(config.RSI_WINDOW)
+        self.losses = RollingWindow(config.RSI_WINDOW)
+        self.roc_buffer = deque(maxlen=roc_periods + 1)
+        self.num_std = config.BB_STD_DEV
+        self.last_price = None
+
+    @classmethod
+    def from_prices(cls, prices, roc_periods=5):
+        """Khởi tạo bằng cách chạy qua toàn bộ chuỗi giá lịch sử (dùng lúc rebalance)."""
+        state = cls(roc_periods=roc_periods)
+        for p in np.asarray(prices, dtype=np.float64):
+            state.update(p)
+        return state
+
+    def update(self, price):
+        """Nhận giá phiên mới, trả về dict giá trị các chỉ báo của phiên đó."""
+        price = float(price)
+        prev = self.last_price
+        delta = price - prev if prev is not None else 0.0 # Phiên đầu tiên tính là 0 (như add_rsi)
+        self.gains.update(delta if delta > 0 else 0.0)
+        self.losses.update(-delta if delta < 0 else 0.0)
+        self.prices.update(price)
+        self.roc_buffer.append(price)
+        self.last_price = price
+
+        # MACD
+        macd = self.ema_fast.update(price) - self.ema_slow.update(price)
+        signal = self.ema_signal.update(macd)
+
+        # RSI (thiếu dữ liệu / không có phiên lỗ -> 50 như add_rsi)
+        avg_gain, avg_loss = self.gains.mean(), self.losses.mean()
+        if np.isnan(avg_gain) or np.isnan(avg_loss) or avg_loss == 0:
+            rsi = 50.0
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        # ROC
+        if len(self.roc_buffer) == self.roc_buffer.maxlen and self.roc_buffer[0] != 0:
+            roc = (price - self.roc_buffer[0]) / self.roc_buffer[0] * 100
+        else:
+            roc = 0.0
+
+        # SMA, Bollinger
+        sma, std = self.prices.mean(), self.prices.std()
+        upper_band = sma + std * self.num_std
+        lower_band = sma - std * self.num_std
+        bandwidth = upper_band - lower_band
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'Adj Close': price,
+                'Log_Return': np.log(price / prev) if prev else np.nan,
+                'Dist_SMA': np.float64(price - sma) / sma,
+                'MACD': macd,
+                'MACD_Signal': signal,
+                'MACD_Hist': macd - signal,
+                'RSI': rsi,
+                'ROC': roc,
+                'Boll_Percent': np.float64(price - lower_band) / bandwidth,
+                'Boll_Width': np.float64(bandwidth) / sma,
+            }
+
+class PairSpreadState:
+    """
+    Trạng thái chạy của spread 1 cặp (giống calculate_rolling_spread):
+    Beta trượt (hồi quy Y theo X) -> Spread = Y - Beta*X -> Z-score theo mean/std trượt của Spread.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.regression = RollingRegression(window)
+        self.spreads = RollingWindow(window)
+        self.last_beta = np.nan
+
+    @classmethod
+    def from_history(cls, y, x, spread, window):
+        """Khởi tạo từ window phiên cuối của giá 2 mã và của Spread đã tính lúc rebalance."""
+        state = cls(window)
+        for xi, yi in zip(np.asarray(x, dtype=np.float64)[-window:], np.asarray(y, dtype=np.float64)[-window:]):
+            state.regression.update(xi, yi)
+        for s in np.asarray(spread, dtype=np.float64)[-window:]:
+            state.spreads.update(s)
+        state.last_beta = state.regression.beta()
+        return state
+
+    def update(self, y, x):
+        self.regression.update(float(x), float(y))
+        beta = self.regression.beta()
+        if not np.isnan(beta):
+            self.last_beta = beta
+        spread = y - self.last_beta * x
+        self.spreads.update(spread)
+        mean, std = self.spreads.mean(), self.spreads.std()
+        z_score = (spread - mean) / std if std else np.nan
+        return {'Spread': spread, 'Spread_Z': z_score, 'Beta': self.last_beta}
+
+class PairOnlineState:
+    """
+    Toàn bộ trạng thái cần cho giao dịch hằng ngày của 1 cặp (lưu trong file model lúc rebalance):
+    chỉ báo của 2 mã (hậu tố _Y, _X như calculate_rolling_spread) + spread, và ngày đã cập nhật cuối cùng.
+    """
+    def __init__(self, tickers, legs, spread, last_date):
+        self.tickers = tuple(tickers)
+        self.legs = legs       # {'_Y': IndicatorState, '_X': IndicatorState}
+        self.spread = spread   # PairSpreadState hoặc KalmanSpread (cùng update(y, x))
+        self.last_date = last_date
+
+    @classmethod
+    def from_history(cls, tickers, df1, df2, df_pair, window, price_col='Adj Close', spread_state=None):
+        """
+        df1, df2: dữ liệu đã xử lý của 2 mã; df_pair: kết quả calculate_rolling_spread.
+        spread_state: trạng thái spread đã chạy hết lịch sử (VD: KalmanSpread của calculate_kalman_spread),
+                      mặc định dựng PairSpreadState theo Beta trượt.
+        """
+        legs = {
+            '_Y': IndicatorState.from_prices(df1[price_col]),
+            '_X': IndicatorState.from_prices(df2[price_col]),
+        }
+        spread = spread_state
+        if spread is None:
+            spread = PairSpreadState.from_history(df1[price_col], df2[price_col], df_pair['Spread'], window)
+        return cls(tickers, legs, spread, df1.index[-1])
+
+    def update(self, date, price_y, price_x):
+        """Nhận giá phiên mới của 2 mã, trả về dict 1 dòng dữ liệu của cặp (cùng tên cột với df_pair)."""
+        row = {}
+        for suffix, price in (('_Y', price_y), ('_X', price_x)):
+            for name, value in self.legs[suffix].update(price).items():
+                row[f"{name}{suffix}"] = value
+        row.update(self.spread.update(price_y, price_x))
+        self.last_date = date
+        return row
@@ -1,8 +1,5 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import coint
-from itertools import combinations
 import config
 
 class PairsIndicators:
@@ -17,51 +14,32 @@ class PairsIndicators:
     def find_best_pair(self, data_dict: dict):
         """
         Quét tất cả các cặp có thể để tìm cặp di chuyển cùng nhau dài hạn
-        đầu vào là dữ liệu đã được làm sạch
+        đầu vào là dữ liệu đã được làm sạch (dict {Mã: DataFrame} hoặc PricePanel)
+        Kiểm định Engle-Granger cho mọi cặp chạy theo lô (CointegrationScanner), kết quả như coint().
         """
+        from .cointegration import CointegrationScanner
+        from .prefilter import PairPrefilter
         tickers = list(data_dict.keys())
-        best_pvalue = 1.0
-        best_pair = None
         
         print(f" Đang quét đồng tích hợp cho {len(tickers)} ")
 
-        # Tạo tất cả tổ hợp cặp đôi (VD: VCB-BID, VCB-CTG...)
-        for t1, t2 in combinations(tickers, 2):
-            # Lấy dữ liệu giá đóng cửa đã làm sạch
-            s1 = data_dict[t1]['Adj Close']
-            s2 = data_dict[t2]['Adj Close']
-            
-            # 1. Ghép 2 chuỗi lại thành 1 DataFrame
-            df_temp = pd.concat([s1, s2], axis=1)
-            
-            # 2. Xóa các dòng mà 1 trong 2 bị NaN (do chỉ báo indicator gây ra)
-            df_temp = df_temp.dropna()
-            
-            # 3. Kiểm tra nếu dữ liệu còn lại quá ít thì bỏ qua
-            if len(df_temp) < 100: 
-                continue
-                
-            # 4. Tách ra lại để test
-            clean_s1 = df_temp.iloc[:, 0]
-            clean_s2 = df_temp.iloc[:, 1]
-            # --------------------------------
-
-            # kiểm định cointegration (Engle-Granger Test)
-            try:
-                score, pvalue, _ = coint(clean_s1, clean_s2)
-                if pvalue < best_pvalue:
-                    best_pvalue = pvalue
-                    best_pair = (t1, t2)
-            except:
-                continue
-        
-        return best_pair, best_pvalue
+        # Tất cả tổ hợp cặp đôi (VD: VCB-BID, VCB-CTG...), cặp ít hơn 100 phiên chung bị bỏ qua (p-value NaN).
+        # Cặp có p-value nhỏ nhất (trùng nhau thì lấy cặp xuất hiện trước như vòng lặp cũ)
+        # PAIR_PREFILTER: chỉ kiểm định k mã gần nhất của từng mã thay vì mọi tổ hợp
+        prefilter = PairPrefilter() if getattr(config, 'PAIR_PREFILTER', None) else None
+        pairs, pvalues = CointegrationScanner(min_obs=100).top_pairs(
+            data_dict, top_n=1, max_pvalue=1.0, prefilter=prefilter
+        )
+        if not pairs:
+            return None, 1.0
+        return pairs[0], pvalues[0]
 
     def calculate_spread_zscore(self, df1: pd.DataFrame, df2: pd.DataFrame):
         """
         Tính Spread (Khoảng cách) và Z-score (Độ lệch chuẩn hóa).
         Công thức: Spread = Y - Beta * X
         """
+        import statsmodels.api as sm
         # Hồi quy tuyến tính tìm Beta (Hedge Ratio)
         # Giả sử: Giá df1 = Beta * Giá df2 + E
         x = df2['Adj Close']
@@ -1,9 +1,5 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import coint
-from statsmodels.regression.rolling import RollingOLS # Cần cho Beta động
-from itertools import combinations
 import config
 
 class PairsIndicatorsUpdated:
@@ -15,80 +11,121 @@ class PairsIndicatorsUpdated:
     def __init__(self):
         pass
 
-    def find_top_n_pairs(self, data_dict: dict, top_n=5):
+    def find_top_n_pairs(self, data_dict: dict, top_n=5, store=None):
         """
         Quét và trả về danh sách Top N cặp đồng tích hợp tốt nhất.
+        data_dict: dict {Mã: DataFrame} hoặc PricePanel.
+        Kiểm định Engle-Granger cho mọi cặp chạy theo lô (CointegrationScanner), kết quả như coint().
+        store: CointegrationStore -> chỉ kiểm định lại cặp mới / dữ liệu đổi / quá hạn, xếp hạng từ kho.
         """
-        tickers = list(data_dict.keys())
-        # Danh sách lưu kết quả: [(p_value, pair_tuple), ...]
-        scored_pairs = []
+        from .cointegration import CointegrationScanner
+        from .prefilter import PairPrefilter
+        from .mean_reversion import MeanReversionScorer
         
         print(f" [UPDATED] Đang quét đồng tích hợp để tìm Top {top_n}...")
 
-        # Tạo tất cả tổ hợp
-        for t1, t2 in combinations(tickers, 2):
-            s1 = data_dict[t1]['Adj Close']
-            s2 = data_dict[t2]['Adj Close']
-            
-            # Làm sạch dữ liệu chung
-            df_temp = pd.concat([s1, s2], axis=1).dropna()
-            
-            # Bỏ qua nếu dữ liệu quá ngắn
-            if len(df_temp) < 100: 
-                continue
-            
-            try:
-                # Kiểm định Cointegration
-                score, pvalue, _ = coint(df_temp.iloc[:, 0], df_temp.iloc[:, 1])
-                
-                # Chỉ lấy những cặp đạt chuẩn P-value (theo config)
-                if pvalue < config.COINT_PVALUE_THRESH:
-                    scored_pairs.append((pvalue, (t1, t2)))
-            except:
-                continue
-        
-        # Sắp xếp danh sách theo P-value tăng dần (Càng nhỏ càng tốt)
-        scored_pairs.sort(key=lambda x: x[0])
-        
-        # Lấy Top N
-        top_pairs = [item[1] for item in scored_pairs[:top_n]]
-        top_pvalues = [item[0] for item in scored_pairs[:top_n]]
+        # Tất cả tổ hợp, bỏ qua cặp có ít hơn 100 phiên dữ liệu chung (p-value NaN).
+        # Chỉ lấy những cặp đạt chuẩn P-value (theo config), sắp xếp theo P-value tăng dần
+        # (Càng nhỏ càng tốt), giữ thứ tự tổ hợp khi bằng nhau; COINT_WORKERS > 1 thì quét song song.
+        # PAIR_PREFILTER: chỉ kiểm định k mã gần nhất của từng mã thay vì mọi tổ hợp
+        prefilter = PairPrefilter() if getattr(config, 'PAIR_PREFILTER', None) else None
+        scanner = CointegrationScanner(min_obs=100)
+        # Xếp hạng theo half-life / Hurst / tỷ lệ cắt trung bình hoặc lọc cặp hồi quy chậm:
+        # lấy PAIR_RANK_POOL cặp p-value tốt nhất rồi chấm điểm cả lô
+        scorer = MeanReversionScorer()
+        rank_key = getattr(config, 'PAIR_RANK_KEY', 'pvalue')
+        rescore = rank_key != 'pvalue' or scorer.max_half_life is not None or scorer.max_hurst is not None
+        n_scan = max(top_n, getattr(config, 'PAIR_RANK_POOL', 50)) if rescore else top_n
+        if store is not None:
+            top_pairs, top_pvalues = store.top_pairs(
+                data_dict, top_n=n_scan, max_pvalue=config.COINT_PVALUE_THRESH, scanner=scanner, prefilter=prefilter
+            )
+        else:
+            top_pairs, top_pvalues = scanner.top_pairs(
+                data_dict, top_n=n_scan, max_pvalue=config.COINT_PVALUE_THRESH, prefilter=prefilter
+            )
+        if rescore and top_pairs:
+            top_pairs, top_pvalues = scorer.rank(data_dict, top_pairs, top_pvalues, key=rank_key, top_n=top_n)
         
         return top_pairs, top_pvalues
 
-    def calculate_rolling_spread(self, df1: pd.DataFrame, df2: pd.DataFrame, window=60):
+    def calculate_rolling_spread(self, df1: pd.DataFrame, df2: pd.DataFrame, window=60,
+                                 keep_columns=None, compact=None):
         """
         Tính Spread với Beta trượt (Rolling Beta).
         Spread sẽ luôn dao động quanh 0 tốt hơn so với Beta tĩnh.
+        Nhiều cặp cùng lúc (chỉ Spread / Z-score / Beta): dùng calculate_rolling_spreads.
+        keep_columns: chỉ mang các cột này của từng mã vào kết quả (mặc định: toàn bộ cột).
+        compact: lưu kết quả dạng float32 (mặc định theo COMPACT_FEATURES); phép tính vẫn dùng float64.
         """
-        # Chuẩn bị biến
+        from .kernels import rolling_spread
+        # Chuẩn bị biến (X theo đúng các phiên của Y)
         y = df1['Adj Close']
-        x = df2['Adj Close']
-        x = sm.add_constant(x)
-        
-        # Chạy Rolling OLS
-        rolling_model = RollingOLS(y, x, window=window, min_nobs=window)
-        rolling_res = rolling_model.fit()
-        
-        # Lấy Beta theo thời gian (Hệ số góc)
-        beta_series = rolling_res.params.iloc[:, 1]
+        x = df2['Adj Close'].reindex(y.index)
         
-        # Fill Beta những ngày đầu (bị NaN) bằng giá trị đầu tiên tính được
-        beta_series = beta_series.bfill()
-        
-        # Tính Spread: Y - Beta_t * X
-        spread = df1['Adj Close'] - beta_series * df2['Adj Close']
-        
-        # Tính Z-score động (theo mean/std trượt của Spread)
-        spread_mean = spread.rolling(window=window).mean()
-        spread_std = spread.rolling(window=window).std()
-        
-        z_score = (spread - spread_mean) / spread_std
+        # Beta trượt từ tổng trượt của x, y, x², xy (cùng kết quả với RollingOLS có hằng số, O(n)),
+        # Beta những ngày đầu (bị NaN) điền bằng giá trị đầu tiên tính được,
+        # Spread = Y - Beta_t * X, Z-score động theo mean/std trượt của Spread
+        beta, spread, z_score = rolling_spread(
+            y.to_numpy(dtype=np.float64)[:, None], x.to_numpy(dtype=np.float64)[:, None], window
+        )
+        beta_series = pd.Series(beta[:, 0], index=y.index)
+        spread = pd.Series(spread[:, 0], index=y.index)
+        z_score = pd.Series(z_score[:, 0], index=y.index)
         
+        return self._pair_frame(df1, df2, spread, z_score, beta_series, keep_columns, compact), beta_series.mean()
+
+    def calculate_kalman_spread(self, df1: pd.DataFrame, df2: pd.DataFrame, keep_columns=None, compact=None,
+                                state=None):
+        """
+        Tính Spread với Beta động theo bộ lọc Kalman (KalmanSpread): phản ứng nhanh hơn Beta trượt khi
+        quan hệ 2 mã đổi trạng thái, cùng các cột Spread / Spread_Z / Beta như calculate_rolling_spread.
+        state: KalmanSpread đã chạy tới trước các phiên này (mặc định: khởi tạo mới từ phiên đầu).
+        Output: (bảng cặp, Beta trung bình, KalmanSpread sau phiên cuối -> lưu để cập nhật từng phiên).
+        """
+        from .kalman import KalmanSpread
+        y = df1['Adj Close']
+        x = df2['Adj Close'].reindex(y.index)
+        state = state or KalmanSpread()
+        beta, spread, z_score = state.transform(y.to_numpy(), x.to_numpy())
+        beta_series = pd.Series(beta, index=y.index)
+        df_combined = self._pair_frame(
+            df1, df2, pd.Series(spread, index=y.index), pd.Series(z_score, index=y.index),
+            beta_series, keep_columns, compact
+        )
+        return df_combined, beta_series.mean(), state
+
+    def _pair_frame(self, df1, df2, spread, z_score, beta_series, keep_columns, compact):
         # Đóng gói dữ liệu
+        if keep_columns is not None:
+            df1, df2 = df1[list(keep_columns)], df2[list(keep_columns)]
         df_combined = pd.concat([df1.add_suffix('_Y'), df2.add_suffix('_X')], axis=1)
         df_combined['Spread'] = spread
         df_combined['Spread_Z'] = z_score
         df_combined['Beta'] = beta_series # Lưu để theo dõi
+
+        if getattr(config, 'COMPACT_FEATURES', False) if compact is None else compact:
+            float_cols = df_combined.select_dtypes(include=['float64']).columns
+            df_combined = df_combined.astype({c: np.float32 for c in float_cols})
         
-        return df_combined.dropna(), beta_series.mean()
\ No newline at end of file
+        return df_combined.dropna()
+
+    def calculate_rolling_spreads(self, data, pairs, window=60, field='Adj Close'):
+        """
+        Spread / Z-score / Beta trượt cho nhiều cặp trong 1 lần tính ma trận (phiên × cặp),
+        cùng công thức với calculate_rolling_spread.
+        data: PricePanel / dict {Mã: DataFrame} / DataFrame giá (phiên × mã); pairs: [(mã Y, mã X)].
+        Output: dict {'Spread', 'Spread_Z', 'Beta'} -> DataFrame (phiên × cặp, cột 'Y-X').
+        """
+        from .kernels import rolling_spread
+        from .cointegration import CointegrationScanner
+        prices, tickers, dates = CointegrationScanner.price_data(data, field)
+        pos = {t: i for i, t in enumerate(tickers)}
+        y = prices[:, [pos[a] for a, _ in pairs]]
+        x = prices[:, [pos[b] for _, b in pairs]]
+        beta, spread, z_score = rolling_spread(y, x, window)
+        columns = [f"{a}-{b}" for a, b in pairs]
+        return {
+            name: pd.DataFrame(values, index=dates, columns=columns)
+            for name, values in (('Spread', spread), ('Spread_Z', z_score), ('Beta', beta))
+        }
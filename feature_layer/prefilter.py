@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import config
+
+# Giới hạn RAM cho 1 khối hàng của ma trận điểm (mã × mã) khi chọn k láng giềng
+BLOCK_BYTES = 64 * 1024 ** 2
+
+class PairPrefilter:
+    """
+    Lọc sơ bộ cặp ứng viên trước kiểm định Engle-Granger (đắt):
+    mỗi mã chỉ giữ k mã "gần" nhất theo 1 thước đo rẻ, ứng viên = hợp các cặp (mã, láng giềng).
+    - 'corr': tương quan lợi suất log (càng cao càng gần; phiên thiếu dữ liệu tính là lợi suất trung bình)
+    - 'ssd':  bình phương chênh lệch trung bình của giá chuẩn hóa (giá / giá phiên đầu) trên các phiên chung
+    - 'knn':  láng giềng gần nhất (sklearn NearestNeighbors) của đường giá log đã chuẩn hóa, giảm chiều bằng PCA
+    Số cặp cần kiểm định giảm từ N(N-1)/2 xuống tối đa N*k.
+    """
+    METHODS = ('corr', 'ssd', 'knn')
+
+    def __init__(self, method=None, k=None, n_components=None):
+        self.method = method or getattr(config, 'PAIR_PREFILTER', None) or 'corr'
+        if self.method not in self.METHODS:
+            raise ValueError(f"Phương pháp lọc cặp không hỗ trợ: {self.method}. Chọn trong {self.METHODS}")
+        self.k = k or getattr(config, 'PAIR_PREFILTER_K', 20)
+        self.n_components = n_components or getattr(config, 'PAIR_PREFILTER_COMPONENTS', 32)
+
+    def candidates(self, prices):
+        """
+        prices: ma trận giá (phiên × mã).
+        Output: vị trí (tăng dần, không trùng) của các cặp ứng viên trong thứ tự combinations(range(N), 2).
+        """
+        n = prices.shape[1]
+        if n < 2:
+            return np.empty(0, dtype=np.int64)
+        k = min(self.k, n - 1)
+        neighbors = getattr(self, f"_{self.method}_neighbors")(np.asarray(prices, dtype=np.float64), k)
+
+        rows = np.repeat(np.arange(n, dtype=np.int64), k)
+        cols = neighbors.ravel().astype(np.int64)
+        keep = rows != cols
+        i = np.minimum(rows[keep], cols[keep])
+        j = np.maximum(rows[keep], cols[keep])
+        return np.unique(i * n - i * (i + 1) // 2 + (j - i - 1))
+
+    @staticmethod
+    def _top_k(score_block, n, k, largest):
+        """k cột có điểm tốt nhất của từng hàng, tính theo khối hàng (không dựng cả ma trận N × N)."""
+        step = max(1, BLOCK_BYTES // (8 * n))
+        neighbors = np.empty((n, k), dtype=np.intp)
+        for r0 in range(0, n, step):
+            r1 = min(r0 + step, n)
+            # Đổi dấu để luôn chọn giá trị nhỏ nhất; NaN (không so được) và chính nó xếp cuối
+            score = -score_block(r0, r1) if largest else score_block(r0, r1)
+            score[np.isnan(score)] = np.inf
+            score[np.arange(r1 - r0), np.arange(r0, r1)] = np.inf
+            neighbors[r0:r1] = np.argpartition(score, k - 1, axis=1)[:, :k]
+        return neighbors
+
+    def _corr_neighbors(self, prices, k):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.diff(np.log(prices), axis=0)
+        valid = np.isfinite(returns)
+        count = np.maximum(valid.sum(axis=0), 1)
+        z = np.where(valid, returns, 0.0)
+        z = np.where(valid, z - z.sum(axis=0) / count, 0.0)
+        norm = np.sqrt((z * z).sum(axis=0))
+        z /= np.where(norm > 0, norm, 1.0)
+        return self._top_k(lambda r0, r1: z[:, r0:r1].T @ z, prices.shape[1], k, largest=True)
+
+    def _ssd_neighbors(self, prices, k):
+        valid = np.isfinite(prices)
+        base = prices[valid.argmax(axis=0), np.arange(prices.shape[1])]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            a = np.where(valid, prices / base, 0.0)
+        m = valid.astype(np.float64)
+        a2 = a * a
+
+        def score(r0, r1):
+            # Tổng (a_i - a_j)^2 chỉ trên các phiên cả 2 mã cùng có dữ liệu, chia cho số phiên chung
+            ssd = a2[:, r0:r1].T @ m + m[:, r0:r1].T @ a2 - 2 * (a[:, r0:r1].T @ a)
+            common = m[:, r0:r1].T @ m
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(common > 0, ssd / common, np.nan)
+
+        return self._top_k(score, prices.shape[1], k, largest=False)
+
+    def _knn_neighbors(self, prices, k):
+        from sklearn.decomposition import PCA
+        from sklearn.neighbors import NearestNeighbors
+        with np.errstate(invalid='ignore', divide='ignore'):
+            paths = np.log(prices)
+        valid = np.isfinite(paths)
+        count = np.maximum(valid.sum(axis=0), 1)
+        paths = np.where(valid, paths, 0.0)
+        paths = np.where(valid, paths - paths.sum(axis=0) / count, 0.0)
+        std = np.sqrt((paths * paths).sum(axis=0) / count)
+        paths /= np.where(std > 0, std, 1.0) # Thiếu dữ liệu -> 0 (bằng trung bình)
+
+        n = prices.shape[1]
+        n_components = min(self.n_components, n, prices.shape[0])
+        points = PCA(n_components=n_components, random_state=0).fit_transform(paths.T)
+        _, idx = NearestNeighbors(n_neighbors=k + 1).fit(points).kneighbors(points)
+        # Bỏ chính nó (có thể không đứng đầu nếu có mã trùng đường giá)
+        order = np.argsort(idx == np.arange(n)[:, None], axis=1, kind='stable')
+        return np.take_along_axis(idx, order, axis=1)[:, :k]
+
+    def recall_report(self, data, ks=(5, 10, 20, 50), top_n=5, max_pvalue=None, field='Adj Close', scanner=None):
+        """
+        So sánh với quét toàn bộ để chọn k: với mỗi k, tỷ lệ cặp đạt chuẩn (p-value < max_pvalue)
+        và tỷ lệ Top N cặp của quét toàn bộ nằm trong danh sách ứng viên.
+        Output: DataFrame ['k', 'candidates', 'tested_pct', 'recall', 'recall_top_n'].
+        """
+        from .cointegration import CointegrationScanner
+        if max_pvalue is None:
+            max_pvalue = config.COINT_PVALUE_THRESH
+        scanner = scanner or CointegrationScanner(min_obs=100)
+        prices, _ = scanner.price_matrix(data, field)
+        n = prices.shape[1]
+        n_pairs = n * (n - 1) // 2
+
+        # Quét toàn bộ 1 lần (vị trí cặp = thứ tự combinations)
+        pvalue = scanner.test_indices(prices, *np.triu_indices(n, k=1))['pvalue']
+        significant = np.flatnonzero(pvalue < max_pvalue)
+        top = significant[np.argsort(pvalue[significant], kind='stable')[:top_n]]
+
+        rows = []
+        for k in ks:
+            candidates = PairPrefilter(self.method, k, self.n_components).candidates(prices)
+            rows.append({
+                'k': k,
+                'candidates': len(candidates),
+                'tested_pct': 100.0 * len(candidates) / max(n_pairs, 1),
+                'recall': np.isin(significant, candidates).mean() if len(significant) else np.nan,
+                'recall_top_n': np.isin(top, candidates).mean() if len(top) else np.nan,
+            })
+        return pd.DataFrame(rows)
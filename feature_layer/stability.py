@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import config
+from .cointegration import CointegrationScanner, mackinnonp_batch
+
+# Giới hạn bộ nhớ cho ma trận hồi quy cơ sở của 1 lô cặp (phiên × cặp × số biến)
+MAX_STABILITY_BYTES = 64 * 1024 ** 2
+
+class CointegrationStability:
+    """
+    Chuỗi thời gian thống kê Engle-Granger của nhiều cặp trên cửa sổ trượt ('rolling') hoặc mở rộng ('expanding'),
+    đánh giá mỗi step phiên, kèm cờ cặp đã mất đồng tích hợp.
+
+    Không hồi quy lại từ đầu ở mỗi ngày: mọi đại lượng của 2 bước Engle-Granger đều suy ra từ tổng tích chéo
+    (ma trận Gram) của các biến cơ sở z_t = [1, y_{t-1}, x_{t-1}, Δy_t, Δx_t, Δy_{t-1}, Δx_{t-1}, ...]:
+    - Bước 1 (y = a + b*x): từ tổng của x, y, x², xy trên cửa sổ.
+    - Bước 2 (ADF không hằng số trên phần dư e = y - a - b*x): e_{t-1}, Δe_{t-j} là tổ hợp tuyến tính của z_t
+      theo (a, b) -> ma trận X'X, X'y của ADF = C G C' với G = Σ z z'.
+    Khi cửa sổ trượt, G chỉ cộng các phiên mới và trừ các phiên rời khỏi cửa sổ (tính lại từ đầu sau mỗi window
+    phiên để sai số cộng dồn không tăng). Số lag ADF cố định (lag) để thống kê các ngày so sánh được với nhau;
+    kết quả khớp coint(y, x, maxlag=lag, autolag=None) trên cùng cửa sổ.
+    """
+    def __init__(self, window=None, step=None, lag=None, mode='rolling', min_obs=100):
+        self.window = window or getattr(config, 'COINT_STABILITY_WINDOW', 250)
+        self.step = step or getattr(config, 'COINT_STABILITY_STEP', 5)
+        self.lag = getattr(config, 'COINT_STABILITY_LAG', 1) if lag is None else lag
+        if mode not in ('rolling', 'expanding'):
+            raise ValueError(f"mode phải là 'rolling' hoặc 'expanding', nhận được: {mode}")
+        self.mode = mode
+        self.min_obs = min_obs
+
+    def _eval_points(self, n_obs):
+        """Các mốc t (cửa sổ kết thúc trước dòng t): mỗi step phiên, luôn gồm phiên cuối cùng."""
+        first = self.window if self.mode == 'rolling' else max(self.min_obs, self.lag + 3)
+        if n_obs < first:
+            return np.empty(0, dtype=np.int64)
+        points = np.arange(n_obs, first - 1, -self.step)[::-1]
+        return points
+
+    def _base(self, y, x):
+        """Biến cơ sở z (phiên × cặp × m) và dòng hợp lệ (mọi biến trễ đều có dữ liệu)."""
+        n, n_pairs = y.shape
+        p = self.lag
+        m = 3 + 2 * (p + 1)
+        z = np.zeros((n, n_pairs, m))
+        dy = np.full_like(y, np.nan)
+        dx = np.full_like(x, np.nan)
+        dy[1:], dx[1:] = y[1:] - y[:-1], x[1:] - x[:-1]
+        z[:, :, 0] = 1.0
+        z[1:, :, 1], z[1:, :, 2] = y[:-1], x[:-1]
+        for j in range(p + 1):
+            z[j:, :, 3 + 2 * j] = dy[:n - j]
+            z[j:, :, 4 + 2 * j] = dx[:n - j]
+        z[:p + 1] = np.nan # Chưa đủ dữ liệu trễ
+        valid = np.isfinite(z).all(axis=2)
+        z[~valid] = 0.0
+        return z, valid
+
+    def _adf_tstat(self, gram, a, b, nobs):
+        """Thống kê t của ADF (không hằng số, lag cố định) trên phần dư e = y - a - b*x, suy từ ma trận Gram."""
+        n_pairs, m = gram.shape[:2]
+        p = self.lag
+        k = p + 1
+        # Hệ số tổ hợp: hàng 0 = e_{t-1}, hàng j = Δe_{t-j}; d = Δe_t
+        c = np.zeros((n_pairs, k, m))
+        c[:, 0, 0], c[:, 0, 1], c[:, 0, 2] = -a, 1.0, -b
+        for j in range(1, p + 1):
+            c[:, j, 3 + 2 * j], c[:, j, 4 + 2 * j] = 1.0, -b
+        d = np.zeros((n_pairs, m))
+        d[:, 3], d[:, 4] = 1.0, -b
+
+        gc = gram @ c.transpose(0, 2, 1)                      # G C'  (cặp × m × k)
+        xx = c @ gc                                           # C G C'
+        xy = np.einsum('pmk,pm->pk', gc, d)                   # C G d
+        yy = np.einsum('pm,pmn,pn->p', d, gram, d)            # d' G d
+        tstat = np.full(n_pairs, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ok = np.flatnonzero(np.isfinite(xx).all(axis=(1, 2)) & (np.linalg.det(xx) > 0))
+            if len(ok):
+                inv = np.linalg.inv(xx[ok])
+                params = np.einsum('pij,pj->pi', inv, xy[ok])
+                ssr = yy[ok] - np.einsum('pi,pi->p', params, xy[ok])
+                sigma2 = ssr / (nobs[ok] - k)
+                tstat[ok] = params[:, 0] / np.sqrt(sigma2 * inv[:, 0, 0])
+        return tstat
+
+    def _batch(self, y, x, points):
+        """Thống kê của 1 lô cặp tại mọi mốc: (t, beta, số phiên) dạng (mốc × cặp)."""
+        n, n_pairs = y.shape
+        p = self.lag
+        # Chia cho giá phiên đầu có dữ liệu (t-stat không đổi, số nhỏ -> tổng ít sai số hơn)
+        first = np.argmax(np.isfinite(y) & np.isfinite(x), axis=0)
+        y = y / y[first, np.arange(n_pairs)]
+        x = x / x[first, np.arange(n_pairs)]
+        z, valid_z = self._base(y, x)
+        valid_xy = np.isfinite(y) & np.isfinite(x)
+        w = np.stack([np.ones_like(y), x, y, x * x, x * y], axis=2)
+        w[~valid_xy] = 0.0
+
+        def sums(lo, hi):
+            zz = z[lo:hi]
+            return (np.einsum('rpi,rpj->pij', zz, zz), w[lo:hi].sum(axis=0),
+                    (~valid_z[lo:hi]).sum(axis=0), (~valid_xy[lo:hi]).sum(axis=0))
+
+        tstat = np.full((len(points), n_pairs), np.nan)
+        beta = np.full((len(points), n_pairs), np.nan)
+        nobs = np.zeros(len(points), dtype=np.int64)
+        state, lo, hi, since_resync = None, 0, 0, 0
+        for i, t in enumerate(points):
+            new_lo = t - self.window if self.mode == 'rolling' else 0
+            # Bước 1 dùng các phiên [new_lo, t), ADF dùng [new_lo + lag + 1, t) (mất lag + 1 phiên đầu cho biến trễ)
+            if state is None or since_resync >= self.window:
+                state, since_resync = list(sums(new_lo, t)), 0
+            else:
+                added, removed = sums(hi, t), sums(lo, new_lo)
+                for s, a_, r_ in zip(state, added, removed):
+                    s += a_ - r_
+                since_resync += t - hi
+            lo, hi = new_lo, t
+
+            gram_step1, bad_step1 = state[1], state[3]
+            n_w = gram_step1[:, 0]
+            sx, sy, sxx, sxy = gram_step1[:, 1], gram_step1[:, 2], gram_step1[:, 3], gram_step1[:, 4]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                b = (sxy - sx * sy / n_w) / (sxx - sx * sx / n_w)
+                a = (sy - b * sx) / n_w
+            # ADF: bỏ lag + 1 phiên đầu của cửa sổ khỏi tổng (chưa đủ dữ liệu trễ trong cửa sổ)
+            head = sums(lo, lo + p + 1)
+            gram = state[0] - head[0]
+            bad_adf = state[2] - head[2]
+            n_adf = (t - lo) - (p + 1)
+            ok = (bad_step1 == 0) & (bad_adf == 0) & (n_w >= self.min_obs)
+            t_i = self._adf_tstat(gram, a, b, np.full(n_pairs, float(n_adf)))
+            tstat[i] = np.where(ok, t_i, np.nan)
+            beta[i] = np.where(ok, b, np.nan)
+            nobs[i] = t - lo
+        return tstat, beta, nobs
+
+    def surface(self, data, pairs, field='Adj Close'):
+        """
+        data: PricePanel / dict {Mã: DataFrame} / DataFrame giá; pairs: [(mã Y, mã X)].
+        Output: dict {'t_stat', 'pvalue', 'beta'} -> DataFrame (ngày đánh giá × cặp 'Y-X'), 'nobs' -> Series.
+        beta là hệ số của giá gốc (không chuẩn hóa).
+        """
+        prices, tickers, dates = CointegrationScanner.price_data(data, field)
+        pos = {t: i for i, t in enumerate(tickers)}
+        y_all = prices[:, [pos[a] for a, _ in pairs]]
+        x_all = prices[:, [pos[b] for _, b in pairs]]
+        points = self._eval_points(len(dates))
+        columns = [f"{a}-{b}" for a, b in pairs]
+
+        tstat = np.full((len(points), len(pairs)), np.nan)
+        beta = np.full((len(points), len(pairs)), np.nan)
+        nobs = np.zeros(len(points), dtype=np.int64)
+        m = 3 + 2 * (self.lag + 1)
+        step = max(1, MAX_STABILITY_BYTES // (8 * max(len(dates), 1) * (m + 6)))
+        for c0 in range(0, len(pairs), step):
+            part = slice(c0, c0 + step)
+            tstat[:, part], beta[:, part], nobs = self._batch(y_all[:, part], x_all[:, part], points)
+
+        # Đổi beta về theo giá gốc: y/y0 = a + b * x/x0  ->  y = ... + b * (y0/x0) * x
+        first = np.argmax(np.isfinite(y_all) & np.isfinite(x_all), axis=0)
+        ratio = y_all[first, np.arange(len(pairs))] / x_all[first, np.arange(len(pairs))]
+        index = pd.DatetimeIndex(dates)[points - 1] if len(points) else pd.DatetimeIndex([])
+        return {
+            't_stat': pd.DataFrame(tstat, index=index, columns=columns),
+            'pvalue': pd.DataFrame(mackinnonp_batch(tstat, regression='c', N=2), index=index, columns=columns),
+            'beta': pd.DataFrame(beta * ratio, index=index, columns=columns),
+            'nobs': pd.Series(nobs, index=index),
+        }
+
+    @staticmethod
+    def breakdowns(surface, max_pvalue=None, patience=None):
+        """
+        Cờ mất đồng tích hợp: cặp có p-value >= max_pvalue (COINT_BREAK_PVALUE) ở patience lần đánh giá gần nhất
+        liên tiếp (COINT_BREAK_PATIENCE), tránh báo nhầm vì 1 ngày nhiễu.
+        Output: DataFrame theo cặp ['last_pvalue', 'min_pvalue', 'periods_above', 'broken', 'broken_since'].
+        """
+        max_pvalue = max_pvalue or getattr(config, 'COINT_BREAK_PVALUE', 0.10)
+        patience = patience or getattr(config, 'COINT_BREAK_PATIENCE', 3)
+        pvalues = surface['pvalue']
+        rows = {}
+        for pair in pvalues.columns:
+            series = pvalues[pair].dropna()
+            above = (series >= max_pvalue).to_numpy()
+            # Số lần đánh giá liên tiếp gần nhất vượt ngưỡng
+            run = len(above) - (np.flatnonzero(~above)[-1] + 1) if (~above).any() else len(above)
+            broken = run >= patience and len(series) > 0
+            rows[pair] = {
+                'last_pvalue': series.iloc[-1] if len(series) else np.nan,
+                'min_pvalue': series.min() if len(series) else np.nan,
+                'periods_above': run,
+                'broken': broken,
+                'broken_since': series.index[len(series) - run] if broken else pd.NaT,
+            }
+        return pd.DataFrame.from_dict(rows, orient='index')
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import config
+from .kernels import as_matrix, rolling_mean_std, ema
 
 class TrendIndicators:
     """
@@ -48,4 +50,23 @@ class TrendIndicators:
         # Histogram: Khoảng cách giữa MACD và Signal (Đo độ mạnh xu hướng)
         df['MACD_Hist'] = macd - signal
         
-        return df
\ No newline at end of file
+        return df
+
+    # --- Tính cho cả thị trường: ma trận giá (ngày × mã) -> ma trận chỉ báo ---
+    def sma_distance_panel(self, prices, sma=None):
+        """
+        Dist_SMA cho mọi mã cùng lúc.
+        prices: DataFrame / mảng (ngày × mã); sma: SMA đã tính sẵn (dùng chung với Bollinger).
+        """
+        x, wrap = as_matrix(prices)
+        if sma is None:
+            sma, _ = rolling_mean_std(x, config.WINDOW_SIZE, with_std=False)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return wrap((x - sma) / sma)
+
+    def macd_panel(self, prices):
+        """MACD, Signal, Histogram cho mọi mã. Output: dict {'MACD', 'MACD_Signal', 'MACD_Hist'}."""
+        x, wrap = as_matrix(prices)
+        macd = ema(x, self.fast) - ema(x, self.slow)
+        signal = ema(macd, self.signal)
+        return {'MACD': wrap(macd), 'MACD_Signal': wrap(signal), 'MACD_Hist': wrap(macd - signal)}
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import config
+from .kernels import as_matrix, rolling_mean_std
 
 class VolatilityIndicators:
     """
@@ -29,4 +31,19 @@ class VolatilityIndicators:
         # Độ rộng dải băng (Bandwidth): Báo hiệu sắp có biến động lớn nếu dải băng nhỏ lại
         df['Boll_Width'] = bandwidth / sma
         
-        return df
\ No newline at end of file
+        return df
+
+    # --- Tính cho cả thị trường: ma trận giá (ngày × mã) -> ma trận chỉ báo ---
+    def bollinger_bands_panel(self, prices, sma=None, std=None):
+        """
+        %B và độ rộng dải Bollinger cho mọi mã. Output: dict {'Boll_Percent', 'Boll_Width'}.
+        sma, std: có thể truyền vào nếu đã tính sẵn (dùng chung với Dist_SMA).
+        """
+        x, wrap = as_matrix(prices)
+        if sma is None or std is None:
+            sma, std = rolling_mean_std(x, self.window)
+        upper_band = sma + (std * self.num_std)
+        lower_band = sma - (std * self.num_std)
+        bandwidth = upper_band - lower_band
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {'Boll_Percent': wrap((x - lower_band) / bandwidth), 'Boll_Width': wrap(bandwidth / sma)}
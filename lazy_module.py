@@ -0,0 +1,24 @@
+"""
+Import trễ (lazy) cho các package: chỉ nạp module con khi thật sự dùng tới class,
+tránh kéo theo thư viện nặng (statsmodels, sklearn, scipy, matplotlib) lúc khởi động.
+"""
+import sys
+import importlib
+
+def lazy_module(name, mapping):
+    """
+    Tạo cặp (__getattr__, __dir__) cho package name từ mapping {tên class: module con tương đối}.
+    Dùng trong __init__.py: __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
+    """
+    def __getattr__(attr):
+        if attr in mapping:
+            module = importlib.import_module(mapping[attr], name)
+            value = getattr(module, attr)
+            setattr(sys.modules[name], attr, value) # Lần sau lấy thẳng, không qua __getattr__
+            return value
+        raise AttributeError(f"module {name!r} has no attribute {attr!r}")
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[name])) | set(mapping))
+
+    return __getattr__, __dir__
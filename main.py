@@ -2,9 +2,8 @@ import pandas as pd
 import config
 from data_layer.loader import DataLoader
 from data_layer.processor import DataProcessor
-from feature_layer.trend import TrendIndicators
-from feature_layer.momentum import MomentumIndicators
-from feature_layer.volatility import VolatilityIndicators
+from feature_layer.engine import FeatureEngine
+from feature_layer.cache import FeatureCache
 from feature_layer.pairs import PairsIndicators
 from model_layer.data_handler import DataHandler
 from model_layer.regressor import LinearTrader
@@ -35,25 +34,25 @@ def run_system():
     
     # BƯỚC 2: (Tính toán chỉ báo kỹ thuật)
     
-    print("\n[2/5]  Đang tính toán chỉ báo (RSI, MACD, Bollinger)...")
+    # Chỉ tính các chỉ báo mô hình thật sự dùng (cột hậu tố _X/_Y trong DataHandler.KEEP_COLUMNS)
+    leg_columns = DataHandler.leg_feature_columns()
+    print(f"\n[2/5]  Đang tính toán chỉ báo {leg_columns or '(mô hình không dùng chỉ báo nào, bỏ qua)'}...")
     
-    trend = TrendIndicators()
-    mom = MomentumIndicators()
-    vol = VolatilityIndicators()
+    # Cache theo nội dung: chạy lại với cùng dữ liệu / tham số thì lấy lại kết quả cũ
+    cache = FeatureCache() if getattr(config, 'FEATURE_CACHE', False) else None
+    engine = FeatureEngine(cache=cache)
+    
+    # Tính 1 lượt cho cả thị trường (ma trận ngày × mã)
+    prices = pd.DataFrame({ticker: df['Adj Close'] for ticker, df in processed_data.items()})
+    features = engine.compute_panel(prices, columns=leg_columns)
     
-    # Lặp qua từng mã để thêm gia vị (Feature)
     for ticker, df in processed_data.items():
-        # Thêm xu hướng
-        df = trend.add_sma_distance(df)
-        df = trend.add_macd(df)
-        # Thêm sức mạnh
-        df = mom.add_rsi(df)
-        df = mom.add_roc(df)
-        # Thêm biến động
-        df = vol.add_bollinger_bands(df)
-        
         # Lưu ngược lại vào dictionary (Tính toán thì cứ tính, nhưng không vội vứt dữ liệu đi. Khi nào cần so sánh cặp nào thì mới cắt cặp đó cho khớp nhau.
-        processed_data[ticker] = df
+        processed_data[ticker] = df.assign(**{col: values[ticker] for col, values in features.items()})
+    if cache is not None:
+        cache.flush()
+        st = cache.stats()
+        print(f"   -> Cache chỉ báo: {st['hits'] + st['disk_hits']} lần dùng lại, {st['misses']} lần tính mới.")
 
     
     # BƯỚC 3: TÌM CẶP ĐÔI HOÀN HẢO (Pair Selection)
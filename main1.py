@@ -11,9 +11,8 @@ from data_layer.processor import DataProcessor
 # Feature Layer
 from feature_layer.clustering import MarketCluster
 from feature_layer.pairs_updated import PairsIndicatorsUpdated
-from feature_layer.trend import TrendIndicators
-from feature_layer.momentum import MomentumIndicators
-from feature_layer.volatility import VolatilityIndicators
+from feature_layer.engine import FeatureEngine
+from feature_layer.cache import FeatureCache
 
 # Model Layer
 from model_layer.data_handler_updated import DataHandlerUpdated
@@ -40,7 +39,7 @@ def run_advanced_system():
     raw_data = loader.download_data(config.TICKERS)
     
     processor = DataProcessor()
-    processed_data = processor.process_all(raw_data)
+    processed_data = processor.process_all(raw_data, as_panel=True)
     
     if len(processed_data) == 0:
         print("❌ Lỗi: Không có dữ liệu.")
@@ -62,13 +61,19 @@ def run_advanced_system():
     # --------------------------------------------------------------------------
     print("\n[3/7] Chọn cặp tốt nhất & Tính chỉ báo kỹ thuật...")
     pairs_logic = PairsIndicatorsUpdated()
-    trend = TrendIndicators(); mom = MomentumIndicators(); vol = VolatilityIndicators()
+    # Chỉ tính các chỉ báo mô hình thật sự dùng (VD: RSI_X, RSI_Y -> RSI của từng mã)
+    feature_cache = FeatureCache() if getattr(config, 'FEATURE_CACHE', False) else None
+    compact = getattr(config, 'COMPACT_FEATURES', False)
+    engine = FeatureEngine(cache=feature_cache, compact=compact)
+    leg_columns = DataHandlerUpdated.leg_feature_columns()
+    # Chế độ gọn: mỗi mã chỉ mang giá + chỉ báo mô hình dùng vào bảng của cặp
+    pair_columns = ['Adj Close'] + leg_columns if compact else None
     
     portfolio_candidates = [] 
     
     for group_id, tickers in clusters.items():
         if len(tickers) < 2: continue
-        group_data = {t: processed_data[t] for t in tickers}
+        group_data = processed_data.subset(tickers)
         
         # Chọn 1 cặp tốt nhất mỗi nhóm
         best_pairs, p_vals = pairs_logic.find_top_n_pairs(group_data, top_n=1)
@@ -78,13 +83,13 @@ def run_advanced_system():
             print(f"   ✅ Nhóm {group_id}: {pair} (p-value: {p_vals[0]:.5f})")
             
             # Tính Feature
-            df1, df2 = processed_data[pair[0]], processed_data[pair[1]]
-            for df in [df1, df2]:
-                df = trend.add_macd(df); df = trend.add_sma_distance(df)
-                df = mom.add_rsi(df); df = vol.add_bollinger_bands(df)
+            df1 = engine.compute(processed_data[pair[0]], columns=leg_columns, ticker=pair[0])
+            df2 = engine.compute(processed_data[pair[1]], columns=leg_columns, ticker=pair[1])
             
             # Tính Rolling Spread
-            df_pair, avg_beta = pairs_logic.calculate_rolling_spread(df1, df2, window=config.ROLLING_WINDOW)
+            df_pair, avg_beta = pairs_logic.calculate_rolling_spread(
+                df1, df2, window=config.ROLLING_WINDOW, keep_columns=pair_columns, compact=compact
+            )
             
             portfolio_candidates.append({
                 'tickers': pair,
@@ -93,6 +98,9 @@ def run_advanced_system():
                 'beta': avg_beta
             })
 
+    if feature_cache is not None:
+        feature_cache.flush() # Lần chạy sau (cùng dữ liệu / tham số) lấy lại kết quả từ ổ đĩa
+
     # --------------------------------------------------------------------------
     # BƯỚC 4: HUẤN LUYỆN AI (TRAINING)
     # --------------------------------------------------------------------------
@@ -131,7 +139,7 @@ def run_advanced_system():
     print("\n[6/7] 🔄 CHẠY BACKTEST TRÊN DỮ LIỆU KIỂM THỬ (TEST SET)...")
     
     # Khởi tạo các module cũ
-    sig_gen = SignalLogic()
+    sig_gen = SignalLogic(compact=compact)
     backtester = Backtester()
     visualizer = Visualizer()
     
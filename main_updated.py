@@ -6,13 +6,13 @@ import config_updated as config  # Import file config mới
 # --- IMPORT CÁC MODULE ---
 from data_layer.loader import DataLoader
 from data_layer.processor import DataProcessor
+from data_layer.chunked import estimate_block_size
 
 # Feature Layer (Bao gồm các bản nâng cấp)
 from feature_layer.clustering import MarketCluster
 from feature_layer.pairs_updated import PairsIndicatorsUpdated # Dùng bản Updated
-from feature_layer.trend import TrendIndicators
-from feature_layer.momentum import MomentumIndicators
-from feature_layer.volatility import VolatilityIndicators
+from feature_layer.engine import FeatureEngine
+from feature_layer.cache import FeatureCache
 
 # Model Layer (AI)
 from model_layer.data_handler_updated import DataHandlerUpdated # Dùng bản Updated
@@ -30,11 +30,21 @@ def run_advanced_system():
     # BƯỚC 1: TẢI & XỬ LÝ DỮ LIỆU
     # --------------------------------------------------------------------------
     print("\n[1/6] tải và làm sạch dữ liệu")
-    loader = DataLoader(config.START_DATE, config.END_DATE)
-    raw_data = loader.download_data(config.TICKERS)
-    
+    loader = DataLoader(config.START_DATE, config.END_DATE, cache_dir=getattr(config, 'CACHE_DIR', None))
     processor = DataProcessor()
-    processed_data = processor.process_all(raw_data)
+
+    if getattr(config, 'CHUNKED_PROCESSING', False):
+        # Xử lý theo khối: chỉ giữ 1 khối dữ liệu gốc trong RAM, kết quả nằm trên ổ đĩa
+        block_size = estimate_block_size(config.START_DATE, config.END_DATE, config.CHUNK_MEMORY_MB)
+        processed_data = processor.process_chunked(
+            loader.iter_blocks(config.TICKERS, block_size), out_dir=config.CHUNK_DIR
+        )
+    else:
+        raw_data = loader.download_data(config.TICKERS)
+        processed_data = processor.process_all(raw_data, as_panel=True)
+        # Giải phóng dữ liệu gốc (cùng dict với loader.tickers_data), các bước sau chỉ dùng panel
+        raw_data.clear()
+        del raw_data
     
     if len(processed_data) == 0:
         print(" Lỗi: Không có dữ liệu sau khi xử lý.")
@@ -60,9 +70,13 @@ def run_advanced_system():
     print("\n[3/6] Chọn lọc cặp tốt nhất & Tính toán chỉ báo kỹ thuật")
     
     pairs_logic = PairsIndicatorsUpdated()
-    trend = TrendIndicators()
-    mom = MomentumIndicators()
-    vol = VolatilityIndicators()
+    # Chỉ tính các chỉ báo mô hình thật sự dùng (VD: RSI_X, RSI_Y -> RSI của từng mã)
+    feature_cache = FeatureCache() if getattr(config, 'FEATURE_CACHE', False) else None
+    compact = getattr(config, 'COMPACT_FEATURES', False)
+    engine = FeatureEngine(cache=feature_cache, compact=compact)
+    leg_columns = DataHandlerUpdated.leg_feature_columns()
+    # Chế độ gọn: mỗi mã chỉ mang giá + chỉ báo mô hình dùng vào bảng của cặp
+    pair_columns = ['Adj Close'] + leg_columns if compact else None
     
     # Danh sách chứa thông tin đầy đủ để đưa vào AI
     # Mỗi phần tử là 1 dict chứa: Data, Model, Handler, Tickers...
@@ -73,7 +87,7 @@ def run_advanced_system():
         if len(tickers_in_group) < 2: continue
         
         # Lọc data chỉ của nhóm này
-        group_data = {t: processed_data[t] for t in tickers_in_group}
+        group_data = processed_data.subset(tickers_in_group)
         
         # Lấy Top 1 cặp tốt nhất trong nhóm này (để đại diện)
         # (Có thể sửa thành top_n=2 nếu muốn đa dạng hơn nữa)
@@ -88,21 +102,20 @@ def run_advanced_system():
         print(f"   Nhóm {group_id}: Chọn cặp {pair} (p-value: {p_val:.5f})")
         
         # --- TÍNH TOÁN FEATURE KỸ THUẬT ---
-        df1 = processed_data[pair[0]]
-        df2 = processed_data[pair[1]]
-        
-        # Thêm RSI, MACD, Bollinger... cho từng mã lẻ TRƯỚC khi gộp
-        for df in [df1, df2]:
-            df = trend.add_macd(df)
-            df = trend.add_sma_distance(df)
-            df = mom.add_rsi(df)
-            df = vol.add_bollinger_bands(df)
+        # Thêm chỉ báo cho từng mã lẻ TRƯỚC khi gộp (hậu tố _Y, _X khi ghép cặp)
+        df1 = engine.compute(processed_data[pair[0]], columns=leg_columns, ticker=pair[0])
+        df2 = engine.compute(processed_data[pair[1]], columns=leg_columns, ticker=pair[1])
             
-        # --- TÍNH SPREAD & Z-SCORE (DÙNG ROLLING BETA) ---
+        # --- TÍNH SPREAD & Z-SCORE (DÙNG ROLLING BETA HOẶC KALMAN THEO SPREAD_MODEL) ---
         # Đây là cải tiến quan trọng so với Static Beta
-        df_pair, avg_beta = pairs_logic.calculate_rolling_spread(
-            df1, df2, window=config.ROLLING_WINDOW
-        )
+        if getattr(config, 'SPREAD_MODEL', 'rolling') == 'kalman':
+            df_pair, avg_beta, _ = pairs_logic.calculate_kalman_spread(
+                df1, df2, keep_columns=pair_columns, compact=compact
+            )
+        else:
+            df_pair, avg_beta = pairs_logic.calculate_rolling_spread(
+                df1, df2, window=config.ROLLING_WINDOW, keep_columns=pair_columns, compact=compact
+            )
         
         # Lưu vào danh sách chờ huấn luyện
         portfolio_candidates.append({
@@ -112,6 +125,9 @@ def run_advanced_system():
             'beta': avg_beta
         })
 
+    if feature_cache is not None:
+        feature_cache.flush() # Lần chạy sau (cùng dữ liệu / tham số) lấy lại kết quả từ ổ đĩa
+
     # --------------------------------------------------------------------------
     # BƯỚC 4: HUẤN LUYỆN AI (RANDOM FOREST)
     # --------------------------------------------------------------------------
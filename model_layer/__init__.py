@@ -1,2 +1,11 @@
-from .data_handler import DataHandler
-from .regressor import LinearTrader
\ No newline at end of file
+"""Lớp mô hình: chuẩn bị dữ liệu và hồi quy tuyến tính (import trễ, không nạp sklearn khi chưa dùng)."""
+from lazy_module import lazy_module
+
+_LAZY_IMPORTS = {
+    'DataHandler':  '.data_handler',
+    'LinearTrader': '.regressor',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
@@ -1,11 +1,28 @@
 # FILE: model_layer/data_handler.py
 
-from sklearn.preprocessing import StandardScaler
 import pandas as pd
 import config
 
 class DataHandler:
+    # Cột mô hình dùng (Lag được tạo trong create_dataset; hậu tố _X/_Y là chỉ báo của từng mã)
+    KEEP_COLUMNS = [
+        'Spread_Z', 
+        'Spread_Z_Lag1', 
+        'Spread_Z_Lag2',
+        'Spread_Z_Lag3', # Thêm thử Lag 3 xem sao
+    ]
+
+    @classmethod
+    def leg_feature_columns(cls):
+        """Cột chỉ báo cần tính cho từng mã trước khi ghép cặp (VD: 'RSI_X', 'RSI_Y' -> ['RSI'])."""
+        columns = []
+        for c in cls.KEEP_COLUMNS:
+            if c.endswith(('_X', '_Y')) and c[:-2] not in columns:
+                columns.append(c[:-2])
+        return columns
+
     def __init__(self):
+        from sklearn.preprocessing import StandardScaler
         self.scaler = StandardScaler()
 
     def create_dataset(self, df, target_col='Spread_Z', lags=3):
@@ -33,16 +50,7 @@ class DataHandler:
 
         # Thay vì lấy tất cả, hãy lọc thủ công hoặc dùng Correlation
         # Ví dụ: Chỉ lấy Z-score quá khứ và RSI
-        keep_columns = [
-            'Spread_Z', 
-            'Spread_Z_Lag1', 
-            'Spread_Z_Lag2',
-            'Spread_Z_Lag3', # Thêm thử Lag 3 xem sao
-        
-            
-            
-            'Target'# Mục tiêu
-        ]
+        keep_columns = self.KEEP_COLUMNS + ['Target']
 
         # Chỉ giữ lại các cột có trong danh sách trên (nếu tồn tại trong df)
         valid_cols = [c for c in keep_columns if c in df.columns]
@@ -51,7 +59,7 @@ class DataHandler:
         # Sau đó mới drop Target để tạo X
         X = df.drop(columns=['Target'])
         # [Mẹo] Chỉ giữ lại các cột Numeric cho chắc ăn
-        X = X.select_dtypes(include=['float64', 'int64'])
+        X = X.select_dtypes(include=['float64', 'float32', 'int64'])
         
         y = df['Target']
         
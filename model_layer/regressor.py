@@ -1,6 +1,4 @@
 
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
 import numpy as np
 
 class LinearTrader:
@@ -9,6 +7,7 @@ class LinearTrader:
     Đơn giản nhưng hiệu quả để tìm mối quan hệ tuyến tính.
     """
     def __init__(self):
+        from sklearn.linear_model import LinearRegression
         self.model = LinearRegression()
 
     def train(self, X_train, y_train):
@@ -30,6 +29,7 @@ class LinearTrader:
         """
         đánh giá mô hình.
         """
+        from sklearn.metrics import mean_squared_error, r2_score
         # MSE: Sai số bình phương trung bình (Càng nhỏ càng tốt)
         mse = mean_squared_error(y_true, y_pred)
         
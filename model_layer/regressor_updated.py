@@ -1,5 +1,3 @@
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
 import numpy as np
 import pandas as pd
 import config
@@ -10,6 +8,7 @@ class RandomForestTrader:
     Sử dụng Random Forest để bắt các tín hiệu phi tuyến tính phức tạp.
     """
     def __init__(self):
+        from sklearn.ensemble import RandomForestRegressor
         # Cấu hình Random Forest (Có thể chỉnh trong config.py)
         self.model = RandomForestRegressor(
             n_estimators=getattr(config, 'RF_N_ESTIMATORS', 200), # Mặc định 100 cây nhiều thì càng tốt nhma lâu
@@ -38,6 +37,7 @@ class RandomForestTrader:
         return clipped_pred
 
     def evaluate(self, y_true, y_pred, pair_name="Unknown"):    
+        from sklearn.metrics import mean_squared_error, r2_score
         rmse = np.sqrt(mean_squared_error(y_true, y_pred))
         r2 = r2_score(y_true, y_pred)
         correct_direction = np.sign(y_pred) == np.sign(y_true)
@@ -1,3 +1,12 @@
-from .optimizer import PortfolioOptimizer
-from .allocator import StrategyAllocator
-from .risk_manager import DynamicRiskManager
\ No newline at end of file
+"""Lớp danh mục: tối ưu tỷ trọng, phân bổ vốn và quản trị rủi ro (scipy nạp khi dùng tới)."""
+from lazy_module import lazy_module
+
+_LAZY_IMPORTS = {
+    'PortfolioOptimizer': '.optimizer',
+    'StrategyAllocator':  '.allocator',
+    'DynamicRiskManager': '.risk_manager',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
 
 class PortfolioOptimizer:
     """
@@ -37,6 +36,7 @@ class PortfolioOptimizer:
         
         # 5. Chạy thuật toán tối ưu SLSQP
         # (Sequential Least Squares Programming - Chuyên trị bài toán phi tuyến tính có ràng buộc)
+        from scipy.optimize import minimize
         try:
             result = minimize(self._negative_sharpe, init_guess, args=args,
                               method='SLSQP', bounds=bounds, constraints=constraints)
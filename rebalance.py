@@ -10,9 +10,11 @@ from data_layer.loader import DataLoader
 from data_layer.processor import DataProcessor
 from feature_layer.clustering import MarketCluster
 from feature_layer.pairs_updated import PairsIndicatorsUpdated
-from feature_layer.trend import TrendIndicators
-from feature_layer.momentum import MomentumIndicators
-from feature_layer.volatility import VolatilityIndicators
+from feature_layer.coint_store import CointegrationStore
+from feature_layer.stability import CointegrationStability
+from feature_layer.engine import FeatureEngine
+from feature_layer.cache import FeatureCache
+from feature_layer.online import PairOnlineState
 from model_layer.data_handler_updated import DataHandlerUpdated
 from model_layer.regressor_updated import RandomForestTrader
 
@@ -32,11 +34,11 @@ def run_rebalance():
     today_str = datetime.date.today().strftime('%Y-%m-%d')
     print(f"\n[1] Tải dữ liệu từ {config.START_DATE} đến {today_str}...")
     
-    loader = DataLoader(config.START_DATE, today_str)
+    loader = DataLoader(config.START_DATE, today_str, cache_dir=getattr(config, 'CACHE_DIR', None))
     raw_data = loader.download_data(config.TICKERS)
     
     processor = DataProcessor()
-    processed_data = processor.process_all(raw_data)
+    processed_data = processor.process_all(raw_data, as_panel=True)
     
     if not processed_data:
         print("Không có dữ liệu để chạy.")
@@ -59,45 +61,71 @@ def run_rebalance():
     print(f"\n[3] Chọn lọc lại các cặp tốt nhất ")
     
     pairs_logic = PairsIndicatorsUpdated()
+    # Kho kết quả đồng tích hợp: tháng sau chỉ kiểm định lại cặp mới / dữ liệu bị sửa / quá hạn
+    coint_store = CointegrationStore() if getattr(config, 'COINT_STORE', False) else None
+    feature_cache = FeatureCache() if getattr(config, 'FEATURE_CACHE', False) else None
+    compact = getattr(config, 'COMPACT_FEATURES', False)
+    engine = FeatureEngine(cache=feature_cache, compact=compact)
+    leg_columns = DataHandlerUpdated.leg_feature_columns()
+    # Chế độ gọn: mỗi mã chỉ mang giá + chỉ báo mô hình dùng vào bảng của cặp
+    pair_columns = ['Adj Close'] + leg_columns if compact else None
     portfolio_state = [] # Danh sách chứa mọi thứ cần thiết để trade tháng sau
     
     for group_id, tickers in clusters.items():
         if len(tickers) < 2: continue
         
-        group_data = {t: processed_data[t] for t in tickers}
+        group_data = processed_data.subset(tickers)
         
         # Lấy Top 1 cặp tốt nhất mỗi nhóm (Hoặc Top N tùy config)
-        top_pairs, _ = pairs_logic.find_top_n_pairs(group_data, top_n=1)
+        top_pairs, _ = pairs_logic.find_top_n_pairs(group_data, top_n=1, store=coint_store)
         
         for pair in top_pairs:
             print(f"   -> Cluster {group_id}: chọn cặp {pair}")
             
             # Tính toán lại toàn bộ chỉ báo cho dữ liệu mới nhất
-            df1 = processed_data[pair[0]]
-            df2 = processed_data[pair[1]]
+            # Chỉ tính các chỉ báo mô hình thật sự dùng (VD: RSI_X, RSI_Y -> RSI của từng mã)
+            df1 = engine.compute(processed_data[pair[0]], columns=leg_columns, ticker=pair[0])
+            df2 = engine.compute(processed_data[pair[1]], columns=leg_columns, ticker=pair[1])
             
-            # Thêm chỉ báo (Trend, Mom, Vol)
-            trend = TrendIndicators(); mom = MomentumIndicators(); vol = VolatilityIndicators()
-            for df in [df1, df2]:
-                df = trend.add_macd(df)
-                df = trend.add_sma_distance(df)
-                df = mom.add_rsi(df)
-                df = vol.add_bollinger_bands(df)
-            
-            # Tính Rolling Spread & Z-score
+            # Tính Spread & Z-score (Beta trượt hoặc Kalman theo SPREAD_MODEL)
             # Quan trọng: Dữ liệu spread này đã bao gồm biến động mới nhất
-            df_pair, avg_beta = pairs_logic.calculate_rolling_spread(
-                df1, df2, window=getattr(config, 'ROLLING_WINDOW', 60)
-            )
+            spread_state = None
+            if getattr(config, 'SPREAD_MODEL', 'rolling') == 'kalman':
+                df_pair, avg_beta, spread_state = pairs_logic.calculate_kalman_spread(
+                    df1, df2, keep_columns=pair_columns, compact=compact
+                )
+            else:
+                df_pair, avg_beta = pairs_logic.calculate_rolling_spread(
+                    df1, df2, window=getattr(config, 'ROLLING_WINDOW', 60),
+                    keep_columns=pair_columns, compact=compact
+                )
             
             # Lưu tạm thông tin
             portfolio_state.append({
                 'tickers': pair,
                 'data': df_pair,
                 'group': group_id,
-                'beta_avg': avg_beta
+                'beta_avg': avg_beta,
+                # Trạng thái chạy của chỉ báo + spread: giao dịch hằng ngày chỉ cần cập nhật phiên mới
+                'online_state': PairOnlineState.from_history(
+                    pair, df1, df2, df_pair, window=getattr(config, 'ROLLING_WINDOW', 60),
+                    spread_state=spread_state
+                )
             })
 
+    if coint_store is not None:
+        coint_store.close()
+
+    # Cảnh báo cặp được chọn nhưng đồng tích hợp đã gãy ở các cửa sổ gần đây (p-value trượt vượt ngưỡng)
+    if getattr(config, 'COINT_STABILITY_CHECK', False) and portfolio_state:
+        selected = [item['tickers'] for item in portfolio_state]
+        stability = CointegrationStability.breakdowns(CointegrationStability().surface(processed_data, selected))
+        for pair_name, row in stability[stability['broken']].iterrows():
+            print(f"   [!] Cặp {pair_name} mất đồng tích hợp từ {row['broken_since'].date()}"
+                  f" (p-value hiện tại {row['last_pvalue']:.3f})")
+    if feature_cache is not None:
+        feature_cache.flush() # Lần chạy sau (cùng dữ liệu / tham số) lấy lại kết quả từ ổ đĩa
+
     # --- BƯỚC 4: HUẤN LUYỆN LẠI AI (RETRAINING) ---
     # Model cũ đã lỗi thời, ta tạo model mới học dữ liệu đến tận ngày hôm nay
     print(f"\n[4] Retrain mô hình  với dữ liệu mới")
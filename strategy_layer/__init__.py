@@ -1,3 +1,12 @@
-from .signals import SignalLogic
-from .backtester import Backtester
-from .visualizer import Visualizer  # <--- Thêm dòng này
\ No newline at end of file
+"""Lớp chiến lược: tín hiệu, backtest và vẽ biểu đồ (matplotlib chỉ nạp khi dùng Visualizer)."""
+from lazy_module import lazy_module
+
+_LAZY_IMPORTS = {
+    'SignalLogic': '.signals',
+    'Backtester':  '.backtester',
+    'Visualizer':  '.visualizer',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
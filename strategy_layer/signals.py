@@ -7,10 +7,12 @@ class SignalLogic:
     Logic sinh tín hiệu giao dịch dựa trên Z-score.
     Nguyên tắc: Mean Reversion (Đảo chiều về trung bình).
     """
-    def __init__(self):
+    def __init__(self, compact=None):
         self.entry_threshold = config.Z_ENTRY_THRESHOLD # Ngưỡng vào lệnh (1.0)
         self.exit_threshold = config.Z_EXIT_THRESHOLD   # Ngưỡng thoát lệnh (0.0)
         self.stop_loss = config.Z_STOP_LOSS             # Ngưỡng cắt lỗ (3.5)
+        # Chế độ gọn: Signal / Position chỉ nhận -1, 0, 1 -> lưu int8 thay vì int64 / float64
+        self.compact = getattr(config, 'COMPACT_FEATURES', False) if compact is None else compact
 
     def generate_signals(self, df, col_name='Spread_Z'):
         """
@@ -69,10 +71,13 @@ class SignalLogic:
             
             signals.append(current_position)
             
-        df['Signal'] = signals
+        df['Signal'] = np.array(signals, dtype=np.int8) if self.compact else signals
         
         # Shift(1): Tín hiệu hôm nay dùng để vào lệnh ngày mai
         # (Để tránh nhìn thấy tương lai)
-        df['Position'] = df['Signal'].shift(1).fillna(0)
+        if self.compact:
+            df['Position'] = df['Signal'].shift(1, fill_value=0) # Giữ int8
+        else:
+            df['Position'] = df['Signal'].shift(1).fillna(0)
         
         return df
\ No newline at end of file
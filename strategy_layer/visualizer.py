@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import config
@@ -9,6 +8,7 @@ class Visualizer:
     """
     def __init__(self):
         # Sử dụng style 'ggplot' cho đẹp
+        import matplotlib.pyplot as plt
         plt.style.use('ggplot')
 
     def plot_performance(self, df):
@@ -17,6 +17,7 @@ class Visualizer:
         1. Đường cong vốn (Equity Curve)
         2. Spread Z-score và các điểm vào lệnh Mua/Bán
         """
+        import matplotlib.pyplot as plt
         # Tạo khung hình (Figure) có 2 hàng, 1 cột
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10), sharex=True)
         
@@ -72,6 +73,7 @@ class Visualizer:
         Vẽ biểu đồ đánh giá độ chính xác của Mô hình AI.
         So sánh giữa Giá trị Thực tế (Actual) và Giá trị Dự báo (Predicted).
         """
+        import matplotlib.pyplot as plt
         # Chuyển đổi sang numpy array nếu input là Series
         if isinstance(y_test, pd.Series):
             y_test = y_test.values
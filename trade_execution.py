@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import os
 import pickle
 import datetime
 import config_updated as config
@@ -7,9 +8,7 @@ import config_updated as config
 # Import các công cụ cần thiết để tính feature
 from data_layer.loader import DataLoader
 from data_layer.processor import DataProcessor
-from feature_layer.trend import TrendIndicators
-from feature_layer.momentum import MomentumIndicators
-from feature_layer.volatility import VolatilityIndicators
+from feature_layer.engine import FeatureEngine
 from model_layer.data_handler_updated import DataHandlerUpdated
 
 # Import Allocator để chia tiền
@@ -17,19 +16,75 @@ from portfolio_layer.allocator import StrategyAllocator
 
 MODEL_PATH = 'models/current_portfolio_state.pkl'
 
-def run_daily_trading():
-    print(f" GIAO DỊCH HÀNG NGÀY - {datetime.date.today()}")
-    print("="*60)
+def _attach_handler(item):
+    """Tạo handler với scaler + thứ tự cột đã lưu lúc rebalance (Allocator cần scaler ĐÃ FIT)."""
+    handler = DataHandlerUpdated()
+    handler.feature_cols = item['feature_cols']
+    handler.scaler = item['scaler']
+    item['handler'] = handler
 
-    # 1. KIỂM TRA MODEL
-    try:
-        with open(MODEL_PATH, 'rb') as f:
-            portfolio_state = pickle.load(f)
-        print(f" (gồm {len(portfolio_state)} cặp).")
-    except FileNotFoundError:
-        print("LỖI: Không tìm thấy file model. ")
-        return
+def prepare_pairs_online(portfolio_state, active_tickers):
+    """
+    Đường giao dịch buổi sáng dùng trạng thái chỉ báo đã lưu (PairOnlineState):
+    chỉ tải các phiên sau ngày cập nhật cuối cùng, mỗi phiên cập nhật chỉ báo + spread trong O(1)
+    rồi nối vào lịch sử gần nhất (recent_history) để đưa cho Allocator.
+    """
+    print("\n[1/3] cập nhật các phiên mới (trạng thái chỉ báo đã lưu)...")
+    today_str = datetime.date.today().strftime('%Y-%m-%d')
+    last_date = min(item['online_state'].last_date for item in portfolio_state)
+    start_str = (pd.Timestamp(last_date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+    raw_data = {}
+    if start_str < today_str:
+        loader = DataLoader(start_str, today_str, cache_dir=getattr(config, 'CACHE_DIR', None))
+        raw_data = loader.download_data(list(active_tickers))
 
+    print("\n[2/3] Dự báo tín hiệu...")
+    pairs_ready_to_trade = []
+    for item in portfolio_state:
+        t1, t2 = item['tickers']
+        state = item['online_state']
+        history = item['recent_history']
+
+        if t1 in raw_data and t2 in raw_data:
+            # Giá của 2 mã trên các phiên cả 2 cùng có dữ liệu
+            legs = []
+            for t in (t1, t2):
+                df = raw_data[t]
+                legs.append(df['Adj Close' if 'Adj Close' in df.columns else 'Close'])
+            prices = pd.concat(legs, axis=1).dropna()
+            prices = prices[prices.index > pd.Timestamp(state.last_date)]
+
+            rows = [state.update(date, p1, p2) for date, (p1, p2) in zip(prices.index, prices.to_numpy())]
+            if rows:
+                # Giữ kiểu dữ liệu của lịch sử (float32 ở chế độ gọn)
+                new_rows = pd.DataFrame(rows, index=prices.index).reindex(columns=history.columns).astype(history.dtypes)
+                # Cột không thuộc trạng thái (nếu có) lấy giá trị phiên trước
+                stale_cols = [c for c in history.columns if c not in rows[0]]
+                history = pd.concat([history, new_rows])
+                history[stale_cols] = history[stale_cols].ffill()
+                history = history.tail(len(item['recent_history']))
+                print(f"   {t1}-{t2}: +{len(rows)} phiên mới.")
+        else:
+            print(f"   {t1}-{t2}: không có phiên mới, dùng trạng thái đã lưu.")
+
+        item['recent_history'] = history
+        item['data'] = history
+        _attach_handler(item)
+        pairs_ready_to_trade.append(item)
+
+    return pairs_ready_to_trade
+
+def save_portfolio_state(portfolio_state):
+    """Ghi lại trạng thái đã cập nhật (bỏ handler / data tạm) để ngày mai chỉ cần phiên mới."""
+    to_save = [{k: v for k, v in item.items() if k not in ('handler', 'data')} for item in portfolio_state]
+    tmp_path = MODEL_PATH + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(to_save, f)
+    os.replace(tmp_path, MODEL_PATH)
+
+def prepare_pairs_lookback(portfolio_state, active_tickers):
+    """Đường cũ: tải ~150 ngày lịch sử rồi tính lại toàn bộ chỉ báo và spread."""
     # 2. TẢI DỮ LIỆU MỚI NHẤT (REAL-TIME DATA)
     # Lấy dữ liệu đến ngày hôm nay để tính chỉ báo
     print("\n[1/3] cập nhật dữ liệu  mới nhất...")
@@ -38,15 +93,10 @@ def run_daily_trading():
     # Cần lấy dư ra khoảng 100 ngày trước đó để tính đủ MA, RSI, Rolling
     start_lookback = (datetime.date.today() - datetime.timedelta(days=150)).strftime('%Y-%m-%d')
     
-    loader = DataLoader(start_lookback, today_str)
-    # Chỉ tải những mã có trong portfolio đã chọn
-    active_tickers = set()
-    for item in portfolio_state:
-        active_tickers.add(item['tickers'][0])
-        active_tickers.add(item['tickers'][1])
-    
+    loader = DataLoader(start_lookback, today_str, cache_dir=getattr(config, 'CACHE_DIR', None))
     raw_data = loader.download_data(list(active_tickers))
-    processor = DataProcessor()
+    # Không chạy ADF (chỉ mang tính chẩn đoán) trên đường giao dịch buổi sáng
+    processor = DataProcessor(adf_mode=getattr(config, 'ADF_MODE_DAILY', 'lazy'))
     processed_data = processor.process_all(raw_data)
 
     # 3. CHUẨN BỊ DỮ LIỆU ĐỂ DỰ BÁO
@@ -62,16 +112,12 @@ def run_daily_trading():
             print(f"  Thiếu dữ liệu cho cặp {t1}-{t2}. Bỏ qua.")
             continue
             
-        df1 = processed_data[t1]
-        df2 = processed_data[t2]
-        
-        # --- A. TÍNH INDICATORS (Phải khớp logic lúc train) ---
-        trend = TrendIndicators(); mom = MomentumIndicators(); vol = VolatilityIndicators()
-        for df in [df1, df2]:
-            df = trend.add_macd(df)
-            df = trend.add_sma_distance(df)
-            df = mom.add_rsi(df)
-            df = vol.add_bollinger_bands(df)
+        # --- A. TÍNH INDICATORS (Phải khớp logic lúc train: đúng các cột mô hình dùng) ---
+        compact = getattr(config, 'COMPACT_FEATURES', False)
+        engine = FeatureEngine(compact=compact)
+        leg_columns = DataHandlerUpdated.leg_feature_columns()
+        df1 = engine.compute(processed_data[t1], columns=leg_columns)
+        df2 = engine.compute(processed_data[t2], columns=leg_columns)
             
         # --- B. TÍNH SPREAD (Dùng Beta đã lưu trong model) ---
         # Lưu ý: Lúc rebalance ta đã lưu 'beta_avg'. 
@@ -82,7 +128,8 @@ def run_daily_trading():
         
         # Tính Rolling Spread
         df_pair, _ = pairs_logic.calculate_rolling_spread(
-            df1, df2, window=getattr(config, 'ROLLING_WINDOW', 60)
+            df1, df2, window=getattr(config, 'ROLLING_WINDOW', 60),
+            keep_columns=['Adj Close'] + leg_columns if compact else None, compact=compact
         )
         
         # Cập nhật lại dữ liệu mới nhất vào item
@@ -104,11 +151,43 @@ def run_daily_trading():
         
         pairs_ready_to_trade.append(item)
 
+    return pairs_ready_to_trade
+
+def run_daily_trading():
+    print(f" GIAO DỊCH HÀNG NGÀY - {datetime.date.today()}")
+    print("="*60)
+
+    # 1. KIỂM TRA MODEL
+    try:
+        with open(MODEL_PATH, 'rb') as f:
+            portfolio_state = pickle.load(f)
+        print(f" (gồm {len(portfolio_state)} cặp).")
+    except FileNotFoundError:
+        print("LỖI: Không tìm thấy file model. ")
+        return
+
+    # Chỉ tải những mã có trong portfolio đã chọn
+    active_tickers = set()
+    for item in portfolio_state:
+        active_tickers.add(item['tickers'][0])
+        active_tickers.add(item['tickers'][1])
+
+    # 2-3. CẬP NHẬT DỮ LIỆU & CHUẨN BỊ DỰ BÁO
+    online = all('online_state' in item for item in portfolio_state)
+    if online:
+        # Có trạng thái chỉ báo lưu lúc rebalance: chỉ cần các phiên mới, cập nhật O(1) mỗi phiên
+        pairs_ready_to_trade = prepare_pairs_online(portfolio_state, active_tickers)
+    else:
+        # File model cũ (chưa có trạng thái): tải lại lịch sử để tính lại chỉ báo
+        pairs_ready_to_trade = prepare_pairs_lookback(portfolio_state, active_tickers)
+
     # 4. PHÂN BỔ VỐN & RA QUYẾT ĐỊNH
     print("\n[3/3] Tối ưu hóa danh mục & Ra phiếu lệnh")
     
     allocator = StrategyAllocator(risk_manager=True)
     weights = allocator.allocate_capital(pairs_ready_to_trade)
+    if online:
+        save_portfolio_state(portfolio_state)
     
     # 5. IN PHIẾU LỆNH (ORDER TICKET)
   